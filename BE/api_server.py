@@ -0,0 +1,274 @@
+import argparse
+import json
+import os
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from jobs import TERMINAL_STATES, JobManager, QueueFull
+
+RETRY_AFTER_SECONDS = 30
+# Idle SSE connections get a comment line this often, so proxies keep them open
+KEEPALIVE_SECONDS = 15
+DOWNLOAD_BLOCK_BYTES = 64 * 1024
+
+
+class DocsRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front of the job manager, as used by the Streamlit app.
+
+    POST /generate_docs        {"github_url": ..., "clone_strategy": ..., "budget": ...} -> {"task_id": ...}
+    GET  /status/{task_id}     progress, status and documentation_path of a job
+    GET  /events/{task_id}     Server-Sent Events: status, progress and section events
+    GET  /documents/{task_id}  the generated Markdown, honouring Range requests
+    GET  /metrics              Prometheus text for every job run by this server
+    GET  /metrics/{task_id}    JSON spans, counters and per-file timings of one job
+    POST /cancel/{task_id}     request cancellation
+    GET  /health
+    """
+
+    manager = None
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/health":
+            return self._send_json(200, {"status": "ok"})
+
+        match = re.fullmatch(r"/status/([0-9a-f]+)", self.path)
+        if match:
+            job = self.manager.status(match.group(1))
+            if job is None:
+                return self._send_json(404, {"error": "Unknown task"})
+            return self._send_json(200, self._job_status(job))
+
+        if self.path == "/metrics":
+            return self._send_text(200, self.manager.metrics.to_prometheus(),
+                                   "text/plain; version=0.0.4; charset=utf-8")
+
+        match = re.fullmatch(r"/metrics/([0-9a-f]+)", self.path)
+        if match:
+            return self._send_metrics(match.group(1))
+
+        match = re.fullmatch(r"/events/([0-9a-f]+)", self.path)
+        if match:
+            return self._stream_events(match.group(1))
+
+        match = re.fullmatch(r"/documents/([0-9a-f]+)", self.path)
+        if match:
+            return self._send_document(match.group(1))
+
+        self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path == "/generate_docs":
+            return self._generate_docs()
+
+        match = re.fullmatch(r"/cancel/([0-9a-f]+)", self.path)
+        if match:
+            return self._send_json(200, {"cancelled": self.manager.cancel(match.group(1))})
+
+        self._send_json(404, {"error": "Not found"})
+
+    def _generate_docs(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_json(400, {"error": "Request body must be JSON"})
+
+        repo_url = body.get("github_url")
+        if not repo_url:
+            return self._send_json(400, {"error": "github_url is required"})
+
+        budget = body.get("budget")
+        if budget is not None and not (
+            isinstance(budget, dict) and set(budget) <= {"seconds", "files", "bytes"} and
+            all(isinstance(value, (int, float)) and value > 0 for value in budget.values())
+        ):
+            return self._send_json(400, {"error": "budget takes positive seconds, files and bytes limits"})
+
+        try:
+            task_id, deduplicated = self.manager.submit(
+                repo_url, body.get("clone_strategy"), bool(body.get("profile")), budget
+            )
+        except QueueFull as e:
+            return self._send_json(429, {"error": str(e)}, {"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+        job = self.manager.status(task_id)
+        self._send_json(200, {"task_id": task_id, "status": job["status"], "deduplicated": deduplicated})
+
+    def _stream_events(self, task_id):
+        job = self.manager.status(task_id)
+        if job is None:
+            return self._send_json(404, {"error": "Unknown task"})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        # Reconnecting clients resume after the last event they saw
+        seq = int(self.headers.get("Last-Event-ID") or 0)
+        try:
+            if seq == 0:
+                self._write_event(0, "status", self._job_status(job))
+            # A finished job has all its events logged already; never wait for more
+            finished = job["status"] in TERMINAL_STATES
+            while True:
+                events = self.manager.events_since(task_id, seq, 0 if finished else KEEPALIVE_SECONDS)
+                if not events:
+                    job = self.manager.status(task_id)
+                    if job["status"] in TERMINAL_STATES:
+                        if seq:
+                            return
+                        # Finished before this server kept its events; replay from the job record
+                        for section in (job["result"] or {}).get("sections", []):
+                            title, start, end = section
+                            self._write_event(0, "section", {"title": title, "start": start, "end": end})
+                        self._write_event(0, "status", self._job_status(job))
+                        return
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    continue
+                for seq, event, data in events:
+                    self._write_event(seq, event, data)
+                    if event == "status" and data["status"] in TERMINAL_STATES:
+                        return
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def _write_event(self, seq, event, data):
+        self.wfile.write(f"id: {seq}\nevent: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def _send_document(self, task_id):
+        job = self.manager.status(task_id)
+        if job is None:
+            return self._send_json(404, {"error": "Unknown task"})
+        path = self.manager.document_path(job)
+        try:
+            f = open(path, 'rb') if path else None
+        except FileNotFoundError:
+            # Renamed from its temporary name between the lookup and the open
+            path = self.manager.document_path(self.manager.status(task_id))
+            f = open(path, 'rb') if path and os.path.exists(path) else None
+        if f is None:
+            return self._send_json(404, {"error": "Documentation is not available yet"})
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            byte_range = self._parse_range(self.headers.get("Range"), size)
+            if byte_range is False:
+                return self._send_json(416, {"error": "Range not satisfiable"},
+                                       {"Content-Range": f"bytes */{size}"})
+
+            start, end = byte_range or (0, size - 1)
+            length = max(end - start + 1, 0)
+            self.send_response(206 if byte_range else 200)
+            self.send_header("Content-Type", "text/markdown; charset=utf-8")
+            self.send_header("Content-Length", str(length))
+            self.send_header("Accept-Ranges", "bytes")
+            if byte_range:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            else:
+                self.send_header("Content-Disposition", 'attachment; filename="docs.md"')
+            self.end_headers()
+
+            # Streamed in blocks; the document is never read whole
+            f.seek(start)
+            try:
+                while length > 0:
+                    block = f.read(min(DOWNLOAD_BLOCK_BYTES, length))
+                    if not block:
+                        break
+                    self.wfile.write(block)
+                    length -= len(block)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+    def _send_metrics(self, task_id):
+        job = self.manager.status(task_id)
+        if job is None:
+            return self._send_json(404, {"error": "Unknown task"})
+        path = ((job["result"] or {}).get("metrics_paths") or {}).get("metrics")
+        if not path or not os.path.exists(path):
+            return self._send_json(404, {"error": "Metrics are written when the job completes"})
+        with open(path, 'r', encoding='utf-8') as f:
+            self._send_text(200, f.read(), "application/json")
+
+    @staticmethod
+    def _parse_range(header, size):
+        """(start, end) for a single byte range, None without one, False if unsatisfiable"""
+        if not header:
+            return None
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+        if not match or match.groups() == ("", ""):
+            return None
+        first, last = match.groups()
+        if first == "":
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        if start >= size or start > end:
+            return False
+        return start, end
+
+    @staticmethod
+    def _job_status(job):
+        return {
+            "task_id": job["id"],
+            "repo_url": job["repo_url"],
+            "commit": job["commit_sha"],
+            "status": job["status"],
+            "stage": job["stage"],
+            "progress": job["progress"],
+            "documentation_path": job["documentation_path"],
+            "error": job["error"]
+        }
+
+    def _send_json(self, status, payload, headers=None):
+        self._send_text(status, json.dumps(payload), "application/json", headers)
+
+    def _send_text(self, status, text, content_type, headers=None):
+        data = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+
+def create_server(manager, host="0.0.0.0", port=8000):
+    """Bind the HTTP server to a job manager without starting it"""
+    handler = type("BoundDocsRequestHandler", (DocsRequestHandler,), {"manager": manager})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Codebase Genius documentation API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None, help="concurrent documentation jobs")
+    parser.add_argument("--max-queue", type=int, default=None, help="queued jobs before requests get 429")
+    args = parser.parse_args()
+
+    manager = JobManager(workers=args.workers, max_queue=args.max_queue)
+    server = create_server(manager, args.host, args.port)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        manager.shutdown(wait=False)
+
+
+if __name__ == "__main__":
+    main()
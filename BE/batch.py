@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from parser_utils import ParserUtils, available_cpus, parse_pool
+from pipeline import DEFAULT_OUTPUT_ROOT, DocumentationPipeline, GitCloner, normalize_url
+from summarizer import SummarizationService
+
+MANIFEST_FILE = "batch_manifest.json"
+# Repositories documented at once; parsing is shared across them either way
+DEFAULT_BATCH_WORKERS = 4
+# Stage spans copied from each run's instrumentation into the manifest
+MANIFEST_STAGES = ("clone", "map", "readme", "prioritize", "parse", "graph", "docs")
+
+
+def repo_family(repo_url):
+    """Repositories sharing a name (forks, mirrors) share most of their blobs"""
+    return normalize_url(repo_url).rsplit('/', 1)[-1].lower()
+
+
+def repo_slug(repo_url):
+    """Output directory of a repository in a batch: owner/name, so forks do not collide"""
+    parts = normalize_url(repo_url).replace(':', '/').split('/')
+    return os.path.join(*(parts[-2:] if len(parts) > 1 else parts))
+
+
+class TrackingCloner:
+    """Wraps a cloner and remembers live clones, so a batch can remove any a run left behind"""
+
+    def __init__(self, cloner):
+        self.cloner = cloner
+        self.live = set()
+        self._lock = threading.Lock()
+
+    def head_commit(self, repo_url):
+        return self.cloner.head_commit(repo_url)
+
+    def clone(self, repo_url, strategy=None):
+        local_path = self.cloner.clone(repo_url, strategy)
+        if local_path:
+            with self._lock:
+                self.live.add(local_path)
+        return local_path
+
+    def release(self, local_path):
+        try:
+            self.cloner.release(local_path)
+        finally:
+            with self._lock:
+                self.live.discard(local_path)
+
+    def release_all(self):
+        with self._lock:
+            remaining, self.live = list(self.live), set()
+        for local_path in remaining:
+            self.cloner.release(local_path)
+        return len(remaining)
+
+
+class BatchRunner:
+    """Documents many repositories over shared worker pools.
+
+    Up to ``workers`` repositories run at once on threads, and all of them
+    parse on one shared process pool; each run keeps only a few chunks queued
+    there, so a large repository cannot starve the small ones. Forks of a
+    repository (same name, different owner) share most blobs: the first of a
+    family runs alone and warms the blob-keyed parse cache, and the rest of
+    the family is queued behind it and served from the cache. Clones are
+    released after every run and once more when the batch ends. A manifest
+    of per-repository timings and outcomes is written to the output root.
+    """
+
+    def __init__(self, cloner=None, summarizer=None, parser=None, output_root=DEFAULT_OUTPUT_ROOT,
+                 workers=None, parse_workers=None, clone_strategy=None, budget=None):
+        self.cloner = TrackingCloner(cloner or GitCloner())
+        self.summarizer = summarizer or SummarizationService.shared().summarize
+        self.output_root = output_root
+        self.workers = workers or int(os.environ.get("CODEBASE_GENIUS_BATCH_WORKERS", DEFAULT_BATCH_WORKERS))
+        self.parse_workers = parse_workers
+        self.clone_strategy = clone_strategy
+        self.budget = budget
+        self.parser = parser
+
+    def run(self, repo_urls):
+        """Document every repository; returns the manifest, also saved as batch_manifest.json"""
+        unique = OrderedDict()
+        for url in repo_urls:
+            if url.strip():
+                unique.setdefault(normalize_url(url), url)
+        urls = list(unique.values())
+        started = time.time()
+        records = {}
+
+        # Leaders of each family run first; the rest follow their leader
+        families = OrderedDict()
+        for url in urls:
+            families.setdefault(repo_family(url), []).append(url)
+        ready = deque(members[0] for members in families.values())
+        followers = {members[0]: members[1:] for members in families.values()}
+
+        pool, parser = None, self.parser
+        if parser is None:
+            parse_workers = self.parse_workers or available_cpus()
+            pool = parse_pool(parse_workers)
+            parser = ParserUtils(pool=pool, pool_workers=parse_workers)
+        condition = threading.Condition()
+        running = [0]
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as executor:
+
+                def finished(url, record):
+                    with condition:
+                        records[url] = record
+                        running[0] -= 1
+                        ready.extend(followers.get(url, ()))
+                        condition.notify()
+
+                def run_one(url):
+                    finished(url, self._document(url, parser))
+
+                with condition:
+                    while ready or running[0]:
+                        if ready and running[0] < self.workers:
+                            running[0] += 1
+                            executor.submit(run_one, ready.popleft())
+                        else:
+                            condition.wait()
+        finally:
+            leaked = self.cloner.release_all()
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+        manifest = {
+            "started": started,
+            "finished": time.time(),
+            "workers": self.workers,
+            "clone_strategy": self.clone_strategy,
+            "budget": self.budget,
+            "leaked_clones_removed": leaked,
+            "totals": {
+                "repositories": len(urls),
+                "completed": sum(1 for record in records.values() if record["status"] == "completed"),
+                "failed": sum(1 for record in records.values() if record["status"] == "error"),
+                "seconds": round(time.time() - started, 3)
+            },
+            # In input order, whatever order they ran in
+            "repositories": [records[url] for url in urls]
+        }
+        os.makedirs(self.output_root, exist_ok=True)
+        manifest_path = os.path.join(self.output_root, MANIFEST_FILE)
+        with open(manifest_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(manifest_path + ".tmp", manifest_path)
+        manifest["manifest_path"] = manifest_path
+        return manifest
+
+    def _document(self, repo_url, parser):
+        """Run one repository, returning its manifest record; failures are recorded, not raised"""
+        pipeline = DocumentationPipeline(
+            cloner=self.cloner,
+            summarizer=self.summarizer,
+            parser=parser,
+            output_root=os.path.join(self.output_root, os.path.dirname(repo_slug(repo_url))),
+            workers=self.parse_workers
+        )
+        record = {"url": repo_url, "family": repo_family(repo_url), "status": "completed", "error": None}
+        started = time.perf_counter()
+        try:
+            result = pipeline.run(repo_url, clone_strategy=self.clone_strategy, budget=self.budget)
+        except Exception as e:
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+            print(f"Batch: {repo_url} failed: {record['error']}")
+        else:
+            metrics = result["metrics"].to_dict()
+            outcomes = {}
+            for counter in metrics["counters"]:
+                if counter["name"] == "files_total":
+                    outcomes[counter["labels"]["outcome"]] = counter["value"]
+            record.update(
+                commit=result["commit"],
+                documentation_path=result["documentation_path"],
+                graph_path=result["graph_path"],
+                files=result["files"],
+                coverage_complete=result["coverage"]["complete"],
+                outcomes=outcomes,
+                stages={
+                    span["name"]: round(span["wall"], 3)
+                    for span in metrics["spans"] if span["name"] in MANIFEST_STAGES
+                }
+            )
+        record["seconds"] = round(time.perf_counter() - started, 3)
+        return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Document many repositories in one batch")
+    parser.add_argument("urls", nargs="*", help="repository URLs")
+    parser.add_argument("--file", help="file with one repository URL per line (# starts a comment)")
+    parser.add_argument("--output-root", default=DEFAULT_OUTPUT_ROOT)
+    parser.add_argument("--workers", type=int, default=None, help="repositories documented at once")
+    parser.add_argument("--parse-workers", type=int, default=None, help="processes in the shared parse pool")
+    parser.add_argument("--clone-strategy", choices=("full", "shallow", "partial", "sparse"), default=None)
+    parser.add_argument("--budget-seconds", type=float, default=None, help="time budget per repository")
+    args = parser.parse_args(argv)
+
+    urls = list(args.urls)
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            urls += [line.split('#', 1)[0].strip() for line in f]
+    urls = [url for url in urls if url]
+    if not urls:
+        parser.error("no repository URLs given")
+
+    budget = {"seconds": args.budget_seconds} if args.budget_seconds else None
+    manifest = BatchRunner(
+        output_root=args.output_root,
+        workers=args.workers,
+        parse_workers=args.parse_workers,
+        clone_strategy=args.clone_strategy,
+        budget=budget
+    ).run(urls)
+    totals = manifest["totals"]
+    print(f"{totals['completed']} of {totals['repositories']} repositories documented "
+          f"in {totals['seconds']}s ({totals['failed']} failed); manifest: {manifest['manifest_path']}")
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
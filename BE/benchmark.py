@@ -0,0 +1,620 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from call_graph import CallGraph
+from diagram_generator import DiagramGenerator
+from instrumentation import peak_rss_bytes, start_tracing, stop_tracing
+from parser_utils import ParserUtils
+from pipeline import DirectoryCloner, DocumentationPipeline, build_code_graph
+from summarizer import extractive_summary
+from utils import GitUtils
+
+DEFAULT_WORK_ROOT = os.path.join(".", "outputs", "benchmarks")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+# Relative slowdown (or memory growth) over the baseline that counts as a regression
+DEFAULT_TOLERANCE = 0.25
+# Latency differences below this many milliseconds are noise, whatever the ratio
+LATENCY_FLOOR_MS = 0.5
+# Percentiles are only compared for stages timing at least this many items
+MIN_PERCENTILE_SAMPLES = 100
+MANIFEST_FILE = ".benchmark.json"
+# Bump when generated repositories change, so cached ones are regenerated
+GENERATOR_VERSION = "2"
+
+STAGES = ("file_tree", "parse", "jac_parse", "jac_parse_legacy", "relationships", "call_graph", "diagrams",
+          "end_to_end")
+# Stages timed over the Jac files of a repository only
+JAC_STAGES = ("jac_parse", "jac_parse_legacy")
+
+
+class RepoSpec:
+    """Shape of a synthetic repository; equal specs generate identical repositories"""
+
+    FIELDS = ("files", "depth", "files_per_dir", "jac_ratio", "lines", "classes",
+              "methods", "calls", "imports", "seed")
+
+    def __init__(self, files=1000, depth=3, files_per_dir=40, jac_ratio=0.1, lines=80, classes=2,
+                 methods=3, calls=3, imports=3, seed=0):
+        self.files = files
+        self.depth = depth
+        self.files_per_dir = files_per_dir
+        self.jac_ratio = jac_ratio
+        self.lines = lines
+        self.classes = classes
+        self.methods = methods
+        self.calls = calls
+        self.imports = imports
+        self.seed = seed
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @property
+    def name(self):
+        """Scenario name used as the baseline key"""
+        return ",".join(f"{field}={getattr(self, field)}" for field in self.FIELDS)
+
+    @property
+    def digest(self):
+        key = json.dumps([GENERATOR_VERSION, self.to_dict()], sort_keys=True)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def _directory_for(index, spec):
+    """Nested directory of file index, spreading files_per_dir files over depth levels"""
+    directories = -(-spec.files // spec.files_per_dir)
+    fanout = max(2, int(round(directories ** (1.0 / max(spec.depth, 1)))) + 1)
+    bucket = index // spec.files_per_dir
+    parts = []
+    for level in range(spec.depth):
+        parts.append(f"d{level}_{bucket % fanout}")
+        bucket //= fanout
+    return parts
+
+
+def _python_module(index, spec, rng, modules):
+    """Source of synthetic Python module index, importing from earlier modules"""
+    lines = [f'"""Synthetic module {index}."""', "import os", ""]
+    imported_functions = []
+    imported_classes = []
+    for other in sorted({rng.randrange(index) for _ in range(spec.imports)} if index else ()):
+        module, kind = modules[other]
+        if kind != "python":
+            continue
+        if spec.classes:
+            lines.append(f"from {module} import func_{other}_0, Class_{other}_0")
+            imported_classes.append(f"Class_{other}_0")
+        else:
+            lines.append(f"from {module} import func_{other}_0")
+        imported_functions.append(f"func_{other}_0")
+    lines.append("")
+
+    # File sizes vary around the target, as real modules do
+    target = max(10, int(spec.lines * rng.uniform(0.5, 1.5)))
+    body_lines = spec.calls + 3
+    class_lines = spec.classes * (2 + spec.methods * body_lines)
+    functions = max(1, (target - len(lines) - class_lines) // (body_lines + 1))
+    local_functions = [f"func_{index}_{number}" for number in range(functions)]
+
+    def call_targets():
+        candidates = local_functions + imported_functions
+        return [rng.choice(candidates) for _ in range(spec.calls)]
+
+    for number in range(spec.classes):
+        base = f"({rng.choice(imported_classes)})" if imported_classes and rng.random() < 0.3 else ""
+        lines.append(f"class Class_{index}_{number}{base}:")
+        lines.append(f'    """Synthetic class {number}."""')
+        for method in range(spec.methods):
+            lines.append(f"    def method_{method}(self, value, *args, **kwargs):")
+            lines.append(f'        """Method {method}."""')
+            for target in call_targets():
+                lines.append(f"        value = {target}(value)")
+            if method:
+                lines.append(f"        return self.method_{method - 1}(value)")
+            else:
+                lines.append("        return os.path.join(str(value), 'x')")
+        lines.append("")
+
+    for number, name in enumerate(local_functions):
+        lines.append(f"def {name}(value, factor=2):")
+        lines.append(f'    """Function {number}."""')
+        for target in call_targets():
+            if target != name:
+                lines.append(f"    value = {target}(value)")
+        lines.append("    return value")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def _jac_module(index, spec, rng):
+    """Source of a synthetic Jac module with nodes, edges and walkers"""
+    lines = [f"# Synthetic Jac module {index}", "", "import { helpers } with './helpers.py';", ""]
+    target = max(10, int(spec.lines * rng.uniform(0.5, 1.5)))
+    number = 0
+    while len(lines) < target:
+        lines.append(f"node Node_{index}_{number} {{")
+        lines.append("    has name: str;")
+        lines.append("    has weight: int = 0;")
+        lines.append("}")
+        lines.append("")
+        lines.append(f"edge link_{index}_{number} {{")
+        lines.append("    has strength: float = 1.0;")
+        lines.append("}")
+        lines.append("")
+        lines.append(f"walker walk_{index}_{number} {{")
+        lines.append("    has input limit: int = 10;")
+        lines.append("    has visited: int = 0;")
+        lines.append("    can helpers.score;")
+        lines.append(f"    can visit with Node_{index}_{number} entry {{")
+        lines.append("        self.visited += helpers:score(here.weight);")
+        lines.append("        visit [-->];")
+        lines.append("    }")
+        lines.append("}")
+        lines.append("")
+        number += 1
+    return "\n".join(lines) + "\n"
+
+
+def generate_repository(spec, root=DEFAULT_WORK_ROOT):
+    """Create (or reuse) a committed git repository for spec; returns (path, manifest)"""
+    path = os.path.abspath(os.path.join(root, f"repo-{spec.digest}"))
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return path, json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    rng = random.Random(spec.seed)
+    modules = []
+    total_lines = 0
+    total_bytes = 0
+    jac_files = 0
+    package_dirs = set()
+    for index in range(spec.files):
+        parts = ["pkg"] + _directory_for(index, spec)
+        directory = os.path.join(path, *parts)
+        if directory not in package_dirs:
+            os.makedirs(directory, exist_ok=True)
+            # Every level is a package, so absolute imports resolve
+            for depth in range(1, len(parts) + 1):
+                package = os.path.join(path, *parts[:depth])
+                if package not in package_dirs:
+                    package_dirs.add(package)
+                    open(os.path.join(package, "__init__.py"), 'w').close()
+
+        if rng.random() < spec.jac_ratio:
+            modules.append((None, "jac"))
+            file_name = f"mod_{index}.jac"
+            source = _jac_module(index, spec, rng)
+            jac_files += 1
+        else:
+            modules.append((".".join(parts + [f"mod_{index}"]), "python"))
+            file_name = f"mod_{index}.py"
+            source = _python_module(index, spec, rng, modules)
+        data = source.encode('utf-8')
+        with open(os.path.join(directory, file_name), 'wb') as f:
+            f.write(data)
+        total_lines += source.count("\n")
+        total_bytes += len(data)
+
+    with open(os.path.join(path, "README.md"), 'w', encoding='utf-8') as f:
+        f.write(f"# Synthetic benchmark repository\n\nGenerated from {spec.name}. "
+                "It exists to measure documentation throughput.\n")
+    with open(os.path.join(path, "main.py"), 'w', encoding='utf-8') as f:
+        f.write("from pkg import *\n\n\ndef main():\n    pass\n")
+
+    git = ["git", "-C", path, "-c", "user.name=benchmark", "-c", "user.email=benchmark@localhost"]
+    subprocess.run(["git", "init", "-q", path], check=True)
+    subprocess.run(git + ["add", "-A"], check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "Synthetic benchmark repository"], check=True)
+
+    manifest = {
+        "spec": spec.to_dict(),
+        "source_files": spec.files,
+        "jac_files": jac_files,
+        "lines": total_lines,
+        "bytes": total_bytes
+    }
+    # Written last, so an interrupted generation is never reused
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return path, manifest
+
+
+class Workload:
+    """A generated repository plus the intermediate results later stages start from"""
+
+    def __init__(self, path, manifest, workers=None):
+        self.path = path
+        self.manifest = manifest
+        self.workers = workers
+        self.parser = ParserUtils(cache=False)
+        self._file_tree = None
+        self._analyses = None
+        self._jac_sources = None
+        self._code_graph = None
+
+    @property
+    def file_tree(self):
+        if self._file_tree is None:
+            self._file_tree = GitUtils.annotate_blob_hashes(GitUtils.generate_file_tree(self.path))
+        return self._file_tree
+
+    @property
+    def source_files(self):
+        return [file for file in self.file_tree["files"] if file["extension"] in (".py", ".jac")]
+
+    @property
+    def jac_sources(self):
+        """(path, text) of the Jac files, read once so the Jac parse stage times only the scanner"""
+        if self._jac_sources is None:
+            self._jac_sources = []
+            for file in self.file_tree["files"]:
+                if file["extension"] == ".jac":
+                    with open(file["path"], 'r', encoding='utf-8') as f:
+                        self._jac_sources.append((file["path"], f.read()))
+        return self._jac_sources
+
+    @property
+    def analyses(self):
+        if self._analyses is None:
+            self._analyses = [
+                analysis for _, analysis in self.parser.parse_files(self.source_files, self.workers) if analysis
+            ]
+        return self._analyses
+
+    @property
+    def code_graph(self):
+        if self._code_graph is None:
+            self._code_graph = build_code_graph(self.parser, self.source_files, self.file_tree, self.workers)
+            self._code_graph["call_graph"] = CallGraph.build(self._code_graph, self.path)
+        return self._code_graph
+
+
+def _timed_each(items, call):
+    """Per-item latencies of call(item)"""
+    latencies = []
+    for item in items:
+        started = time.perf_counter()
+        call(item)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def _timed_once(call):
+    started = time.perf_counter()
+    call()
+    return [time.perf_counter() - started]
+
+
+def _consume(chunks):
+    for _ in chunks:
+        pass
+
+
+def stage_file_tree(workload):
+    return _timed_once(lambda: GitUtils.annotate_blob_hashes(GitUtils.generate_file_tree(workload.path)))
+
+
+def stage_parse(workload):
+    # Serial and uncached, so latencies are the parser's own
+    return _timed_each(workload.source_files, workload.parser.parse_file)
+
+
+def stage_jac_parse(workload):
+    return _timed_each(workload.jac_sources, lambda source: workload.parser.jac_parser.parse(source[1], source[0]))
+
+
+def legacy_jac_extract(content, file_path):
+    """The line-prefix Jac extraction JacParser replaced, kept as its reference point
+
+    It only finds lines starting with "walker " or "node ", and rescans up
+    to ten following lines of each for a comment.
+    """
+    analysis = {"functions": [], "classes": [], "imports": [], "file_path": file_path}
+    lines = content.split('\n')
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if line.startswith('walker ') or line.startswith('node '):
+            parts = line.split()
+            if len(parts) < 2:
+                continue
+            docstring = ""
+            for following in lines[i + 1:min(i + 10, len(lines))]:
+                following = following.strip()
+                if not (following.startswith('/*') or following.startswith('#')):
+                    break
+                docstring += following + "\n"
+            record = {"name": parts[1], "docstring": docstring.strip() or None, "line_number": i + 1}
+            if parts[0] == "walker":
+                params = line.split('(', 1)[1].split(')')[0] if '(' in line and ')' in line else ""
+                record["signature"] = line
+                record["parameters"] = [{"name": p.strip(), "type": "Any"} for p in params.split(',') if p.strip()]
+                analysis["functions"].append(record)
+            else:
+                record["methods"] = []
+                record["parent_classes"] = []
+                analysis["classes"].append(record)
+    return analysis
+
+
+def stage_jac_parse_legacy(workload):
+    return _timed_each(workload.jac_sources, lambda source: legacy_jac_extract(source[1], source[0]))
+
+
+def stage_relationships(workload):
+    file_tree = workload.file_tree
+    return _timed_each(workload.analyses, lambda analysis: workload.parser.build_relationships(analysis, file_tree))
+
+
+def stage_call_graph(workload):
+    code_graph = workload.code_graph
+    return _timed_once(lambda: CallGraph.build(code_graph, workload.path))
+
+
+def stage_diagrams(workload):
+    code_graph = workload.code_graph
+    file_tree = workload.file_tree
+    # The first diagram pays for clustering the graph, as it does in a real run
+    code_graph.pop("diagrams", None)
+    return [
+        _timed_once(lambda: _consume(DiagramGenerator.iter_architecture_diagram(file_tree, code_graph)))[0],
+        _timed_once(lambda: _consume(DiagramGenerator.iter_class_diagram(code_graph)))[0],
+        _timed_once(lambda: _consume(DiagramGenerator.iter_function_call_graph(code_graph)))[0],
+        _timed_once(lambda: [_consume(chunks) for _, chunks in DiagramGenerator.iter_package_diagrams(code_graph)])[0]
+    ]
+
+
+def stage_end_to_end(workload):
+    repo_url = "file://benchmark/" + os.path.basename(workload.path)
+    output_root = tempfile.mkdtemp(prefix="benchmark-docs-")
+    pipeline = DocumentationPipeline(
+        cloner=DirectoryCloner({repo_url: workload.path}),
+        summarizer=extractive_summary,
+        parser=ParserUtils(cache=False),
+        output_root=output_root,
+        workers=workload.workers
+    )
+    try:
+        return _timed_once(lambda: pipeline.run(repo_url))
+    finally:
+        shutil.rmtree(output_root, ignore_errors=True)
+
+
+STAGE_FUNCTIONS = {
+    "file_tree": stage_file_tree,
+    "parse": stage_parse,
+    "jac_parse": stage_jac_parse,
+    "jac_parse_legacy": stage_jac_parse_legacy,
+    "relationships": stage_relationships,
+    "call_graph": stage_call_graph,
+    "diagrams": stage_diagrams,
+    "end_to_end": stage_end_to_end
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def measure(stage, workload, repeat=3, trace_memory=True):
+    """Run one stage repeat times after a warm-up run, which also measures memory
+
+    The warm-up runs under tracemalloc, so peak_memory is the peak of Python
+    allocations made by the stage (parse workers of end_to_end excluded) and
+    the timed runs carry no tracing overhead. Tracing is shared with profiled
+    runs through the instrumentation helpers; when one is active the peak is
+    process-wide and is not reset, so that run's own figures stay intact.
+    """
+    function = STAGE_FUNCTIONS[stage]
+    workload.file_tree
+    if stage in ("call_graph", "diagrams"):
+        workload.code_graph
+    elif stage == "relationships":
+        workload.analyses
+    elif stage in JAC_STAGES:
+        workload.jac_sources
+
+    if trace_memory:
+        start_tracing()
+        traced_before = tracemalloc.get_traced_memory()[0]
+        function(workload)
+        peak, _ = stop_tracing()
+        peak_memory = max(peak - traced_before, 0)
+    else:
+        function(workload)
+        peak_memory = None
+
+    walls = []
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        latencies.extend(function(workload))
+        walls.append(time.perf_counter() - started)
+
+    latencies.sort()
+    # The fastest run is the one least disturbed by the rest of the machine
+    wall = min(walls)
+    files = workload.manifest["source_files"]
+    lines = workload.manifest["lines"]
+    if stage in JAC_STAGES:
+        # Throughput of the Jac scanners is over Jac files only
+        files = len(workload.jac_sources)
+        lines = sum(text.count("\n") for _, text in workload.jac_sources)
+    return {
+        "files": files,
+        "lines": lines,
+        "wall_seconds": wall,
+        "files_per_second": files / wall if wall else None,
+        "lines_per_second": lines / wall if wall else None,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+        "samples": len(latencies),
+        "peak_memory": peak_memory
+    }
+
+
+def environment():
+    """Facts about the machine that make results comparable (or not)"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+
+def run_benchmarks(specs, stages=STAGES, repeat=3, workers=None, work_root=DEFAULT_WORK_ROOT,
+                   trace_memory=True, log=print):
+    """Benchmark stages over repositories generated from specs
+
+    Returns {"environment": ..., "results": {"<scenario>/<stage>": metrics}}.
+    """
+    results = {}
+    for spec in specs:
+        started = time.perf_counter()
+        path, manifest = generate_repository(spec, work_root)
+        log(f"{spec.name}: {manifest['source_files']} files, {manifest['lines']} lines "
+            f"({time.perf_counter() - started:.1f}s to prepare)")
+        workload = Workload(path, manifest, workers)
+        for stage in stages:
+            metrics = measure(stage, workload, repeat, trace_memory)
+            results[f"{spec.name}/{stage}"] = metrics
+            log(f"  {stage:<16} {metrics['wall_seconds']:9.3f}s {metrics['files_per_second']:12.0f} files/s "
+                f"{metrics['lines_per_second']:12.0f} lines/s  p50 {metrics['p50_ms']:.2f}ms "
+                f"p99 {metrics['p99_ms']:.2f}ms  peak {_megabytes(metrics['peak_memory'])}")
+        scanner = results.get(f"{spec.name}/jac_parse")
+        legacy = results.get(f"{spec.name}/jac_parse_legacy")
+        if scanner and legacy and legacy["wall_seconds"]:
+            # Both ran on this machine a moment apart, so their ratio travels between machines
+            scanner["legacy_ratio"] = scanner["wall_seconds"] / legacy["wall_seconds"]
+            log(f"  jac_parse takes {scanner['legacy_ratio']:.1f}x the time of the line-prefix scanner it replaced")
+    return {"environment": environment(), "peak_rss": peak_rss_bytes(), "results": results}
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Regressions of report against baseline, as human-readable lines"""
+    regressions = []
+    for key, metrics in sorted(report["results"].items()):
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        if base["files_per_second"] and metrics["files_per_second"] < base["files_per_second"] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {metrics['files_per_second']:.0f} files/s, "
+                               f"baseline {base['files_per_second']:.0f}")
+        for percentile_key in ("p50_ms", "p99_ms"):
+            if metrics["samples"] < MIN_PERCENTILE_SAMPLES:
+                break
+            if (metrics[percentile_key] > base[percentile_key] * (1 + tolerance) and
+                    metrics[percentile_key] - base[percentile_key] > LATENCY_FLOOR_MS):
+                regressions.append(f"{key}: {percentile_key} {metrics[percentile_key]:.2f}ms, "
+                                   f"baseline {base[percentile_key]:.2f}ms")
+        if (metrics.get("legacy_ratio") and base.get("legacy_ratio") and
+                metrics["legacy_ratio"] > base["legacy_ratio"] * (1 + tolerance)):
+            regressions.append(f"{key}: {metrics['legacy_ratio']:.1f}x the line-prefix scanner, "
+                               f"baseline {base['legacy_ratio']:.1f}x")
+        if (metrics["peak_memory"] and base.get("peak_memory") and
+                metrics["peak_memory"] > base["peak_memory"] * (1 + tolerance)):
+            regressions.append(f"{key}: peak memory {_megabytes(metrics['peak_memory'])}, "
+                               f"baseline {_megabytes(base['peak_memory'])}")
+    return regressions
+
+
+def _megabytes(value):
+    return f"{value / (1024 * 1024):.1f}MB" if value is not None else "n/a"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Codebase Genius on synthetic git repositories")
+    parser.add_argument("--files", type=int, nargs="+", default=[1000, 10000],
+                        help="repository sizes in source files, one scenario each")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--files-per-dir", type=int, default=40)
+    parser.add_argument("--jac-ratio", type=float, default=0.1, help="share of Jac files")
+    parser.add_argument("--lines", type=int, default=80, help="average lines per file")
+    parser.add_argument("--classes", type=int, default=2, help="classes per Python file")
+    parser.add_argument("--methods", type=int, default=3, help="methods per class")
+    parser.add_argument("--calls", type=int, default=3, help="calls per function body")
+    parser.add_argument("--imports", type=int, default=3, help="modules imported per Python file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None, help="parse processes for end_to_end")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc warm-up pass")
+    parser.add_argument("--work-root", default=DEFAULT_WORK_ROOT, help="where generated repositories are kept")
+    parser.add_argument("--output", help="write the full report as JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", "--write-baseline", action="store_true",
+                        help="store this run as the new baseline (required when there is none yet)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    specs = [
+        RepoSpec(files=files, depth=args.depth, files_per_dir=args.files_per_dir, jac_ratio=args.jac_ratio,
+                 lines=args.lines, classes=args.classes, methods=args.methods, calls=args.calls,
+                 imports=args.imports, seed=args.seed)
+        for files in args.files
+    ]
+    report = run_benchmarks(specs, args.stages, args.repeat, args.workers, args.work_root, not args.no_memory)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {"environment": report["environment"], "results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline["environment"] = report["environment"]
+        baseline["results"].update(report["results"])
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    # Without something to compare against the gate cannot pass; only --save-baseline runs succeed without one
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 2
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get("environment") != report["environment"]:
+        print(f"Warning: baseline was recorded on {baseline.get('environment')}, "
+              f"this run is on {report['environment']}")
+
+    compared = [key for key in report["results"] if key in baseline["results"]]
+    if not compared:
+        print(f"No result of this run is in the baseline at {args.baseline}; "
+              "run these scenarios with --save-baseline to add them")
+        return 2
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSION ({len(regressions)} over {args.tolerance:.0%} tolerance):")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"\nNo regressions in {len(compared)} compared results")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
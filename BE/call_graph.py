@@ -0,0 +1,450 @@
+import os
+from array import array
+
+# Node kinds
+MODULE = 0
+FUNCTION = 1
+CLASS = 2
+METHOD = 3
+
+# Edge types
+CALLS = 0
+IMPORTS = 1
+INHERITS = 2
+
+KIND_NAMES = ("module", "function", "class", "method")
+EDGE_NAMES = ("calls", "imports", "inherits")
+
+# Re-exports (``from .impl import name`` in a package __init__) followed this deep
+MAX_REEXPORT_DEPTH = 3
+JS_EXTENSIONS = ('.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs')
+
+
+class CallGraph:
+    """Resolved call, import and inheritance graph over integer node ids.
+
+    Every module, function, class and method of the code graph gets an id.
+    Call sites and imports recorded by the parser are resolved through each
+    file's import bindings to definitions in other files, and the resulting
+    typed edges are stored in CSR form: ``offsets[n]:offsets[n + 1]`` slices
+    ``targets`` and ``edge_types`` for the outgoing edges of node ``n``.
+    """
+
+    def __init__(self):
+        self.kinds = array('b')
+        self.names = []
+        self.node_files = array('i')
+        self.lines = array('i')
+        self.files = []
+
+        self.offsets = array('i', [0])
+        self.targets = array('i')
+        self.edge_types = array('b')
+        self._reverse = None
+
+    @staticmethod
+    def build(code_graph, repo_root=None):
+        """Assign ids to every definition and resolve the edges between them"""
+        if repo_root is None and code_graph["nodes"]:
+            repo_root = os.path.dirname(os.path.commonpath(list(code_graph["nodes"])))
+        return _Resolver(code_graph, repo_root).resolve()
+
+    @staticmethod
+    def for_graph(code_graph, repo_root=None):
+        """Return the call graph stored on a code graph, building it on first use"""
+        call_graph = code_graph.get("call_graph")
+        if call_graph is None:
+            call_graph = code_graph["call_graph"] = CallGraph.build(code_graph, repo_root)
+        return call_graph
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def add_node(self, kind, name, file_id, line_number):
+        self.kinds.append(kind)
+        self.names.append(name)
+        self.node_files.append(file_id)
+        self.lines.append(line_number or 0)
+        return len(self.names) - 1
+
+    def set_edges(self, sources, targets, edge_types):
+        """Store edges in CSR form with a counting sort on the source id"""
+        node_count = len(self.names)
+        counts = [0] * (node_count + 1)
+        for source in sources:
+            counts[source + 1] += 1
+        for index in range(node_count):
+            counts[index + 1] += counts[index]
+
+        cursor = counts[:-1]
+        ordered_targets = [0] * len(targets)
+        ordered_types = [0] * len(targets)
+        for source, target, edge_type in zip(sources, targets, edge_types):
+            position = cursor[source]
+            ordered_targets[position] = target
+            ordered_types[position] = edge_type
+            cursor[source] = position + 1
+
+        self.offsets = array('i', counts)
+        self.targets = array('i', ordered_targets)
+        self.edge_types = array('b', ordered_types)
+        self._reverse = None
+
+    def successors(self, node_id, edge_type=None):
+        start, end = self.offsets[node_id], self.offsets[node_id + 1]
+        if edge_type is None:
+            return list(self.targets[start:end])
+        return [self.targets[i] for i in range(start, end) if self.edge_types[i] == edge_type]
+
+    def predecessors(self, node_id, edge_type=None):
+        if self._reverse is None:
+            self._reverse = self._build_reverse()
+        offsets, sources, types = self._reverse
+        start, end = offsets[node_id], offsets[node_id + 1]
+        if edge_type is None:
+            return list(sources[start:end])
+        return [sources[i] for i in range(start, end) if types[i] == edge_type]
+
+    def _build_reverse(self):
+        """CSR over incoming edges, built on first use"""
+        node_count = len(self.names)
+        counts = [0] * (node_count + 1)
+        for target in self.targets:
+            counts[target + 1] += 1
+        for index in range(node_count):
+            counts[index + 1] += counts[index]
+        cursor = counts[:-1]
+        sources = [0] * len(self.targets)
+        types = [0] * len(self.targets)
+        for source in range(node_count):
+            for position in range(self.offsets[source], self.offsets[source + 1]):
+                target = self.targets[position]
+                sources[cursor[target]] = source
+                types[cursor[target]] = self.edge_types[position]
+                cursor[target] += 1
+        return array('i', counts), array('i', sources), array('b', types)
+
+    def iter_edges(self, edge_type=None):
+        """Yield (source, target, edge_type) triples"""
+        offsets, targets, types = self.offsets, self.targets, self.edge_types
+        for source in range(len(self.names)):
+            for position in range(offsets[source], offsets[source + 1]):
+                if edge_type is None or types[position] == edge_type:
+                    yield source, targets[position], types[position]
+
+    def degree(self, node_id):
+        if self._reverse is None:
+            self._reverse = self._build_reverse()
+        in_offsets = self._reverse[0]
+        return (self.offsets[node_id + 1] - self.offsets[node_id] +
+                in_offsets[node_id + 1] - in_offsets[node_id])
+
+    def file_of(self, node_id):
+        return self.files[self.node_files[node_id]]
+
+    def describe(self, node_id):
+        return {
+            "id": node_id,
+            "kind": KIND_NAMES[self.kinds[node_id]],
+            "name": self.names[node_id],
+            "file": self.file_of(node_id),
+            "line_number": self.lines[node_id]
+        }
+
+    def module_coupling(self):
+        """Count cross-file edges per directory, ranked by coupling"""
+        coupling = {}
+        node_files = self.node_files
+        for source, target, _ in self.iter_edges():
+            source_file, target_file = node_files[source], node_files[target]
+            if source_file == target_file:
+                continue
+            for file_id in (source_file, target_file):
+                directory = os.path.dirname(self.files[file_id])
+                coupling[directory] = coupling.get(directory, 0) + 1
+        return sorted(coupling.items(), key=lambda item: item[1], reverse=True)
+
+    def stats(self):
+        counts = [0, 0, 0]
+        for edge_type in self.edge_types:
+            counts[edge_type] += 1
+        return {
+            "nodes": len(self.names),
+            "edges": len(self.targets),
+            "calls": counts[CALLS],
+            "imports": counts[IMPORTS],
+            "inherits": counts[INHERITS]
+        }
+
+
+class _Resolver:
+    """Builds a CallGraph from the per-file analyses of a code graph"""
+
+    def __init__(self, code_graph, repo_root):
+        self.code_graph = code_graph
+        self.repo_root = repo_root
+        self.graph = CallGraph()
+
+        self.module_ids = {}        # dotted module name -> module node id
+        self.module_names = {}      # file id -> dotted module name
+        self.file_modules = array('i')  # file id -> module node id
+        self.suffixes = {}          # trailing dotted suffix -> module name, None if ambiguous
+        self.top_level = {}         # file id -> {name: node id}
+        self.class_members = {}     # class node id -> {method or nested class name: node id}
+        self.class_parents = {}     # class node id -> [parent names]
+        self.bindings = {}          # file id -> {local name: binding}
+        self.pending_calls = []     # (caller id, file id, class id or -1, callee string)
+
+    def resolve(self):
+        graph = self.graph
+        for file_path, file_data in self.code_graph["nodes"].items():
+            self._add_file(file_path, file_data)
+        for file_id in range(len(graph.files)):
+            self._bind_imports(file_id)
+
+        sources, targets, edge_types = array('i'), array('i'), array('b')
+
+        for file_id, bindings in self.bindings.items():
+            module_id = self.file_modules[file_id]
+            seen = set()
+            for binding in bindings.values():
+                target = self._binding_module(binding)
+                if target is not None and target != module_id and target not in seen:
+                    seen.add(target)
+                    sources.append(module_id)
+                    targets.append(target)
+                    edge_types.append(IMPORTS)
+
+        for class_id, parents in self.class_parents.items():
+            file_id = graph.node_files[class_id]
+            for parent in parents:
+                target = self._resolve_dotted(file_id, parent.split('.'))
+                if target is not None and graph.kinds[target] == CLASS:
+                    sources.append(class_id)
+                    targets.append(target)
+                    edge_types.append(INHERITS)
+
+        # Calls are queued caller by caller; distinct call strings that
+        # resolve to the same definition give one edge
+        previous_caller, seen = -1, set()
+        for caller_id, file_id, class_id, callee in self.pending_calls:
+            if caller_id != previous_caller:
+                previous_caller, seen = caller_id, set()
+            target = self._resolve_call(file_id, class_id, callee)
+            if target is not None and target != caller_id and target not in seen:
+                seen.add(target)
+                sources.append(caller_id)
+                targets.append(target)
+                edge_types.append(CALLS)
+
+        graph.set_edges(sources, targets, edge_types)
+        return graph
+
+    def _add_file(self, file_path, file_data):
+        graph = self.graph
+        file_id = len(graph.files)
+        graph.files.append(file_path)
+
+        module_name = self._module_name(file_path)
+        self.module_names[file_id] = module_name
+        module_id = graph.add_node(MODULE, module_name, file_id, 1)
+        self.file_modules.append(module_id)
+        # a.py and a.js (or a/__init__.py and a.py) share a name; the first wins
+        if module_name not in self.module_ids:
+            self.module_ids[module_name] = module_id
+            parts = module_name.split('.')
+            for start in range(1, len(parts)):
+                suffix = '.'.join(parts[start:])
+                self.suffixes[suffix] = None if suffix in self.suffixes else module_name
+
+        top_level = self.top_level[file_id] = {}
+        for func in file_data.get("functions", []):
+            func_id = graph.add_node(FUNCTION, func["name"], file_id, func.get("line_number"))
+            top_level.setdefault(func["name"], func_id)
+            for callee in func.get("calls") or []:
+                self.pending_calls.append((func_id, file_id, -1, callee))
+
+        classes = {}
+        for cls in file_data.get("classes", []):
+            class_id = graph.add_node(CLASS, cls["name"], file_id, cls.get("line_number"))
+            classes.setdefault(cls["name"], class_id)
+            outer, _, inner = cls["name"].rpartition('.')
+            if not outer:
+                top_level.setdefault(cls["name"], class_id)
+            elif outer in classes:
+                # Outer.Inner is reached as a member of Outer; listed after it
+                self.class_members[classes[outer]].setdefault(inner, class_id)
+            members = self.class_members[class_id] = {}
+            self.class_parents[class_id] = cls.get("parent_classes", [])
+            for method in cls.get("methods", []):
+                method_id = graph.add_node(METHOD, cls["name"] + "." + method["name"], file_id,
+                                           method.get("line_number"))
+                members.setdefault(method["name"], method_id)
+                for callee in method.get("calls") or []:
+                    self.pending_calls.append((method_id, file_id, class_id, callee))
+
+        self.bindings[file_id] = file_data.get("imports", [])
+
+    def _module_name(self, file_path):
+        """Dotted module name of a file relative to the repository root"""
+        rel_path = os.path.relpath(file_path, self.repo_root) if self.repo_root else file_path
+        stem, extension = os.path.splitext(rel_path.replace(os.sep, '/'))
+        if extension == '.py' and stem.endswith('/__init__'):
+            stem = stem[:-len('/__init__')]
+        return stem.replace('/', '.').strip('.') or "__init__"
+
+    def _bind_imports(self, file_id):
+        """Turn a file's import records into local name bindings"""
+        module_name = self.module_names[file_id]
+        file_path = self.graph.files[file_id]
+        is_package = os.path.basename(file_path) == "__init__.py"
+        bindings = {}
+
+        for import_stmt in self.bindings[file_id]:
+            module = import_stmt.get("module") or ""
+            names = import_stmt.get("names") or []
+            aliases = import_stmt.get("aliases") or [None] * len(names)
+            level = import_stmt.get("level", 0)
+
+            if not level and (module.startswith('.') or module.startswith('/')):
+                # JavaScript/TypeScript path import
+                target = self._resolve_path_import(file_path, module)
+                if target is None:
+                    continue
+                for name, alias in zip(names, aliases):
+                    if name == module:
+                        # Default, namespace or side-effect import of the module itself
+                        bindings[alias or os.path.splitext(os.path.basename(module))[0]] = ("module", target)
+                    else:
+                        bindings[alias or name] = ("from", target, name)
+                continue
+
+            if level:
+                package = module_name.split('.') if is_package else module_name.split('.')[:-1]
+                package = package[:len(package) - (level - 1)] if level > 1 else package
+                module = '.'.join(package + ([module] if module else []))
+
+            from_import = import_stmt.get("from")
+            if from_import is None:
+                # Records saved before parsers marked from-imports
+                from_import = level or names != [import_stmt.get("module")]
+            for name, alias in zip(names, aliases):
+                if not from_import:
+                    # import a.b.c binds "a"; import a.b.c as x binds "x" to a.b.c
+                    if alias:
+                        bindings[alias] = ("module", module)
+                    else:
+                        bindings[name.split('.')[0]] = ("module", name.split('.')[0])
+                elif name != "*":
+                    bindings[alias or name] = ("from", module, name)
+
+        self.bindings[file_id] = bindings
+
+    def _resolve_path_import(self, file_path, module):
+        base = os.path.normpath(os.path.join(os.path.dirname(file_path), module))
+        stem = os.path.splitext(base)[0] if base.endswith(JS_EXTENSIONS) else base
+        for candidate in (stem, os.path.join(stem, "index")):
+            name = self._module_name(candidate + ".js")
+            if name in self.module_ids:
+                return name
+        return None
+
+    def _find_module(self, module_name):
+        if module_name in self.module_ids:
+            return module_name
+        # src/ layouts and vendored roots: accept an unambiguous suffix match
+        return self.suffixes.get(module_name)
+
+    def _binding_module(self, binding):
+        """Module node id an import binding refers to, for import edges"""
+        if binding[0] == "module":
+            module = self._find_module(binding[1])
+        else:
+            module = self._find_module(binding[1] + "." + binding[2]) or self._find_module(binding[1])
+        return self.module_ids[module] if module else None
+
+    def _resolve_binding(self, binding, depth=0):
+        """Resolve a binding to a node id (symbol or module)"""
+        if binding[0] == "module":
+            module = self._find_module(binding[1])
+            return self.module_ids[module] if module else None
+
+        _, module_name, name = binding
+        module = self._find_module(module_name)
+        if module:
+            module_id = self.module_ids[module]
+            file_id = self.graph.node_files[module_id]
+            symbol = self.top_level[file_id].get(name)
+            if symbol is not None:
+                return symbol
+            # Re-exported through the module's own imports
+            inner = self.bindings[file_id].get(name)
+            if inner is not None and depth < MAX_REEXPORT_DEPTH:
+                resolved = self._resolve_binding(inner, depth + 1)
+                if resolved is not None:
+                    return resolved
+        submodule = self._find_module(module_name + "." + name)
+        return self.module_ids[submodule] if submodule else None
+
+    def _resolve_dotted(self, file_id, parts):
+        """Resolve a dotted reference as seen from a file"""
+        head = parts[0]
+        target = self.top_level[file_id].get(head)
+        if target is None:
+            binding = self.bindings[file_id].get(head)
+            if binding is None:
+                return None
+            target = self._resolve_binding(binding)
+        return self._walk_members(target, parts[1:])
+
+    def _walk_members(self, target, rest):
+        graph = self.graph
+        for part in rest:
+            if target is None:
+                return None
+            kind = graph.kinds[target]
+            if kind == MODULE:
+                file_id = graph.node_files[target]
+                symbol = self.top_level[file_id].get(part)
+                if symbol is None:
+                    binding = self.bindings[file_id].get(part)
+                    symbol = self._resolve_binding(binding) if binding else None
+                if symbol is None:
+                    submodule = self._find_module(graph.names[target] + "." + part)
+                    symbol = self.module_ids[submodule] if submodule else None
+                target = symbol
+            elif kind == CLASS:
+                target = self._find_method(target, part)
+            else:
+                return None
+        return target
+
+    def _find_method(self, class_id, name, depth=0):
+        """Method lookup through the class and its resolvable ancestors"""
+        method = self.class_members.get(class_id, {}).get(name)
+        if method is not None or depth >= 8:
+            return method
+        file_id = self.graph.node_files[class_id]
+        for parent in self.class_parents.get(class_id, []):
+            parent_id = self._resolve_dotted(file_id, parent.split('.'))
+            if parent_id is not None and parent_id != class_id and self.graph.kinds[parent_id] == CLASS:
+                method = self._find_method(parent_id, name, depth + 1)
+                if method is not None:
+                    return method
+        return None
+
+    def _resolve_call(self, file_id, class_id, callee):
+        parts = callee.split('.')
+        if parts[0] in ("self", "cls", "this") and class_id >= 0:
+            if len(parts) == 2:
+                return self._find_method(class_id, parts[1])
+            return None
+        target = self._resolve_dotted(file_id, parts)
+        # Calling a module is never a real call site
+        if target is not None and self.graph.kinds[target] == MODULE:
+            return None
+        return target
@@ -1,76 +1,512 @@
+import hashlib
+import os
+import re
+
+from call_graph import CALLS, CLASS, FUNCTION, INHERITS, METHOD, MODULE, CallGraph
+
+try:
+    import graphviz
+except ImportError:
+    graphviz = None
+
+# Budgets per diagram; beyond these a renderer can no longer lay the diagram out
+DEFAULT_MAX_NODES = 40
+DEFAULT_MAX_EDGES = 80
+MAX_METHODS_PER_CLASS = 8
+# Share of a drill-down's node budget given to neighbouring packages
+EXTERNAL_NODE_SHARE = 0.25
+# Label propagation passes when grouping by community
+COMMUNITY_ROUNDS = 10
+OTHER_CLUSTER = "(other packages)"
+
+
+def _node_id(prefix, key):
+    """Stable Mermaid/dot identifier derived from a path-like key, unique per key"""
+    readable = re.sub(r'\W+', '_', key.rsplit('/', 1)[-1])[:32].strip('_')
+    return f"{prefix}_{readable}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _label(text):
+    return text.replace('"', "'")
+
+
+class Diagram:
+    """A budgeted flowchart: nodes grouped into boxes and weighted edges"""
+
+    def __init__(self, title):
+        self.title = title
+        self.nodes = []      # (node id, label, group id or None)
+        self.groups = {}     # group id -> label
+        self.edges = []      # (source id, target id, label or None)
+        self.omitted_nodes = 0
+        self.omitted_edges = 0
+
+    def iter_mermaid(self, direction="TD"):
+        yield f"graph {direction}\n"
+        grouped = {}
+        for node_id, label, group in self.nodes:
+            grouped.setdefault(group, []).append((node_id, label))
+        for group, nodes in grouped.items():
+            indent = "    "
+            if group is not None:
+                yield f"    subgraph {group}[\"{_label(self.groups[group])}\"]\n"
+                indent = "        "
+            for node_id, label in nodes:
+                yield f"{indent}{node_id}[\"{_label(label)}\"]\n"
+            if group is not None:
+                yield "    end\n"
+        for source, target, label in self.edges:
+            yield f"    {source} -->|{label}| {target}\n" if label else f"    {source} --> {target}\n"
+        if self.omitted_nodes or self.omitted_edges:
+            yield f"    %% {self.omitted_nodes} nodes and {self.omitted_edges} edges left out to fit the budget\n"
+
+    def to_graphviz(self, direction="TB"):
+        """graphviz.Digraph of the same diagram; requires the graphviz package"""
+        if graphviz is None:
+            raise RuntimeError("The graphviz package is required to render diagrams")
+        dot = graphviz.Digraph(name=self.title, graph_attr={"rankdir": direction, "label": self.title})
+        grouped = {}
+        for node_id, label, group in self.nodes:
+            grouped.setdefault(group, []).append((node_id, label))
+        for group, nodes in grouped.items():
+            if group is None:
+                for node_id, label in nodes:
+                    dot.node(node_id, label, shape="box")
+                continue
+            # dot only draws subgraphs named cluster_* as boxes
+            with dot.subgraph(name="cluster_" + group) as box:
+                box.attr(label=self.groups[group])
+                for node_id, label in nodes:
+                    box.node(node_id, label, shape="box")
+        for source, target, label in self.edges:
+            dot.edge(source, target, label=label or "")
+        return dot
+
+
+class DiagramEngine:
+    """Diagrams of a code graph that stay within node and edge budgets.
+
+    The call graph is grouped once into clusters: directories collapsed to
+    the deepest level with at most ``max_nodes`` distinct packages, or, with
+    ``group_by="community"``, packages merged by label propagation over their
+    cross-package edges. Every diagram keeps the highest-degree nodes and
+    heaviest edges that fit the budget and notes what it left out; per-cluster
+    drill-down diagrams show the definitions inside one cluster.
+    """
+
+    def __init__(self, code_graph, repo_root=None, max_nodes=DEFAULT_MAX_NODES, max_edges=DEFAULT_MAX_EDGES,
+                 group_by="package"):
+        self.code_graph = code_graph
+        self.graph = CallGraph.for_graph(code_graph, repo_root)
+        self.max_nodes = max_nodes
+        self.max_edges = max_edges
+        files = self.graph.files
+        if repo_root is None and files:
+            repo_root = os.path.dirname(os.path.commonpath(files))
+        self.root = repo_root
+        self.relative_files = [
+            os.path.relpath(path, repo_root).replace(os.sep, '/') if repo_root else path for path in files
+        ]
+
+        self._degrees()
+        if group_by == "community":
+            labels = self._community_labels()
+        else:
+            labels = self._package_labels()
+        self._cluster(labels)
+
+    @staticmethod
+    def for_graph(code_graph, repo_root=None):
+        """Return the engine stored on a code graph, rebuilding it when the call graph changed"""
+        engine = code_graph.get("diagrams")
+        if engine is None or engine.graph is not code_graph.get("call_graph"):
+            engine = code_graph["diagrams"] = DiagramEngine(code_graph, repo_root)
+        return engine
+
+    def _degrees(self):
+        """Total and call-only degree of every node, from one pass over the edges"""
+        graph = self.graph
+        degree = [0] * len(graph)
+        call_degree = [0] * len(graph)
+        for source, target, edge_type in graph.iter_edges():
+            degree[source] += 1
+            degree[target] += 1
+            if edge_type == CALLS:
+                call_degree[source] += 1
+                call_degree[target] += 1
+        self.degree = degree
+        self.call_degree = call_degree
+
+    def _file_edges(self):
+        """Undirected cross-file edge counts, keyed by (file id, file id)"""
+        node_files = self.graph.node_files
+        weights = {}
+        for source, target, _ in self.graph.iter_edges():
+            pair = (node_files[source], node_files[target])
+            if pair[0] != pair[1]:
+                key = pair if pair[0] < pair[1] else (pair[1], pair[0])
+                weights[key] = weights.get(key, 0) + 1
+        return weights
+
+    def _package_labels(self):
+        """Directory of each file, truncated to the deepest level that fits the node budget"""
+        parts = [path.split('/')[:-1] for path in self.relative_files]
+        max_depth = max((len(part) for part in parts), default=0)
+        depth = max_depth
+        while depth > 1 and len({tuple(part[:depth]) for part in parts}) > self.max_nodes:
+            depth -= 1
+        return ["/".join(part[:depth]) or "." for part in parts]
+
+    def _community_labels(self):
+        """Leaf packages merged by weighted label propagation (a modularity heuristic)"""
+        packages = ["/".join(path.split('/')[:-1]) or "." for path in self.relative_files]
+        neighbours = {}
+        for (first, second), weight in self._file_edges().items():
+            first, second = packages[first], packages[second]
+            if first == second:
+                continue
+            for a, b in ((first, second), (second, first)):
+                row = neighbours.setdefault(a, {})
+                row[b] = row.get(b, 0) + weight
+
+        label = {package: package for package in set(packages)}
+        # Heavily connected packages settle first, which keeps the result deterministic
+        order = sorted(label, key=lambda package: (-sum(neighbours.get(package, {}).values()), package))
+        for _ in range(COMMUNITY_ROUNDS):
+            changed = False
+            for package in order:
+                scores = {}
+                for neighbour, weight in neighbours.get(package, {}).items():
+                    scores[label[neighbour]] = scores.get(label[neighbour], 0) + weight
+                if not scores:
+                    continue
+                best = max(scores.values())
+                if scores.get(label[package], 0) == best:
+                    continue
+                label[package] = min(candidate for candidate, score in scores.items() if score == best)
+                changed = True
+            if not changed:
+                break
+
+        members = {}
+        for package in order:
+            members.setdefault(label[package], []).append(package)
+        # A community is named after its most connected package
+        names = {
+            community: packages_in[0] + (f" (+{len(packages_in) - 1})" if len(packages_in) > 1 else "")
+            for community, packages_in in members.items()
+        }
+        return [names[label[package]] for package in packages]
+
+    def _cluster(self, labels):
+        """Assign cluster ids to files, folding the least connected clusters beyond the budget"""
+        weights = self._file_edges()
+
+        def aggregate(file_clusters, count):
+            edges = {}
+            connectivity = [0] * count
+            for (first, second), weight in weights.items():
+                a, b = file_clusters[first], file_clusters[second]
+                if a != b:
+                    key = (a, b) if a < b else (b, a)
+                    edges[key] = edges.get(key, 0) + weight
+                    connectivity[a] += weight
+                    connectivity[b] += weight
+            return edges, connectivity
+
+        names = sorted(set(labels))
+        ids = {name: index for index, name in enumerate(names)}
+        file_clusters = [ids[label] for label in labels]
+        edges, connectivity = aggregate(file_clusters, len(names))
+
+        sizes = [0] * len(names)
+        for node_id, file_id in enumerate(self.graph.node_files):
+            if self.graph.kinds[node_id] != MODULE:
+                sizes[file_clusters[file_id]] += 1
+        ranked = sorted(range(len(names)), key=lambda cluster: (-connectivity[cluster], -sizes[cluster], names[cluster]))
+
+        if len(names) > self.max_nodes:
+            kept = ranked[:self.max_nodes - 1]
+            remap = {old: new for new, old in enumerate(kept)}
+            other = len(kept)
+            names = [names[old] for old in kept] + [OTHER_CLUSTER]
+            file_clusters = [remap.get(cluster, other) for cluster in file_clusters]
+            edges, connectivity = aggregate(file_clusters, len(names))
+            ranked = list(range(len(names)))
+
+        self.cluster_names = names
+        self.file_clusters = file_clusters
+        self.cluster_edges = edges
+        self.cluster_connectivity = connectivity
+        self.cluster_files = [[] for _ in names]
+        for file_id, cluster in enumerate(file_clusters):
+            self.cluster_files[cluster].append(file_id)
+        self.ranked_clusters = [cluster for cluster in ranked if self.cluster_files[cluster]]
+
+    def clusters(self):
+        """(cluster id, name, file count) from the most to the least connected"""
+        return [(cluster, self.cluster_names[cluster], len(self.cluster_files[cluster]))
+                for cluster in self.ranked_clusters]
+
+    def cluster_of(self, name):
+        """Cluster id of a package or community name, or None"""
+        for cluster, cluster_name in enumerate(self.cluster_names):
+            if cluster_name == name:
+                return cluster
+        return None
+
+    def _cluster_id(self, cluster):
+        return _node_id("c", self.cluster_names[cluster])
+
+    def _definition_id(self, node_id):
+        graph = self.graph
+        return _node_id("d", f"{self.relative_files[graph.node_files[node_id]]}:{graph.names[node_id]}:{graph.lines[node_id]}")
+
+    def overview(self):
+        """Clusters and the number of edges between them"""
+        diagram = Diagram("Package overview")
+        kept = self.ranked_clusters[:self.max_nodes]
+        diagram.omitted_nodes = len(self.ranked_clusters) - len(kept)
+        for cluster in kept:
+            files = len(self.cluster_files[cluster])
+            diagram.nodes.append((self._cluster_id(cluster),
+                                  f"{self.cluster_names[cluster]} ({files} files)", None))
+        selected = set(kept)
+        self._add_weighted_edges(diagram, {
+            pair: weight for pair, weight in self.cluster_edges.items()
+            if pair[0] in selected and pair[1] in selected
+        }, self._cluster_id)
+        return diagram
+
+    def _add_weighted_edges(self, diagram, weights, node_id):
+        """Heaviest edges within the edge budget, labelled with their weight"""
+        ranked = sorted(weights.items(), key=lambda item: (-item[1], item[0]))
+        for (source, target), weight in ranked[:self.max_edges]:
+            diagram.edges.append((node_id(source), node_id(target), str(weight)))
+        diagram.omitted_edges += max(len(ranked) - self.max_edges, 0)
+
+    def call_graph(self, cluster=None):
+        """Most connected functions and methods joined by resolved calls, boxed by file"""
+        graph = self.graph
+        files = self.cluster_files[cluster] if cluster is not None else None
+        candidates = [
+            node_id for node_id in self._nodes_in(files)
+            if graph.kinds[node_id] in (FUNCTION, METHOD) and self.call_degree[node_id]
+        ]
+        diagram = Diagram("Function call graph")
+        selected = self._top(candidates, self.call_degree, diagram)
+        for node_id in selected:
+            file_id = graph.node_files[node_id]
+            group = _node_id("f", self.relative_files[file_id])
+            diagram.groups[group] = self.relative_files[file_id]
+            diagram.nodes.append((self._definition_id(node_id), graph.names[node_id], group))
+
+        edges = []
+        for node_id in selected:
+            for target in graph.successors(node_id, CALLS):
+                if target in selected:
+                    edges.append((node_id, target))
+        # Edges between the busiest nodes first
+        edges.sort(key=lambda edge: -(self.call_degree[edge[0]] + self.call_degree[edge[1]]))
+        for source, target in edges[:self.max_edges]:
+            diagram.edges.append((self._definition_id(source), self._definition_id(target), None))
+        diagram.omitted_edges += max(len(edges) - self.max_edges, 0)
+        return diagram
+
+    def package_diagram(self, cluster):
+        """Drill-down into one cluster: its top definitions and its links to other clusters"""
+        graph = self.graph
+        diagram = Diagram(f"Package {self.cluster_names[cluster]}")
+        candidates = [
+            node_id for node_id in self._nodes_in(self.cluster_files[cluster])
+            if graph.kinds[node_id] != MODULE
+        ]
+        external_budget = max(int(self.max_nodes * EXTERNAL_NODE_SHARE), 1)
+        selected = self._top(candidates, self.degree, diagram, self.max_nodes - external_budget)
+        for node_id in selected:
+            file_id = graph.node_files[node_id]
+            group = _node_id("f", self.relative_files[file_id])
+            diagram.groups[group] = self.relative_files[file_id]
+            diagram.nodes.append((self._definition_id(node_id), graph.names[node_id], group))
+
+        # External endpoints are ("c", cluster id); definitions inside are ("n", node id)
+        internal = []
+        external = {}
+        file_clusters = self.file_clusters
+        for node_id in selected:
+            for target in graph.successors(node_id):
+                if target in selected:
+                    internal.append((node_id, target))
+                else:
+                    other = file_clusters[graph.node_files[target]]
+                    if other != cluster:
+                        key = (("n", node_id), ("c", other))
+                        external[key] = external.get(key, 0) + 1
+            for source in graph.predecessors(node_id):
+                other = file_clusters[graph.node_files[source]]
+                if other != cluster:
+                    key = (("c", other), ("n", node_id))
+                    external[key] = external.get(key, 0) + 1
+
+        # Neighbouring clusters are collapsed to one node each, heaviest first
+        neighbour_weight = {}
+        for (first, second), weight in external.items():
+            other = first[1] if first[0] == "c" else second[1]
+            neighbour_weight[other] = neighbour_weight.get(other, 0) + weight
+        neighbours = sorted(neighbour_weight, key=lambda other: (-neighbour_weight[other], other))
+        kept_neighbours = set(neighbours[:external_budget])
+        diagram.omitted_nodes += len(neighbours) - len(kept_neighbours)
+        for other in neighbours[:external_budget]:
+            diagram.nodes.append((self._cluster_id(other), self.cluster_names[other], None))
+
+        internal.sort(key=lambda edge: -(self.degree[edge[0]] + self.degree[edge[1]]))
+        budget = self.max_edges
+        for source, target in internal[:budget]:
+            diagram.edges.append((self._definition_id(source), self._definition_id(target), None))
+        diagram.omitted_edges += max(len(internal) - budget, 0)
+        budget = max(budget - len(internal), 0)
+
+        def endpoint(node):
+            kind, value = node
+            return self._cluster_id(value) if kind == "c" else self._definition_id(value)
+
+        ranked = sorted(
+            ((pair, weight) for pair, weight in external.items()
+             if (pair[0][0] == "n" or pair[0][1] in kept_neighbours) and
+             (pair[1][0] == "n" or pair[1][1] in kept_neighbours)),
+            key=lambda item: (-item[1], item[0])
+        )
+        diagram.omitted_edges += len(external) - len(ranked)
+        for (source, target), weight in ranked[:budget]:
+            diagram.edges.append((endpoint(source), endpoint(target), str(weight) if weight > 1 else None))
+        diagram.omitted_edges += max(len(ranked) - budget, 0)
+        return diagram
+
+    def _nodes_in(self, files):
+        """Node ids of the given file ids, or of every file"""
+        if files is None:
+            return range(len(self.graph))
+        files = set(files)
+        node_files = self.graph.node_files
+        return [node_id for node_id in range(len(self.graph)) if node_files[node_id] in files]
+
+    def _top(self, candidates, degree, diagram, budget=None):
+        """The budget highest-degree candidates, as a set; the rest are counted as omitted"""
+        budget = self.max_nodes if budget is None else budget
+        ranked = sorted(candidates, key=lambda node_id: (-degree[node_id], node_id))
+        diagram.omitted_nodes += max(len(ranked) - budget, 0)
+        return set(ranked[:budget])
+
+    def iter_class_diagram(self, cluster=None):
+        """Yield a Mermaid class diagram of the most connected classes"""
+        graph = self.graph
+        files = self.cluster_files[cluster] if cluster is not None else None
+        candidates = [node_id for node_id in self._nodes_in(files) if graph.kinds[node_id] == CLASS]
+        ranked = sorted(candidates, key=lambda node_id: (-self.degree[node_id], node_id))
+        selected = ranked[:self.max_nodes]
+        chosen = set(selected)
+        class_infos = self._class_infos()
+
+        yield "classDiagram\n"
+        for node_id in selected:
+            yield f"    class {self._definition_id(node_id)}[\"{_label(graph.names[node_id])}\"] {{\n"
+            methods = class_infos.get(node_id, {}).get("methods", [])
+            for method in methods[:MAX_METHODS_PER_CLASS]:
+                yield f"        {method['signature']}\n"
+            if len(methods) > MAX_METHODS_PER_CLASS:
+                yield f"        ...{len(methods) - MAX_METHODS_PER_CLASS} more methods\n"
+            yield "    }\n"
+
+        inheritance = [
+            (node_id, parent) for node_id in selected
+            for parent in graph.successors(node_id, INHERITS) if parent in chosen
+        ]
+        for child, parent in inheritance[:self.max_edges]:
+            yield f"    {self._definition_id(parent)} <|-- {self._definition_id(child)}\n"
+        omitted_nodes = len(ranked) - len(selected)
+        omitted_edges = max(len(inheritance) - self.max_edges, 0)
+        if omitted_nodes or omitted_edges:
+            yield f"    %% {omitted_nodes} classes and {omitted_edges} edges left out to fit the budget\n"
+
+    def _class_infos(self):
+        """Class node id -> the parser's class record, matched by file, name and line"""
+        graph = self.graph
+        by_position = {}
+        for node_id in range(len(graph)):
+            if graph.kinds[node_id] == CLASS:
+                by_position[(graph.node_files[node_id], graph.names[node_id], graph.lines[node_id])] = node_id
+        infos = {}
+        nodes = self.code_graph["nodes"]
+        for file_id, path in enumerate(graph.files):
+            for cls in nodes.get(path, {}).get("classes", []):
+                node_id = by_position.get((file_id, cls["name"], cls.get("line_number") or 0))
+                if node_id is not None:
+                    infos[node_id] = cls
+        return infos
+
+    def render_svg(self, diagram, path):
+        """Lay a diagram out with Graphviz and write it as SVG; needs the dot executable"""
+        data = diagram.to_graphviz().pipe(format="svg")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def save_svgs(self, output_dir, drilldowns=10):
+        """Write the overview, call graph and top drill-downs as SVG files
+
+        Returns the written paths; empty when graphviz or dot is unavailable.
+        """
+        if graphviz is None:
+            return []
+        diagrams = [("overview", self.overview()), ("calls", self.call_graph())]
+        for cluster in self.ranked_clusters[:drilldowns]:
+            name = re.sub(r'[^\w.-]+', '_', self.cluster_names[cluster]).strip('_') or "root"
+            diagrams.append((os.path.join("packages", name), self.package_diagram(cluster)))
+        paths = []
+        try:
+            for name, diagram in diagrams:
+                paths.append(self.render_svg(diagram, os.path.join(output_dir, name + ".svg")))
+        except graphviz.ExecutableNotFound:
+            print("Graphviz 'dot' was not found; SVG diagrams were skipped")
+        return paths
+
+
 class DiagramGenerator:
-    
+
     @staticmethod
     def generate_class_diagram(code_graph):
         """Generate Mermaid class diagram"""
-        mermaid_code = "classDiagram\n"
-        
-        classes_added = set()
-        
-        for file_path, file_data in code_graph.nodes.items():
-            for class_info in file_data.get("classes", []):
-                class_name = class_info["name"]
-                if class_name not in classes_added:
-                    classes_added.add(class_name)
-                    
-                    # Add class definition
-                    mermaid_code += f"    class {class_name} {{\n"
-                    
-                    # Add methods
-                    for method in class_info.get("methods", []):
-                        mermaid_code += f"        {method['signature']}\n"
-                    
-                    mermaid_code += "    }\n"
-                    
-                    # Add inheritance
-                    for parent in class_info.get("parent_classes", []):
-                        mermaid_code += f"    {parent} <|-- {class_name}\n"
-        
-        return mermaid_code
-    
+        return "".join(DiagramGenerator.iter_class_diagram(code_graph))
+
+    @staticmethod
+    def iter_class_diagram(code_graph):
+        """Yield the Mermaid class diagram line by line"""
+        yield from DiagramEngine.for_graph(code_graph).iter_class_diagram()
+
     @staticmethod
     def generate_function_call_graph(code_graph):
         """Generate Mermaid function call graph"""
-        mermaid_code = "graph TD\n"
-        
-        # Group functions by file
-        file_functions = {}
-        for file_path, file_data in code_graph.nodes.items():
-            file_name = file_path.split('/')[-1]
-            file_functions[file_name] = [
-                f["name"] for f in file_data.get("functions", [])
-            ]
-        
-        # Create nodes for files and functions
-        for file_name, functions in file_functions.items():
-            mermaid_code += f"    subgraph {file_name}\n"
-            for func in functions:
-                mermaid_code += f"        {file_name}_{func}[{func}]\n"
-            mermaid_code += "    end\n"
-        
-        # Add call relationships (simplified - real implementation would analyze actual calls)
-        for file_path, file_data in code_graph.nodes.items():
-            file_name = file_path.split('/')[-1]
-            for func in file_data.get("functions", []):
-                # This is a placeholder - real call analysis would go here
-                if func.get("calls"):
-                    for call in func["calls"]:
-                        mermaid_code += f"    {file_name}_{func['name']} --> {call}\n"
-        
-        return mermaid_code
-    
+        return "".join(DiagramGenerator.iter_function_call_graph(code_graph))
+
+    @staticmethod
+    def iter_function_call_graph(code_graph):
+        """Yield the Mermaid function call graph line by line"""
+        yield from DiagramEngine.for_graph(code_graph).call_graph().iter_mermaid("TD")
+
     @staticmethod
     def generate_architecture_diagram(file_tree, code_graph):
         """Generate architecture overview diagram"""
-        mermaid_code = "graph TB\n"
-        mermaid_code += "    A[Codebase Genius] --> B[Repository Analysis]\n"
-        mermaid_code += "    B --> C[File Structure]\n"
-        mermaid_code += "    B --> D[Code Analysis]\n"
-        mermaid_code += "    C --> E[Documentation]\n"
-        mermaid_code += "    D --> E\n"
-        
-        # Add file statistics
-        total_files = file_tree.get("file_count", 0)
-        mermaid_code += f"    F[Total Files: {total_files}] --> E\n"
-        
-        return mermaid_code
\ No newline at end of file
+        return "".join(DiagramGenerator.iter_architecture_diagram(file_tree, code_graph))
+
+    @staticmethod
+    def iter_architecture_diagram(file_tree, code_graph):
+        """Yield the package overview diagram line by line"""
+        yield from DiagramEngine.for_graph(code_graph, file_tree.get("path")).overview().iter_mermaid("LR")
+
+    @staticmethod
+    def iter_package_diagrams(code_graph, limit=10):
+        """Yield (package name, Mermaid chunks) drill-downs for the most connected packages"""
+        engine = DiagramEngine.for_graph(code_graph)
+        for cluster, name, _ in engine.clusters()[:limit]:
+            yield name, engine.package_diagram(cluster).iter_mermaid("LR")
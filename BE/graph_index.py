@@ -0,0 +1,189 @@
+from bisect import bisect_left
+from collections import defaultdict
+
+
+class TrigramIndex:
+    """Substring lookup over a set of strings via trigram posting lists"""
+
+    def __init__(self, items_by_key):
+        # items_by_key maps lower-cased keys to the ids stored under them
+        self._keys = list(items_by_key)
+        self._items = list(items_by_key.values())
+        self._key_ids = {key: key_id for key_id, key in enumerate(self._keys)}
+
+        # Trigram -> ids of the distinct keys containing it
+        postings = self._postings = defaultdict(list)
+        for key_id, key in enumerate(self._keys):
+            for trigram in {key[i:i + 3] for i in range(len(key) - 2)}:
+                postings[trigram].append(key_id)
+
+    def search(self, substring):
+        """Return the ids of every key containing substring (case-insensitive)"""
+        substring = substring.lower()
+        keys = self._keys
+        if len(substring) < 3:
+            # Too short for trigrams; distinct keys are far fewer than items
+            candidates = range(len(keys))
+        else:
+            # The rarest trigram bounds the candidates; checking the real
+            # substring on them is cheaper than intersecting every posting list
+            candidates = min(
+                (self._postings.get(substring[i:i + 3], ()) for i in range(len(substring) - 2)),
+                key=len
+            )
+        return [
+            item_id
+            for key_id in candidates if substring in keys[key_id]
+            for item_id in self._items[key_id]
+        ]
+
+    def exact(self, key):
+        key_id = self._key_ids.get(key.lower())
+        return list(self._items[key_id]) if key_id is not None else []
+
+
+class CodeGraphIndex:
+    """In-memory symbol and relationship index built alongside the code graph.
+
+    Symbols (functions, classes and methods) are stored as parallel columns
+    addressed by integer id. Name lookups go through a trigram index and a
+    sorted prefix list; relationships use inverted maps from callee to
+    callers, from parent class to subclasses and from module to importers.
+    """
+
+    def __init__(self, code_graph):
+        self.kinds = []
+        self.names = []
+        self.files = []
+        self.owners = []
+        self.lines = []
+        self.calls = []
+        self.parents = []
+
+        names = defaultdict(list)
+        callees = defaultdict(list)
+        parent_names = defaultdict(list)
+        importers = defaultdict(list)
+
+        for file_path, file_data in code_graph["nodes"].items():
+            symbols = []
+            for func in file_data.get("functions", []):
+                symbols.append(("function", func, None))
+            for cls in file_data.get("classes", []):
+                symbols.append(("class", cls, None))
+                for method in cls.get("methods", []):
+                    symbols.append(("method", method, cls["name"]))
+
+            for kind, record, owner in symbols:
+                symbol_id = len(self.names)
+                calls = record.get("calls") or []
+                parents = record.get("parent_classes", []) if kind == "class" else []
+                self.kinds.append(kind)
+                self.names.append(record["name"])
+                self.files.append(file_path)
+                self.owners.append(owner)
+                self.lines.append(record.get("line_number"))
+                self.calls.append(calls)
+                self.parents.append(parents)
+                names[record["name"].lower()].append(symbol_id)
+
+                for callee in calls:
+                    callee = callee.lower()
+                    callees[callee].append(symbol_id)
+                    # "self.client.get" is also found by "get"
+                    if '.' in callee:
+                        callees[callee.rsplit('.', 1)[1]].append(symbol_id)
+                for parent in parents:
+                    parent = parent.lower()
+                    parent_names[parent].append(symbol_id)
+                    # "models.Model" is also found by "Model"
+                    if '.' in parent:
+                        parent_names[parent.rsplit('.', 1)[1]].append(symbol_id)
+
+            for import_stmt in file_data.get("imports", []):
+                module = import_stmt.get("module")
+                if module:
+                    importers[module].append(file_path)
+
+        self._names = TrigramIndex(names)
+        self._callees = TrigramIndex(callees)
+        self._parent_names = TrigramIndex(parent_names)
+        self._importers = dict(importers)
+        self._prefix = sorted((name.lower(), symbol_id) for symbol_id, name in enumerate(self.names))
+        self._modules = sorted(self._importers)
+
+    @staticmethod
+    def for_graph(code_graph):
+        """Return the index stored on a code graph, building it on first use"""
+        index = code_graph.get("index")
+        if index is None:
+            index = code_graph["index"] = CodeGraphIndex(code_graph)
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, query):
+        """Symbols whose name contains query"""
+        return [self.describe(symbol_id) for symbol_id in sorted(self._names.search(query))]
+
+    def prefix(self, query, limit=50):
+        """Symbols whose name starts with query, in name order"""
+        query = query.lower()
+        results = []
+        position = bisect_left(self._prefix, (query, -1))
+        while position < len(self._prefix) and len(results) < limit:
+            name, symbol_id = self._prefix[position]
+            if not name.startswith(query):
+                break
+            results.append(self.describe(symbol_id))
+            position += 1
+        return results
+
+    def callers_of(self, name):
+        """Functions and methods that call name (matched on the full or last dotted segment)"""
+        return [self.describe(symbol_id) for symbol_id in sorted(set(self._callees.exact(name)))]
+
+    def subclasses_of(self, name):
+        """Classes that list name as a direct parent"""
+        return [self.describe(symbol_id) for symbol_id in sorted(set(self._parent_names.exact(name)))]
+
+    def importers_of(self, module):
+        """Files importing module or one of its submodules"""
+        files = list(self._importers.get(module, []))
+        prefix = module + "."
+        position = bisect_left(self._modules, prefix)
+        while position < len(self._modules) and self._modules[position].startswith(prefix):
+            files.extend(self._importers[self._modules[position]])
+            position += 1
+        return sorted(set(files))
+
+    def query(self, query):
+        """Functions matching by name or call, classes matching by name or parent"""
+        symbol_ids = set(self._names.search(query))
+        symbol_ids.update(self._callees.search(query))
+        symbol_ids.update(self._parent_names.search(query))
+        return [self.describe(symbol_id) for symbol_id in sorted(symbol_ids)]
+
+    def describe(self, symbol_id):
+        """Render a symbol in the result format of the query_relationships walker"""
+        kind = self.kinds[symbol_id]
+        if kind == "class":
+            return {
+                "type": "class",
+                "file": self.files[symbol_id],
+                "class": self.names[symbol_id],
+                "parents": self.parents[symbol_id],
+                "line_number": self.lines[symbol_id]
+            }
+        result = {
+            "type": kind,
+            "file": self.files[symbol_id],
+            "function": self.names[symbol_id],
+            "calls": self.calls[symbol_id],
+            "line_number": self.lines[symbol_id]
+        }
+        if kind == "method":
+            result["class"] = self.owners[symbol_id]
+        return result
+
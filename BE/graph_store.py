@@ -0,0 +1,510 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+
+GRAPH_FILE = "code_graph.bin"
+MAGIC = b"CGSTORE\0"
+FORMAT_VERSION = 3
+# magic, format version, byte order (0 little, 1 big), section count
+HEADER = struct.Struct("<8sIII")
+# name, array typecode, offset, item count
+SECTION = struct.Struct("<16s4sQQ")
+ALIGNMENT = 8
+NONE = -1
+
+# Function flags
+IS_ASYNC = 1
+# Set when the record carries return_type, calls and is_async
+EXTENDED = 2
+
+# Column names, in file order; docstrings come last so most reads never touch them
+SECTIONS = (
+    ("str_offsets", "q"), ("str_data", "B"),
+    ("file_path", "i"), ("file_name", "i"), ("file_type", "i"),
+    ("file_callables", "i"), ("file_func_count", "i"), ("file_classes", "i"),
+    ("file_imports", "i"), ("file_deps", "i"),
+    ("fn_name", "i"), ("fn_signature", "i"), ("fn_doc", "i"), ("fn_return", "i"),
+    ("fn_line", "i"), ("fn_flags", "i"), ("fn_params", "i"), ("fn_calls", "i"),
+    ("param_name", "i"), ("param_type", "i"), ("call_name", "i"),
+    ("cls_name", "i"), ("cls_doc", "i"), ("cls_line", "i"), ("cls_methods", "i"), ("cls_method_count", "i"),
+    ("cls_parents", "i"), ("cls_kind", "i"), ("cls_fields", "i"),
+    ("parent_name", "i"), ("field_name", "i"), ("field_type", "i"),
+    ("imp_module", "i"), ("imp_level", "i"), ("imp_from", "B"), ("imp_line", "i"), ("imp_names", "i"),
+    ("imp_name", "i"), ("imp_alias", "i"),
+    ("dep_type", "i"), ("dep_module", "i"), ("dep_names", "i"), ("dep_name", "i"),
+    ("edge_source", "i"), ("edge_target", "i"), ("edge_type", "i"),
+    ("doc_offsets", "q"), ("doc_data", "B")
+)
+
+
+class GraphStoreError(Exception):
+    """Raised when a file is not a code graph store this version can read"""
+
+
+class _Writer:
+    """Flattens a code graph into columns, interning every string"""
+
+    def __init__(self):
+        self.columns = {name: array(typecode) for name, typecode in SECTIONS if name not in
+                        ("str_offsets", "str_data", "doc_offsets", "doc_data")}
+        self.strings = {}
+        self.docstrings = []
+
+    def intern(self, text):
+        if text is None:
+            return NONE
+        string_id = self.strings.get(text)
+        if string_id is None:
+            string_id = self.strings[text] = len(self.strings)
+        return string_id
+
+    def docstring(self, text):
+        if text is None:
+            return NONE
+        self.docstrings.append(text)
+        return len(self.docstrings) - 1
+
+    def add_graph(self, code_graph):
+        columns = self.columns
+        for name in ("file_callables", "file_classes", "file_imports", "file_deps", "fn_params", "fn_calls",
+                     "cls_parents", "cls_fields", "imp_names", "dep_names"):
+            columns[name].append(0)
+
+        dependencies = code_graph.get("file_dependencies", {})
+        for path, node in code_graph["nodes"].items():
+            columns["file_path"].append(self.intern(path))
+            columns["file_name"].append(self.intern(node.get("name")))
+            columns["file_type"].append(self.intern(node.get("type")))
+
+            functions = node.get("functions", [])
+            columns["file_func_count"].append(len(functions))
+            for func in functions:
+                self.add_callable(func)
+            for cls in node.get("classes", []):
+                columns["cls_name"].append(self.intern(cls["name"]))
+                columns["cls_doc"].append(self.docstring(cls.get("docstring")))
+                columns["cls_line"].append(cls.get("line_number") or 0)
+                # A file's callables are its functions, then each class's methods in turn
+                columns["cls_methods"].append(len(columns["fn_name"]))
+                columns["cls_method_count"].append(len(cls.get("methods", [])))
+                for method in cls.get("methods", []):
+                    self.add_callable(method)
+                columns["parent_name"].extend(self.intern(parent) for parent in cls.get("parent_classes", []))
+                columns["cls_parents"].append(len(columns["parent_name"]))
+                # Jac archetypes carry a kind (node, edge, obj, ...) and their fields
+                columns["cls_kind"].append(self.intern(cls.get("kind")))
+                for field in cls.get("fields", []):
+                    columns["field_name"].append(self.intern(field["name"]))
+                    columns["field_type"].append(self.intern(field.get("type")))
+                columns["cls_fields"].append(len(columns["field_name"]))
+            columns["file_callables"].append(len(columns["fn_name"]))
+            columns["file_classes"].append(len(columns["cls_name"]))
+
+            for import_stmt in node.get("imports", []):
+                columns["imp_module"].append(self.intern(import_stmt.get("module")))
+                columns["imp_level"].append(import_stmt.get("level") or 0)
+                columns["imp_from"].append(1 if import_stmt.get("from") else 0)
+                columns["imp_line"].append(import_stmt.get("line_number") or 0)
+                names = import_stmt.get("names") or []
+                aliases = import_stmt.get("aliases") or [None] * len(names)
+                columns["imp_name"].extend(self.intern(name) for name in names)
+                columns["imp_alias"].extend(self.intern(alias) for alias in aliases)
+                columns["imp_names"].append(len(columns["imp_name"]))
+            columns["file_imports"].append(len(columns["imp_module"]))
+
+            for dependency in dependencies.get(path, []):
+                columns["dep_type"].append(self.intern(dependency.get("type")))
+                columns["dep_module"].append(self.intern(dependency.get("module")))
+                columns["dep_name"].extend(self.intern(name) for name in dependency.get("imports") or [])
+                columns["dep_names"].append(len(columns["dep_name"]))
+            columns["file_deps"].append(len(columns["dep_type"]))
+
+        for edge in code_graph.get("edges", []):
+            columns["edge_source"].append(self.intern(edge.get("source")))
+            columns["edge_target"].append(self.intern(edge.get("target")))
+            columns["edge_type"].append(self.intern(edge.get("type")))
+
+    def add_callable(self, func):
+        columns = self.columns
+        columns["fn_name"].append(self.intern(func["name"]))
+        columns["fn_signature"].append(self.intern(func.get("signature")))
+        columns["fn_doc"].append(self.docstring(func.get("docstring")))
+        columns["fn_line"].append(func.get("line_number") or 0)
+        extended = "calls" in func
+        columns["fn_return"].append(self.intern(func.get("return_type")))
+        columns["fn_flags"].append((EXTENDED if extended else 0) | (IS_ASYNC if func.get("is_async") else 0))
+        for param in func.get("parameters", []):
+            columns["param_name"].append(self.intern(param["name"]))
+            columns["param_type"].append(self.intern(param.get("type")))
+        columns["fn_params"].append(len(columns["param_name"]))
+        columns["call_name"].extend(self.intern(callee) for callee in func.get("calls") or [])
+        columns["fn_calls"].append(len(columns["call_name"]))
+
+    def sections(self):
+        """(name, typecode, array) in file order, with the string table sorted for lookups"""
+        ordered = sorted(self.strings, key=lambda text: text.encode('utf-8', 'surrogatepass'))
+        remap = array('i', [0] * len(ordered))
+        for new_id, text in enumerate(ordered):
+            remap[self.strings[text]] = new_id
+        # Columns holding string ids are rewritten to the sorted ids
+        string_columns = ("file_path", "file_name", "file_type", "fn_name", "fn_signature", "fn_return",
+                          "param_name", "param_type", "call_name", "cls_name", "parent_name", "cls_kind", "field_name",
+                          "field_type", "imp_module",
+                          "imp_name", "imp_alias", "dep_type", "dep_module", "dep_name",
+                          "edge_source", "edge_target", "edge_type")
+        for name in string_columns:
+            column = self.columns[name]
+            self.columns[name] = array('i', (remap[value] if value != NONE else NONE for value in column))
+
+        str_offsets, str_data = _pack_strings(ordered)
+        doc_offsets, doc_data = _pack_strings(self.docstrings)
+        tables = dict(self.columns, str_offsets=str_offsets, str_data=str_data,
+                      doc_offsets=doc_offsets, doc_data=doc_data)
+        return [(name, typecode, tables[name]) for name, typecode in SECTIONS]
+
+
+def _pack_strings(strings):
+    offsets = array('q', [0])
+    data = bytearray()
+    for text in strings:
+        data += text.encode('utf-8', 'surrogatepass')
+        offsets.append(len(data))
+    return offsets, data
+
+
+def save(code_graph, path):
+    """Write the nodes, edges and dependencies of a code graph to path; returns its size in bytes
+
+    Derived structures (index, call_graph, diagrams) are not stored; they are
+    rebuilt from the graph when needed.
+    """
+    writer = _Writer()
+    writer.add_graph(code_graph)
+    sections = writer.sections()
+
+    position = HEADER.size + SECTION.size * len(sections)
+    entries = []
+    for name, typecode, values in sections:
+        position += -position % ALIGNMENT
+        itemsize = array(typecode).itemsize
+        entries.append((name, typecode, position, len(values)))
+        position += len(values) * itemsize
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Write then rename: readers holding a map of the old file keep a consistent view
+    with open(path + ".tmp", 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0 if sys.byteorder == "little" else 1, len(sections)))
+        for name, typecode, offset, count in entries:
+            f.write(SECTION.pack(name.encode('ascii'), typecode.encode('ascii'), offset, count))
+        for (name, typecode, values), (_, _, offset, _) in zip(sections, entries):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(values if isinstance(values, bytearray) else values.tobytes())
+        written = f.tell()
+    os.replace(path + ".tmp", path)
+    return written
+
+
+class GraphStore:
+    """Read-only, memory-mapped view of a saved code graph.
+
+    Columns are memoryviews over the map, so opening a store reads only its
+    header and every lookup touches only the pages it needs: listing files
+    reads the path column and the strings it names, materializing one file
+    reads that file's slice of each column, and docstrings are only read for
+    the records asked for.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise GraphStoreError(f"{path} is empty")
+        self._views = []
+        self._strings = {}
+        self._file_ids = None
+        try:
+            self._read_sections()
+        except Exception:
+            self.close()
+            raise
+
+    @classmethod
+    def open(cls, path):
+        return cls(path)
+
+    def _read_sections(self):
+        magic, version, byte_order, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise GraphStoreError(f"{self.path} is not a version {FORMAT_VERSION} code graph store")
+        if byte_order != (0 if sys.byteorder == "little" else 1):
+            raise GraphStoreError(f"{self.path} was written on a machine of the other byte order")
+
+        whole = memoryview(self._map)
+        self._views.append(whole)
+        for index in range(count):
+            name, typecode, offset, items = SECTION.unpack_from(self._map, HEADER.size + index * SECTION.size)
+            name = name.rstrip(b"\0").decode('ascii')
+            typecode = typecode.rstrip(b"\0").decode('ascii')
+            size = array(typecode).itemsize
+            view = whole[offset:offset + items * size]
+            if typecode != "B":
+                view = view.cast(typecode)
+            self._views.append(view)
+            setattr(self, "_" + name, view)
+
+    def close(self):
+        """Release the map; objects obtained from the store must not be used afterwards"""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._file_path)
+
+    def string(self, string_id):
+        if string_id == NONE:
+            return None
+        text = self._strings.get(string_id)
+        if text is None:
+            start, end = self._str_offsets[string_id], self._str_offsets[string_id + 1]
+            text = self._strings[string_id] = str(self._str_data[start:end], 'utf-8', 'surrogatepass')
+        return text
+
+    def string_id(self, text):
+        """Id of text in the sorted string table by binary search, or None if absent"""
+        key = text.encode('utf-8', 'surrogatepass')
+        offsets, data = self._str_offsets, self._str_data
+        low, high = 0, len(offsets) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if data[offsets[middle]:offsets[middle + 1]].tobytes() < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(offsets) - 1 and data[offsets[low]:offsets[low + 1]].tobytes() == key:
+            return low
+        return None
+
+    def docstring(self, doc_id):
+        if doc_id == NONE:
+            return None
+        start, end = self._doc_offsets[doc_id], self._doc_offsets[doc_id + 1]
+        return str(self._doc_data[start:end], 'utf-8', 'surrogatepass')
+
+    def file_paths(self):
+        return [self.string(string_id) for string_id in self._file_path]
+
+    def file_id(self, path):
+        if self._file_ids is None:
+            self._file_ids = {self.string(string_id): file_id for file_id, string_id in enumerate(self._file_path)}
+        return self._file_ids.get(path)
+
+    def node(self, file_id):
+        """The code graph node of one file, decoded from its slice of each column"""
+        string = self.string
+        callables = self._file_callables
+        first = callables[file_id]
+        functions_end = first + self._file_func_count[file_id]
+        classes = []
+        for class_id in range(self._file_classes[file_id], self._file_classes[file_id + 1]):
+            parents = self._cls_parents
+            methods = self._cls_methods[class_id]
+            classes.append({
+                "name": string(self._cls_name[class_id]),
+                "docstring": self.docstring(self._cls_doc[class_id]),
+                "methods": [self._callable(fn_id) for fn_id in range(
+                    methods, methods + self._cls_method_count[class_id])],
+                "parent_classes": [string(self._parent_name[i]) for i in range(parents[class_id],
+                                                                               parents[class_id + 1])],
+                "line_number": self._cls_line[class_id]
+            })
+            if self._cls_kind[class_id] != NONE:
+                fields = self._cls_fields
+                classes[-1]["kind"] = string(self._cls_kind[class_id])
+                classes[-1]["fields"] = [
+                    {"name": string(self._field_name[i]), "type": string(self._field_type[i])}
+                    for i in range(fields[class_id], fields[class_id + 1])
+                ]
+        imports = []
+        for import_id in range(self._file_imports[file_id], self._file_imports[file_id + 1]):
+            names = range(self._imp_names[import_id], self._imp_names[import_id + 1])
+            imports.append({
+                "module": string(self._imp_module[import_id]),
+                "names": [string(self._imp_name[i]) for i in names],
+                "aliases": [string(self._imp_alias[i]) for i in names],
+                "level": self._imp_level[import_id],
+                "from": bool(self._imp_from[import_id]),
+                "line_number": self._imp_line[import_id]
+            })
+        return {
+            "type": string(self._file_type[file_id]),
+            "name": string(self._file_name[file_id]),
+            "functions": [self._callable(fn_id) for fn_id in range(first, functions_end)],
+            "classes": classes,
+            "imports": imports
+        }
+
+    def _callable(self, fn_id):
+        string = self.string
+        params = range(self._fn_params[fn_id], self._fn_params[fn_id + 1])
+        record = {
+            "name": string(self._fn_name[fn_id]),
+            "signature": string(self._fn_signature[fn_id]),
+            "docstring": self.docstring(self._fn_doc[fn_id]),
+            "parameters": [{"name": string(self._param_name[i]), "type": string(self._param_type[i])}
+                           for i in params],
+        }
+        flags = self._fn_flags[fn_id]
+        if flags & EXTENDED:
+            record["return_type"] = string(self._fn_return[fn_id])
+            record["calls"] = [string(self._call_name[i])
+                               for i in range(self._fn_calls[fn_id], self._fn_calls[fn_id + 1])]
+        record["line_number"] = self._fn_line[fn_id]
+        if flags & EXTENDED:
+            record["is_async"] = bool(flags & IS_ASYNC)
+        return record
+
+    def dependencies(self, file_id):
+        string = self.string
+        return [
+            {
+                "type": string(self._dep_type[dep_id]),
+                "module": string(self._dep_module[dep_id]),
+                "imports": [string(self._dep_name[i])
+                            for i in range(self._dep_names[dep_id], self._dep_names[dep_id + 1])]
+            }
+            for dep_id in range(self._file_deps[file_id], self._file_deps[file_id + 1])
+        ]
+
+    def edge(self, edge_id):
+        string = self.string
+        return {
+            "source": string(self._edge_source[edge_id]),
+            "target": string(self._edge_target[edge_id]),
+            "type": string(self._edge_type[edge_id])
+        }
+
+    def find_definitions(self, name):
+        """(file path, kind, line number) of every function, method or class called name
+
+        Only the name columns are scanned; no record is decoded unless it matches.
+        """
+        string_id = self.string_id(name)
+        if string_id is None:
+            return []
+        found = []
+        callables = self._file_callables
+        classes = self._file_classes
+        for fn_id, value in enumerate(self._fn_name):
+            if value == string_id:
+                file_id = _bisect_offsets(callables, fn_id)
+                is_method = fn_id >= callables[file_id] + self._file_func_count[file_id]
+                found.append((self.string(self._file_path[file_id]), "method" if is_method else "function",
+                              self._fn_line[fn_id]))
+        for class_id, value in enumerate(self._cls_name):
+            if value == string_id:
+                file_id = _bisect_offsets(classes, class_id)
+                found.append((self.string(self._file_path[file_id]), "class", self._cls_line[class_id]))
+        return found
+
+    def code_graph(self):
+        """A code graph whose nodes, edges and dependencies decode lazily from the map"""
+        return {
+            "nodes": LazyNodes(self),
+            "edges": LazyEdges(self),
+            "file_dependencies": LazyDependencies(self)
+        }
+
+    def load_code_graph(self):
+        """A fully decoded, mutable code graph, as build_code_graph produces it"""
+        paths = self.file_paths()
+        return {
+            "nodes": {path: self.node(file_id) for file_id, path in enumerate(paths)},
+            "edges": [self.edge(edge_id) for edge_id in range(len(self._edge_source))],
+            "file_dependencies": {path: self.dependencies(file_id) for file_id, path in enumerate(paths)}
+        }
+
+
+def _bisect_offsets(offsets, item):
+    """Index i with offsets[i] <= item < offsets[i + 1], skipping empty ranges"""
+    low, high = 0, len(offsets) - 1
+    while low < high:
+        middle = (low + high) // 2
+        if offsets[middle + 1] <= item:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class LazyNodes(Mapping):
+    """code_graph["nodes"] backed by a GraphStore; each access decodes one file"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, path):
+        file_id = self.store.file_id(path)
+        if file_id is None:
+            raise KeyError(path)
+        return self.store.node(file_id)
+
+    def __iter__(self):
+        return iter(self.store.file_paths())
+
+    def __len__(self):
+        return len(self.store)
+
+    def items(self):
+        # Positional, so no path lookup is needed per file
+        store = self.store
+        return ((path, store.node(file_id)) for file_id, path in enumerate(store.file_paths()))
+
+
+class LazyDependencies(LazyNodes):
+    """code_graph["file_dependencies"] backed by a GraphStore"""
+
+    def __getitem__(self, path):
+        file_id = self.store.file_id(path)
+        if file_id is None:
+            raise KeyError(path)
+        return self.store.dependencies(file_id)
+
+    def items(self):
+        store = self.store
+        return ((path, store.dependencies(file_id)) for file_id, path in enumerate(store.file_paths()))
+
+
+class LazyEdges(Sequence):
+    """code_graph["edges"] backed by a GraphStore"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.store.edge(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.store.edge(index)
+
+    def __len__(self):
+        return len(self.store._edge_source)
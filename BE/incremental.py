@@ -0,0 +1,162 @@
+import json
+import os
+
+from call_graph import CallGraph
+from graph_index import CodeGraphIndex
+from graph_store import GRAPH_FILE, GraphStore, GraphStoreError, save as save_graph
+from parser_utils import ParserUtils
+import prioritizer
+from utils import GitUtils
+
+DEFAULT_OUTPUT_ROOT = "./outputs"
+
+
+class IncrementalAnalyzer:
+    """Re-analyse only the files that changed since the last documented commit.
+
+    The state of the previous run (commit and README summary) is kept next to
+    the generated documentation, with its code graph in the binary graph
+    store written beside the document. Repositories are synced into a
+    persistent mirror checkout so file paths, and therefore graph keys, stay
+    stable between runs.
+    """
+
+    STATE_FILE = "analysis_state.json"
+
+    def __init__(self, parser=None, output_root=DEFAULT_OUTPUT_ROOT):
+        self.parser = parser or ParserUtils()
+        self.output_root = output_root
+
+    def state_path(self, repo_url):
+        repo_name = repo_url.split('/')[-1].replace('.git', '')
+        return os.path.join(self.output_root, repo_name, self.STATE_FILE)
+
+    def load_state(self, repo_url):
+        """Load the state saved by the previous run, or None"""
+        path = self.state_path(repo_url)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("repo_url") != repo_url:
+            return None
+        if "code_graph" in state:
+            # Written before graphs were stored in binary
+            return state
+
+        graph_path = os.path.join(os.path.dirname(path), state.get("graph_file", GRAPH_FILE))
+        try:
+            # The graph file is rewritten with every document; only the one saved with this state fits it
+            stat = os.stat(graph_path)
+            if [stat.st_size, stat.st_mtime_ns] != state.get("graph_stat"):
+                return None
+            with GraphStore.open(graph_path) as store:
+                state["code_graph"] = store.load_code_graph()
+        except (OSError, GraphStoreError):
+            return None
+        return state
+
+    def save_state(self, repo_url, local_path, commit, code_graph, readme_summary, graph_path=None):
+        """Record what was documented so the next run can diff against it
+
+        graph_path is the graph store already saved with the document; it is
+        only written here when there is none.
+        """
+        path = self.state_path(repo_url)
+        if graph_path is None:
+            graph_path = os.path.join(os.path.dirname(path), GRAPH_FILE)
+            # Only nodes, edges and dependencies are stored; the indexes are rebuilt from them
+            save_graph(code_graph, graph_path)
+        stat = os.stat(graph_path)
+        state = {
+            "repo_url": repo_url,
+            "local_path": local_path,
+            "commit": commit,
+            "readme_summary": readme_summary,
+            "graph_file": os.path.relpath(graph_path, os.path.dirname(path)),
+            "graph_stat": [stat.st_size, stat.st_mtime_ns]
+        }
+        # Write then rename, so a crash never leaves a truncated state behind
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(path + ".tmp", path)
+
+    def plan(self, repo_url, local_path):
+        """Decide between a full rebuild, a patch, or no work at all"""
+        commit = GitUtils.get_head_commit(local_path)
+        state = self.load_state(repo_url)
+
+        plan = {"mode": "full", "commit": commit, "changes": None, "state": state}
+        if state is None or state.get("local_path") != local_path or not state.get("commit"):
+            return plan
+
+        if state["commit"] == commit:
+            plan["mode"] = "unchanged"
+            return plan
+
+        changes = GitUtils.get_changed_paths(local_path, state["commit"], commit)
+        if changes is not None:
+            plan["mode"] = "incremental"
+            plan["changes"] = changes
+        return plan
+
+    def patch_code_graph(self, code_graph, changes, file_tree, workers=None):
+        """Apply a set of changed paths to a stored code graph in place"""
+        files = file_tree["files"]
+        by_path = file_tree["index"].by_path
+
+        stale = set(changes["deleted"]) | set(changes["modified"])
+        for path in changes["deleted"]:
+            code_graph["nodes"].pop(path, None)
+            code_graph["file_dependencies"].pop(path, None)
+        code_graph["edges"] = [edge for edge in code_graph["edges"] if edge["source"] not in stale]
+
+        # Only files that a full run would have seen are (re-)parsed
+        to_parse = [
+            files[by_path[path]]
+            for path in changes["modified"] + changes["added"]
+            if path in by_path
+        ]
+        for path in changes["modified"]:
+            if path not in by_path:
+                code_graph["nodes"].pop(path, None)
+                code_graph["file_dependencies"].pop(path, None)
+
+        for file_info, file_analysis in self.parser.parse_files(to_parse, workers):
+            if not file_analysis:
+                code_graph["nodes"].pop(file_info["path"], None)
+                code_graph["file_dependencies"].pop(file_info["path"], None)
+                continue
+
+            code_graph["nodes"][file_info["path"]] = {
+                "type": "file",
+                "name": file_info["name"],
+                "functions": file_analysis["functions"],
+                "classes": file_analysis["classes"],
+                "imports": file_analysis["imports"]
+            }
+            relationships = self.parser.build_relationships(file_analysis, file_tree)
+            code_graph["edges"].extend(relationships["edges"])
+            code_graph["file_dependencies"][file_info["path"]] = relationships["dependencies"]
+
+        # Added files would otherwise trail the rest; keep the best-first order a full run
+        # produces, which a change can shift (scores weigh import fan-in)
+        rank = {file["path"]: position for position, file in enumerate(prioritizer.score_files(file_tree))}
+        for key in ("nodes", "file_dependencies"):
+            code_graph[key] = dict(sorted(code_graph[key].items(), key=lambda item: rank.get(item[0], len(rank))))
+
+        code_graph["index"] = CodeGraphIndex(code_graph)
+        # Resolution crosses files, so a changed import can move any edge
+        code_graph["call_graph"] = CallGraph.build(code_graph, file_tree["path"])
+        return code_graph
+
+    @staticmethod
+    def readme_changed(changes):
+        """Tell whether a README was touched, so its summary must be regenerated"""
+        readme_files = {'README.md', 'README.txt', 'README', 'readme.md'}
+        return any(
+            os.path.basename(path) in readme_files
+            for paths in changes.values()
+            for path in paths
+        )
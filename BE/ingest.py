@@ -0,0 +1,161 @@
+import codecs
+import mmap
+import os
+
+# Bytes read up front to tell text from binary and pick an encoding
+SNIFF_BYTES = 8192
+# Files larger than this are generated or vendored in practice, and not read
+DEFAULT_MAX_FILE_BYTES = 2 * 1024 * 1024
+# Text files at least this large are memory-mapped rather than read into a buffer
+MMAP_THRESHOLD = 256 * 1024
+# Decoded from a mapping in blocks of this size
+DECODE_BLOCK_BYTES = 1024 * 1024
+# Characters kept of files no parser understands
+PREVIEW_CHARS = 500
+
+# A head with more control bytes than this share is binary
+BINARY_CONTROL_SHARE = 0.3
+# Heads averaging longer lines than this are minified bundles, not source
+MINIFIED_LINE_LENGTH = 1000
+_TEXT_CONTROLS = {7, 8, 9, 10, 11, 12, 13, 27}
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+)
+
+
+def max_file_bytes():
+    """Size limit for ingested files (CODEBASE_GENIUS_MAX_FILE_BYTES)"""
+    return int(os.environ.get("CODEBASE_GENIUS_MAX_FILE_BYTES", DEFAULT_MAX_FILE_BYTES))
+
+
+def exceeds_limit(size, max_bytes=None):
+    """Tell whether a file of this size would be skipped without being read"""
+    return size is not None and size > (max_bytes or max_file_bytes())
+
+
+def detect_encoding(head):
+    """Encoding of a file from its first block: a BOM, else UTF-8 if the block decodes, else latin-1"""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    try:
+        # Not final: the block may end inside a multi-byte sequence
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def is_binary(head):
+    """Tell binary data from text by NUL bytes and the share of control bytes in the first block"""
+    if not head or head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return False
+    if b'\0' in head:
+        return True
+    controls = sum(1 for byte in head if byte < 32 and byte not in _TEXT_CONTROLS)
+    return controls / len(head) > BINARY_CONTROL_SHARE
+
+
+def is_minified(head):
+    """Tell minified or generated single-line bundles from hand-written source"""
+    lines = head.count(b'\n') + 1
+    return len(head) >= SNIFF_BYTES and len(head) / lines > MINIFIED_LINE_LENGTH
+
+
+def sniff(path, size=None, max_bytes=None):
+    """First block of a file and the reason to skip it, or (head, None) for readable text
+
+    Reasons are "too_large", "binary" and "read_error"; oversized files are
+    rejected on their size alone, without being opened.
+    """
+    try:
+        if size is None:
+            size = os.path.getsize(path)
+        if exceeds_limit(size, max_bytes):
+            return None, "too_large"
+        with open(path, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
+        return None, "read_error"
+    if is_binary(head):
+        return head, "binary"
+    return head, None
+
+
+def read_text(path, size=None, max_bytes=None, source=False):
+    """Decode a text file, returning (text, bytes read, outcome)
+
+    text is None when the file is skipped, and outcome then says why:
+    "too_large", "binary", "minified" (only with source=True) or
+    "read_error". The encoding is chosen once from the first block; small
+    files are decoded from one read, large ones from a memory map in blocks.
+    """
+    try:
+        if size is None:
+            size = os.path.getsize(path)
+        if exceeds_limit(size, max_bytes):
+            return None, 0, "too_large"
+        with open(path, 'rb') as f:
+            if size < MMAP_THRESHOLD:
+                data = f.read()
+                head = data[:SNIFF_BYTES]
+                reason = _rejected(head, source)
+                if reason:
+                    return None, len(head), reason
+                return _decode(data, detect_encoding(head)), len(data), None
+
+            head = f.read(SNIFF_BYTES)
+            reason = _rejected(head, source)
+            if reason:
+                return None, len(head), reason
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return _decode_blocks(mapped, detect_encoding(head)), len(mapped), None
+    except (OSError, ValueError):
+        return None, 0, "read_error"
+
+
+def read_preview(path, chars=PREVIEW_CHARS, size=None):
+    """The first chars characters of a text file, returning (text, bytes read, outcome)
+
+    Reads a single block whatever the file size, for files kept only as a preview.
+    """
+    head, reason = sniff(path, size, max_bytes=float('inf'))
+    if reason:
+        return None, len(head or b""), reason
+    # Not final: the block may stop inside a character of a longer file
+    text = codecs.getincrementaldecoder(detect_encoding(head))(errors='replace').decode(head)
+    return (text[:chars] + "..." if len(text) > chars else text), len(head), None
+
+
+def _rejected(head, source):
+    if is_binary(head):
+        return "binary"
+    if source and is_minified(head):
+        return "minified"
+    return None
+
+
+def _decode(data, encoding):
+    try:
+        return codecs.decode(data, encoding)
+    except UnicodeDecodeError:
+        # Invalid UTF-8 past the first block; latin-1 decodes any byte
+        return codecs.decode(data, 'latin-1')
+
+
+def _decode_blocks(mapped, encoding):
+    """Decode a mapping block by block, so only the text and one block are held at once"""
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        parts = [
+            decoder.decode(mapped[start:start + DECODE_BLOCK_BYTES])
+            for start in range(0, len(mapped), DECODE_BLOCK_BYTES)
+        ]
+        parts.append(decoder.decode(b"", final=True))
+        return "".join(parts)
+    except UnicodeDecodeError:
+        # Restarts from the mapping, which the page cache still holds
+        return _decode_blocks(mapped, 'latin-1')
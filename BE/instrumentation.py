@@ -0,0 +1,349 @@
+import contextvars
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+METRIC_PREFIX = "codebase_genius"
+# Allocation sites listed in the tracemalloc report of a profiled run
+TOP_ALLOCATIONS = 25
+
+_current = contextvars.ContextVar("instrumentation", default=None)
+
+# tracemalloc is process-wide: it runs while any profiled run is active, and
+# is stopped by the last of them (unless something else had started it)
+_tracing_lock = threading.Lock()
+_tracing_runs = 0
+_tracing_owned = False
+
+
+def current():
+    """The instrumentation active in this context, or a no-op stand-in"""
+    return _current.get() or NULL_INSTRUMENTATION
+
+
+def start_tracing():
+    """Start tracemalloc on behalf of one more user, unless something already traces"""
+    global _tracing_runs, _tracing_owned
+    with _tracing_lock:
+        if _tracing_runs == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_runs += 1
+
+
+def stop_tracing(snapshot=False):
+    """Release one user of tracemalloc, stopping it after the last one it started for
+
+    Returns (peak traced bytes, snapshot or None), read before tracing can stop.
+    """
+    global _tracing_runs, _tracing_owned
+    with _tracing_lock:
+        taken = tracemalloc.take_snapshot() if snapshot else None
+        peak = tracemalloc.get_traced_memory()[1]
+        _tracing_runs -= 1
+        if _tracing_runs == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+    return peak, taken
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+class Span:
+    """A timed stage; finish() records wall time, thread CPU time and peak RSS once"""
+
+    __slots__ = ("owner", "name", "parent", "attrs", "started", "cpu_started", "offset", "finished")
+
+    def __init__(self, owner, name, parent, attrs):
+        self.owner = owner
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.offset = time.perf_counter() - owner.started
+        self.started = time.perf_counter()
+        self.cpu_started = time.thread_time()
+        self.finished = False
+
+    def finish(self, **attrs):
+        self.attrs.update(attrs)
+        if self.finished:
+            return
+        self.finished = True
+        self.owner._finish(self, time.perf_counter() - self.started, time.thread_time() - self.cpu_started)
+
+
+class Instrumentation:
+    """Spans, counters and per-file records for one documentation run.
+
+    Spans nest per thread and record wall time, CPU time of the recording
+    thread and the process peak RSS when they end. Counters take labels.
+    Files are recorded compactly as (path, seconds, bytes read, outcome).
+    Everything exports as JSON or Prometheus text. With profile=True the run
+    is also captured with cProfile and tracemalloc. cProfile covers the
+    run's own thread, but tracemalloc figures are process-wide: a snapshot or
+    peak taken while other runs are active includes their allocations too.
+    """
+
+    def __init__(self, name="job", profile=False):
+        self.name = name
+        self.profile = profile
+        self.started = time.perf_counter()
+        self.spans = []
+        self.counters = {}
+        self.files = []
+
+        self._lock = threading.Lock()
+        self._stacks = threading.local()
+        self._profiler = None
+        self._profiling = False
+        self._token = None
+
+    @contextmanager
+    def activated(self):
+        """Make this the current instrumentation for the enclosed code"""
+        token = _current.set(self)
+        if self.profile:
+            self.start_profiling()
+        try:
+            yield self
+        finally:
+            if self.profile:
+                self.stop_profiling()
+            _current.reset(token)
+
+    def activate(self):
+        """Make this the current instrumentation in the calling context (for Jac walkers)
+
+        Pair with deactivate() on every exit path, as activated() does.
+        """
+        self._token = _current.set(self)
+        if self.profile:
+            self.start_profiling()
+        return self
+
+    def deactivate(self):
+        """Undo activate(): stop profiling and restore the previous instrumentation"""
+        self.stop_profiling()
+        token, self._token = self._token, None
+        if token is not None:
+            try:
+                _current.reset(token)
+            except ValueError:
+                # Activated in another context; at least stop pointing at this run here
+                if _current.get() is self:
+                    _current.set(None)
+
+    def start_span(self, name, **attrs):
+        stack = self._stack()
+        span = Span(self, name, stack[-1].name if stack else None, attrs)
+        stack.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name, **attrs):
+        span = self.start_span(name, **attrs)
+        try:
+            yield span
+        finally:
+            span.finish()
+
+    def add_span(self, name, wall, cpu=None, **attrs):
+        """Record a stage timed elsewhere, e.g. accumulated over many calls"""
+        stack = self._stack()
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "parent": stack[-1].name if stack else None,
+                "start": None,
+                "wall": wall,
+                "cpu": cpu,
+                "peak_rss": peak_rss_bytes(),
+                "attrs": attrs
+            })
+
+    def _stack(self):
+        stack = getattr(self._stacks, "spans", None)
+        if stack is None:
+            stack = self._stacks.spans = []
+        return stack
+
+    def _finish(self, span, wall, cpu):
+        stack = self._stack()
+        if span in stack:
+            del stack[stack.index(span):]
+        with self._lock:
+            self.spans.append({
+                "name": span.name,
+                "parent": span.parent,
+                "start": span.offset,
+                "wall": wall,
+                "cpu": cpu,
+                "peak_rss": peak_rss_bytes(),
+                "attrs": span.attrs
+            })
+
+    def count(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def record_file(self, path, seconds, bytes_read, outcome):
+        """Record one file of the parse stage; outcome is parsed, cached, skipped or a failure reason"""
+        with self._lock:
+            self.files.append((path, seconds, bytes_read, outcome))
+            for key, amount in (
+                (("files_total", (("outcome", outcome),)), 1),
+                (("bytes_read", ()), bytes_read),
+                (("parse_seconds", ()), seconds)
+            ):
+                self.counters[key] = self.counters.get(key, 0) + amount
+
+    def merge(self, other):
+        """Fold another run's counters and stage totals into this one (for process-wide metrics)"""
+        with self._lock:
+            for key, amount in other.counters.items():
+                self.counters[key] = self.counters.get(key, 0) + amount
+            for span in other.spans:
+                for metric, value in (("stage_seconds", span["wall"]), ("stage_cpu_seconds", span["cpu"])):
+                    if value is not None:
+                        key = (metric, (("stage", span["name"]),))
+                        self.counters[key] = self.counters.get(key, 0) + value
+            key = ("runs", ())
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def start_profiling(self):
+        if self._profiling:
+            return
+        start_tracing()
+        # cProfile sees the thread that enables it, i.e. the job's own thread
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        self._profiling = True
+
+    def stop_profiling(self):
+        if not self._profiling:
+            return
+        self._profiling = False
+        self._profiler.disable()
+        self._traced_peak, self._snapshot = stop_tracing(snapshot=True)
+
+    def to_dict(self):
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            slowest = sorted(self.files, key=lambda record: record[1], reverse=True)[:20]
+            return {
+                "name": self.name,
+                "elapsed": time.perf_counter() - self.started,
+                "peak_rss": peak_rss_bytes(),
+                "spans": list(self.spans),
+                "counters": counters,
+                "slowest_files": [
+                    {"path": path, "seconds": seconds, "bytes": bytes_read, "outcome": outcome}
+                    for path, seconds, bytes_read, outcome in slowest
+                ],
+                # [path, seconds, bytes read, outcome] per file, compact for large repositories
+                "files": [list(record) for record in self.files]
+            }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self, prefix=METRIC_PREFIX):
+        """Prometheus text exposition of counters and span totals"""
+        with self._lock:
+            samples = {}
+            for (name, labels), value in self.counters.items():
+                samples.setdefault(name, []).append((labels, value))
+            for span in self.spans:
+                for metric, value in (("stage_seconds", span["wall"]), ("stage_cpu_seconds", span["cpu"])):
+                    if value is not None:
+                        samples.setdefault(metric, []).append(((("stage", span["name"]),), value))
+
+        lines = []
+        for name in sorted(samples):
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}"
+            lines.append(f"# TYPE {metric} counter")
+            totals = {}
+            for labels, value in samples[name]:
+                totals[labels] = totals.get(labels, 0) + value
+            for labels, value in sorted(totals.items()):
+                rendered = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels)
+                lines.append(f"{metric}{{{rendered}}} {value}" if rendered else f"{metric} {value}")
+        peak = peak_rss_bytes()
+        if peak is not None:
+            lines.append(f"# TYPE {prefix}_peak_rss_bytes gauge")
+            lines.append(f"{prefix}_peak_rss_bytes {peak}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, output_dir):
+        """Write instrumentation.json, plus profile.prof and allocations.txt for profiled runs"""
+        os.makedirs(output_dir, exist_ok=True)
+        paths = {"metrics": os.path.join(output_dir, "instrumentation.json")}
+        with open(paths["metrics"], 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+
+        if self._profiler is not None:
+            self.stop_profiling()
+            paths["profile"] = os.path.join(output_dir, "profile.prof")
+            self._profiler.dump_stats(paths["profile"])
+            paths["allocations"] = os.path.join(output_dir, "allocations.txt")
+            with open(paths["allocations"], 'w', encoding='utf-8') as f:
+                f.write(f"Peak traced memory: {self._traced_peak} bytes "
+                        "(process-wide, including any runs profiled at the same time)\n\n")
+                for stat in self._snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                    f.write(f"{stat}\n")
+        return paths
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _NullSpan:
+    def finish(self, **attrs):
+        pass
+
+
+class _NullInstrumentation:
+    """Accepts every call and records nothing, for code running outside a job"""
+
+    _span = _NullSpan()
+
+    def start_span(self, name, **attrs):
+        return self._span
+
+    @contextmanager
+    def span(self, name, **attrs):
+        yield self._span
+
+    def add_span(self, name, wall, cpu=None, **attrs):
+        pass
+
+    def count(self, name, amount=1, **labels):
+        pass
+
+    def record_file(self, path, seconds, bytes_read, outcome):
+        pass
+
+
+NULL_INSTRUMENTATION = _NullInstrumentation()
@@ -0,0 +1,356 @@
+import os
+import re
+
+# One alternation over the whole file: every match is a docstring, a comment,
+# or a statement's text up to the brace or semicolon ending it (strings
+# included), so the file is read once and each statement is a single match.
+# Leading whitespace is consumed before the alternation, and the text branch
+# is unrolled (a run of plain characters, then a string or lone "/" and the
+# next run) so the engine never steps through plain text one character at a time
+TOKEN = re.compile(r'''
+  \s*(?:
+    (?P<doc>"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\')
+  | (?P<comment>//[^\n]*|/\*[\s\S]*?\*/|\#\*[\s\S]*?\*\#|\#[^\n]*)
+  | (?P<text>[^"\'{};/\#]*
+      (?:(?:"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|/(?![/*])|["\'])
+         [^"\'{};/\#]*)*)
+    (?P<end>[{};])?
+  )
+''', re.VERBOSE)
+
+ARCHETYPE = re.compile(r'(?:(?:async|abstract)\s+)*(walker|node|edge|graph|obj|object|class|enum)\s+(\w+)\s*(.*)')
+ABILITY = re.compile(r'(?:(?:async|static|override|abstract)\s+)*(?:can|def)\s+([\w.]+)\s*(.*)')
+IMPORT = re.compile(r'(?:import|include)\b\s*(?::\w+\s*)?(.*)')
+BRACED_IMPORT = re.compile(r'\{(.*?)\}\s*(?:with|from)\s*["\'](.+?)["\']')
+# import from module { names }, which ends at its closing brace
+FROM_IMPORT = re.compile(r'from\s+(\.*)([\w.]*)\s*\{(.*?)\}')
+IMPORT_FROM_HEAD = re.compile(r'(?:import|include)\b\s*(?::\w+\s*)?from\b')
+FIELDS = re.compile(r'has\s+(?:(input|output|anchor|static|private|public|protected)\s+)?(.*)')
+# Statements that declare something; anything else is only scanned for calls
+DECLARATION = re.compile(r'(?:import|include|has|can|def|async|static|override|abstract|'
+                         r'walker|node|edge|graph|obj|object|class|enum)\b')
+# Statements that keep their braces: import lists and field defaults
+INLINE_BRACES = re.compile(r'(?:import|include|has)\b')
+# mod:walker(...) invocations, recorded as calls of "mod.walker"
+COLON_CALL = re.compile(r'\b(\w+):(\w+(?:\.\w+)*)\s*\(')
+PARENTS = re.compile(r':\s*([\w.,\s]+?)\s*:|\(\s*([\w.,\s]*?)\s*\)')
+RETURN_TYPE = re.compile(r'->\s*(.+?)\s*$')
+BRACKETS = re.compile(r'[(\[{]')
+
+# Kinds of open blocks that own the statements inside them
+OWNERS = ("archetype", "walker", "ability")
+
+
+def _split_top_level(text):
+    """Split on commas outside brackets, so defaults like [1, 2] stay whole"""
+    if not BRACKETS.search(text):
+        return [part.strip() for part in text.split(',') if part.strip()]
+    parts, depth, start = [], 0, 0
+    for position, char in enumerate(text):
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(text[start:position])
+            start = position + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _normalize(head):
+    """A statement's text on one line, with runs of whitespace collapsed"""
+    statement = "".join(head).rstrip()
+    if '\n' in statement or '  ' in statement or '\t' in statement:
+        return " ".join(statement.split())
+    return statement
+
+
+def _declarations(text):
+    """{"name", "type"} per comma-separated declaration such as "name: str = 0" """
+    declared = []
+    # A single declaration, the usual "has" statement, needs no splitting
+    for part in _split_top_level(text) if ',' in text else (text,):
+        name, _, annotation = part.split('=', 1)[0].partition(':')
+        name = name.strip()
+        if name.isidentifier():
+            declared.append({"name": name, "type": annotation.strip() or "Any"})
+    return declared
+
+
+def _clean_doc(text):
+    if text.startswith(('"""', "'''")):
+        return text[3:-3].strip()
+    if text.startswith(('/*', '#*')):
+        return text[2:-2].strip()
+    return text.lstrip('/#').strip()
+
+
+class JacParser:
+    """Single-pass Jac scanner.
+
+    One compiled tokenizer walks the file; statements end at ``;``, ``{``
+    and ``}``, and a stack of open blocks tells which archetype, walker or
+    ability a statement belongs to. Nodes, edges, graphs and objects become
+    classes with their abilities as methods, plus their kind and ``has``
+    fields. Walkers become functions whose parameters are their inputs,
+    whose return type is their output and whose calls are what they declare
+    with ``can mod.name;`` or invoke as ``mod:name(...)``. A docstring is a
+    string or comment just before a definition, or the first thing in it.
+    """
+
+    def parse(self, content, file_path):
+        analysis = {"functions": [], "classes": [], "imports": [], "file_path": file_path}
+        # [kind, record, docstring still open, owner] per open brace; owner is
+        # the innermost archetype, walker or ability frame, possibly the frame itself
+        stack = []
+        owner = None
+        # Text of a statement spread over several matches (comments, braced lists)
+        head = []
+        head_start = 0
+        # (end offset, text) of the comment or string before the current statement
+        leading = None
+        nested = 0
+        closes_statement = False
+        # Lines are counted only up to statements that need one, never twice
+        counted = [0, 1]
+
+        def line_at(offset):
+            counted[1] += content.count('\n', counted[0], offset)
+            counted[0] = offset
+            return counted[1]
+
+        for match in TOKEN.finditer(content):
+            text, end = match.group("text", "end")
+            if text is None:
+                # A docstring or comment
+                if head:
+                    if match.lastgroup == "doc":
+                        head.append(match.group("doc"))
+                    continue
+                if stack and stack[-1][2] and stack[-1][1]["docstring"] is None:
+                    stack[-1][1]["docstring"] = _clean_doc(match.group(match.lastgroup))
+                else:
+                    leading = (match.end(), match.group(match.lastgroup))
+                continue
+
+            if head or nested or end is None:
+                if not head:
+                    if not text:
+                        continue
+                    head_start = match.start("text")
+                head.append(text)
+                if end is None:
+                    continue
+                if nested:
+                    head.append(end)
+                    nested += 1 if end == '{' else -1 if end == '}' else 0
+                    if nested == 0 and closes_statement:
+                        self._statement(_normalize(head), line_at, head_start, owner, analysis)
+                        head = []
+                        leading = None
+                    continue
+                statement = _normalize(head)
+                head = []
+            else:
+                # The common case: a whole statement in one match
+                statement = text.rstrip()
+                head_start = match.start("text")
+                if '\n' in statement or '  ' in statement or '\t' in statement:
+                    statement = " ".join(statement.split())
+
+            if end == ';':
+                if statement:
+                    self._statement(statement, line_at, head_start, owner, analysis)
+                if stack:
+                    stack[-1][2] = False
+            elif end == '{':
+                if INLINE_BRACES.match(statement):
+                    head = [statement, end]
+                    nested = 1
+                    closes_statement = bool(IMPORT_FROM_HEAD.match(statement))
+                    continue
+                docstring = None
+                if leading and content.count('\n', leading[0], head_start) <= 1:
+                    docstring = _clean_doc(leading[1])
+                frame = self._open(statement, line_at(head_start), docstring, owner, analysis)
+                if frame[0] in OWNERS:
+                    owner = frame
+                frame.append(owner)
+                stack.append(frame)
+            else:
+                if statement:
+                    self._statement(statement, line_at, head_start, owner, analysis)
+                if stack:
+                    stack.pop()
+                if stack:
+                    stack[-1][2] = False
+                    owner = stack[-1][3]
+                else:
+                    owner = None
+            leading = None
+
+        return analysis
+
+    def _open(self, statement, line, docstring, owner, analysis):
+        """Frame for a block opened by statement, recording the definition it starts"""
+        self._calls(statement, owner)
+        if DECLARATION.match(statement) is None:
+            # if, for, while and other code blocks
+            return ["block", None, False]
+        match = ARCHETYPE.match(statement)
+        if match:
+            kind, name, rest = match.groups()
+            if kind == "walker":
+                record = self._callable(name, statement, line, docstring)
+                analysis["functions"].append(record)
+                return ["walker", record, True]
+            return ["archetype", self._archetype(match, line, docstring, analysis), True]
+
+        match = ABILITY.match(statement)
+        if match:
+            if owner is not None and owner[0] != "archetype":
+                # Entry and exit abilities of a walker act for the walker
+                return ["entry", None, False]
+            record = self._ability(match, statement, line, docstring)
+            if owner is not None:
+                owner[1]["methods"].append(record)
+            else:
+                analysis["functions"].append(record)
+            return ["ability", record, True]
+
+        return ["block", None, False]
+
+    def _archetype(self, match, line, docstring, analysis):
+        kind, name, rest = match.groups()
+        parents = PARENTS.match(rest)
+        parent_text = (parents.group(1) or parents.group(2) or "") if parents else ""
+        record = {
+            "name": name,
+            "docstring": docstring,
+            "methods": [],
+            "parent_classes": [part.strip() for part in parent_text.split(',') if part.strip()],
+            "line_number": line,
+            "kind": "obj" if kind == "object" else kind,
+            "fields": []
+        }
+        analysis["classes"].append(record)
+        return record
+
+    def _ability(self, match, statement, line, docstring):
+        name, rest = match.groups()
+        record = self._callable(name, statement, line, docstring)
+        signature, _, returns = rest.partition('->')
+        if '(' in signature:
+            record["parameters"] = _declarations(signature[signature.index('(') + 1:signature.rindex(')')]
+                                                 if ')' in signature else "")
+        returns = RETURN_TYPE.search('->' + returns) if returns else None
+        if returns:
+            record["return_type"] = returns.group(1)
+        return record
+
+    def _callable(self, name, statement, line, docstring):
+        return {
+            "name": name,
+            "signature": statement,
+            "docstring": docstring,
+            "parameters": [],
+            "return_type": None,
+            "calls": [],
+            "line_number": line,
+            "is_async": statement.startswith("async ")
+        }
+
+    def _statement(self, statement, line_at, offset, owner, analysis):
+        declaration = DECLARATION.match(statement)
+        if declaration is None:
+            # Plain code: only mod:walker(...) invocations matter
+            self._calls(statement, owner)
+            return
+        keyword = declaration.group()
+        if keyword == "import" or keyword == "include":
+            self._imports(IMPORT.match(statement).group(1), line_at(offset), analysis)
+            return
+
+        if owner is None:
+            match = ARCHETYPE.match(statement)
+            if match and match.group(1) != "walker":
+                # edge calls; declares an archetype without a body
+                self._archetype(match, line_at(offset), None, analysis)
+            return
+        kind, record = owner[0], owner[1]
+
+        fields = FIELDS.match(statement) if keyword == "has" else None
+        if fields:
+            modifier, declarations = fields.groups()
+            declared = _declarations(declarations)
+            if kind == "archetype":
+                record["fields"].extend(declared)
+            elif modifier == "output":
+                names = [field["name"] for field in declared]
+                record["return_type"] = ", ".join(([record["return_type"]] if record["return_type"] else []) + names)
+            elif kind == "walker":
+                record["parameters"].extend(declared)
+            return
+
+        match = ABILITY.match(statement)
+        if match:
+            name = match.group(1)
+            if kind == "archetype" and '.' not in name:
+                # An ability declared without a body
+                record["methods"].append(self._ability(match, statement, line_at(offset), None))
+            elif kind != "archetype" and name not in record["calls"]:
+                # can mod.walker; declares what the walker runs
+                record["calls"].append(name)
+            return
+
+        self._calls(statement, owner)
+
+    def _calls(self, statement, owner):
+        """Record mod:walker(...) invocations on the walker or ability they are made in"""
+        if ':' not in statement or owner is None or owner[0] == "archetype":
+            return
+        calls = owner[1]["calls"]
+        for module, name in COLON_CALL.findall(statement):
+            callee = module + "." + name
+            if callee not in calls:
+                calls.append(callee)
+
+    def _imports(self, rest, line, analysis):
+        imports = analysis["imports"]
+        from_import = FROM_IMPORT.match(rest)
+        if from_import:
+            dots, module, names = from_import.groups()
+            for part in _split_top_level(names):
+                name, _, alias = part.partition(' as ')
+                imports.append({"module": module or None, "names": [name.strip()], "aliases": [alias.strip() or None],
+                                "level": len(dots), "from": True, "line_number": line})
+            return
+        braced = BRACED_IMPORT.search(rest)
+        if braced is None:
+            # import:py os, json; import:jac module as alias;
+            for part in _split_top_level(rest):
+                module, _, alias = part.partition(' as ')
+                module = module.strip()
+                if module:
+                    imports.append({"module": module, "names": [module], "aliases": [alias.strip() or None],
+                                    "level": 0, "from": False, "line_number": line})
+            return
+
+        names, spec = braced.groups()
+        stem, extension = os.path.splitext(os.path.basename(spec.rstrip('/')))
+        for part in _split_top_level(names):
+            name, _, alias = part.partition(' as ')
+            name, alias = name.strip(), alias.strip() or None
+            if extension:
+                # import { x } with '../file.py': x is the file's module
+                imports.append({"module": stem, "names": [stem], "aliases": [alias or (name if name != stem else None)],
+                                "level": 0, "from": False, "line_number": line})
+            elif '/' in spec or spec.startswith('.'):
+                # import { a, b } with './': modules of a directory
+                imports.append({"module": name, "names": [name], "aliases": [alias],
+                                "level": 0, "from": False, "line_number": line})
+            else:
+                # import { graph } with 'std': members of a library
+                imports.append({"module": spec, "names": [name], "aliases": [alias],
+                                "level": 0, "from": True, "line_number": line})
@@ -0,0 +1,332 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import Instrumentation
+from pipeline import DocumentationPipeline, PipelineCancelled
+
+DEFAULT_JOB_DB = os.path.join(".", "outputs", "jobs.sqlite3")
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUE = 32
+# Event logs of finished jobs kept for late subscribers
+MAX_RETAINED_LOGS = 256
+
+QUEUED = "queued"
+PROCESSING = "processing"
+COMPLETED = "completed"
+ERROR = "error"
+CANCELLED = "cancelled"
+ACTIVE_STATES = (QUEUED, PROCESSING)
+TERMINAL_STATES = (COMPLETED, ERROR, CANCELLED)
+
+
+class QueueFull(Exception):
+    """Raised by submit when the queue is at capacity; callers should retry later"""
+
+
+class JobStore:
+    """Persistent job table in SQLite, safe to share between threads"""
+
+    COLUMNS = ("id", "repo_url", "commit_sha", "options", "status", "stage", "progress",
+               "output_dir", "documentation_path", "result", "error", "created_at", "updated_at")
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("CODEBASE_GENIUS_JOB_DB", DEFAULT_JOB_DB)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                repo_url TEXT NOT NULL,
+                commit_sha TEXT,
+                options TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT,
+                progress INTEGER NOT NULL DEFAULT 0,
+                output_dir TEXT,
+                documentation_path TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "output_dir" not in columns:
+            # Job tables created before each job had its own output directory
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN output_dir TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_repo ON jobs (repo_url, commit_sha, status)")
+        self._conn.commit()
+
+    def create(self, repo_url, commit_sha, options, job_id=None, output_dir=None):
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, repo_url, commit_sha, options, status, progress, output_dir, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                (job_id, repo_url, commit_sha, json.dumps(options), QUEUED, output_dir, now, now)
+            )
+            self._conn.commit()
+        return job_id
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row(row) if row else None
+
+    def find(self, repo_url, commit_sha, statuses):
+        """Most recent job for a repo at a commit in one of statuses"""
+        placeholders = ", ".join("?" for _ in statuses)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM jobs "
+                f"WHERE repo_url = ? AND commit_sha = ? AND status IN ({placeholders}) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (repo_url, commit_sha, *statuses)
+            ).fetchone()
+        return self._row(row) if row else None
+
+    def count(self, status):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def fail_interrupted(self):
+        """Mark jobs left active by a previous process as failed"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status IN (?, ?)",
+                (ERROR, "Interrupted by a server restart", time.time(), *ACTIVE_STATES)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def _row(self, row):
+        job = dict(zip(self.COLUMNS, row))
+        job["options"] = json.loads(job["options"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobManager:
+    """Runs documentation jobs on a bounded worker pool.
+
+    Jobs are recorded in a JobStore and picked up by at most ``workers``
+    threads; at most ``max_queue`` may wait, after which submit raises
+    QueueFull. A request for a repository at a commit that is already queued,
+    running or documented returns the existing job instead of a new one.
+    Every job writes to its own output directory (see
+    DocumentationPipeline.run_directory), so jobs that run side by side never
+    share files and a finished document is never overwritten by a later job.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, pipeline=None, store=None, workers=None, max_queue=None):
+        self.pipeline = pipeline or DocumentationPipeline()
+        self.store = store or JobStore()
+        self.workers = workers or int(os.environ.get("CODEBASE_GENIUS_JOB_WORKERS", DEFAULT_WORKERS))
+        self.max_queue = max_queue or int(os.environ.get("CODEBASE_GENIUS_JOB_QUEUE", DEFAULT_MAX_QUEUE))
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="docs-job")
+        self._lock = threading.Lock()
+        self._cancel_events = {}
+        self._listeners = []
+        # Totals over every run of this process, exported for Prometheus
+        self.metrics = Instrumentation("server")
+
+        # Per-job event logs for push subscribers: job id -> [(seq, event, data)]
+        self._logs = OrderedDict()
+        self._log_changed = threading.Condition()
+        self._seq = 0
+
+        interrupted = self.store.fail_interrupted()
+        if interrupted:
+            print(f"Marked {interrupted} interrupted jobs as failed")
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide job manager"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def add_listener(self, listener):
+        """Call listener(job_id, event, data) on every progress or state change"""
+        self._listeners.append(listener)
+
+    def _notify(self, job_id, event, data):
+        with self._log_changed:
+            self._seq += 1
+            log = self._logs.setdefault(job_id, [])
+            # Only the latest progress matters; a run reports it once per file
+            if event == "progress" and log and log[-1][1] == "progress":
+                log[-1] = (self._seq, event, data)
+            else:
+                log.append((self._seq, event, data))
+            if event == "status" and data["status"] in TERMINAL_STATES:
+                self._logs.move_to_end(job_id)
+                while len(self._logs) > MAX_RETAINED_LOGS:
+                    self._logs.popitem(last=False)
+            self._log_changed.notify_all()
+        for listener in self._listeners:
+            try:
+                listener(job_id, event, data)
+            except Exception as e:
+                print(f"Job listener failed: {e}")
+
+    def submit(self, repo_url, clone_strategy=None, profile=False, budget=None):
+        """Queue a documentation job, returning (job_id, deduplicated)
+
+        profile=True captures a cProfile of this job and tracemalloc data
+        (process-wide, so jobs running alongside are included); such a
+        request is never answered with an earlier completed run.
+        budget ({"seconds": ..., "files": ..., "bytes": ...}) bounds the
+        analysis; a running job is shared only with requests of the same
+        budget, and a budget-limited run never answers a request without one.
+        """
+        commit = self.pipeline.head_commit(repo_url)
+        options = {"clone_strategy": clone_strategy, "profile": profile, "budget": budget or None}
+
+        with self._lock:
+            if commit:
+                existing = self.store.find(repo_url, commit, ACTIVE_STATES)
+                if existing and existing["options"].get("budget") != options["budget"]:
+                    existing = None
+                if existing is None and not profile:
+                    existing = self.store.find(repo_url, commit, (COMPLETED,))
+                    if existing and not os.path.exists(existing["documentation_path"] or ""):
+                        existing = None
+                    # A complete earlier run satisfies any budget; a partial one only a budgeted request
+                    coverage = existing and (existing["result"] or {}).get("coverage")
+                    if coverage and not coverage["complete"] and not budget:
+                        existing = None
+                if existing:
+                    return existing["id"], True
+
+            if self.store.count(QUEUED) >= self.max_queue:
+                raise QueueFull(f"{self.max_queue} jobs are already waiting")
+
+            job_id = uuid.uuid4().hex
+            output_dir = self.pipeline.run_directory(repo_url, commit, job_id)
+            self.store.create(repo_url, commit, options, job_id=job_id, output_dir=output_dir)
+            self._cancel_events[job_id] = threading.Event()
+            self._executor.submit(self._run, job_id, repo_url, options, output_dir)
+        return job_id, False
+
+    def status(self, job_id):
+        return self.store.get(job_id)
+
+    def events_since(self, job_id, seq=0, timeout=15.0):
+        """Events of a job newer than seq, waiting up to timeout for the first one"""
+        deadline = time.monotonic() + timeout
+        with self._log_changed:
+            while True:
+                events = [entry for entry in self._logs.get(job_id, ()) if entry[0] > seq]
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                self._log_changed.wait(remaining)
+
+    def document_path(self, job):
+        """Where a job's document is (or is being) written; None before rendering starts"""
+        if job["documentation_path"]:
+            return job["documentation_path"]
+        if job["status"] == PROCESSING and job["stage"] == "docs" and job["output_dir"]:
+            # Rendered into a temporary file, renamed once complete
+            path = os.path.join(job["output_dir"], "docs.md")
+            return path + ".tmp" if os.path.exists(path + ".tmp") else path
+        return None
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs never start, running ones stop at the next checkpoint"""
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in ACTIVE_STATES:
+            return False
+        event = self._cancel_events.get(job_id)
+        if event is None:
+            return False
+        event.set()
+        if job["status"] == QUEUED:
+            self.store.update(job_id, status=CANCELLED)
+            self._notify(job_id, "status", {"status": CANCELLED})
+        return True
+
+    def _run(self, job_id, repo_url, options, output_dir):
+        event = self._cancel_events[job_id]
+        try:
+            if event.is_set():
+                return
+            self.store.update(job_id, status=PROCESSING)
+            self._notify(job_id, "status", {"status": PROCESSING})
+
+            last = [None]
+
+            def progress(stage, percent):
+                # Only persist real changes; parse progress fires per file
+                if (stage, percent) != last[0]:
+                    last[0] = (stage, percent)
+                    self.store.update(job_id, stage=stage, progress=percent)
+                    self._notify(job_id, "progress", {"stage": stage, "progress": percent})
+
+            def on_section(title, start, end):
+                self._notify(job_id, "section", {"title": title, "start": start, "end": end})
+
+            result = self.pipeline.run(
+                repo_url,
+                clone_strategy=options.get("clone_strategy"),
+                progress=progress,
+                cancelled=event.is_set,
+                on_section=on_section,
+                profile=options.get("profile", False),
+                budget=options.get("budget"),
+                output_dir=output_dir
+            )
+            self.metrics.merge(result.pop("metrics"))
+            self.store.update(
+                job_id,
+                status=COMPLETED,
+                progress=100,
+                commit_sha=result["commit"],
+                documentation_path=result["documentation_path"],
+                result=result
+            )
+            self._notify(job_id, "status", {"status": COMPLETED, "documentation_path": result["documentation_path"]})
+        except PipelineCancelled:
+            self.store.update(job_id, status=CANCELLED)
+            self._notify(job_id, "status", {"status": CANCELLED})
+        except Exception as e:
+            self.store.update(job_id, status=ERROR, error=str(e))
+            self._notify(job_id, "status", {"status": ERROR, "error": str(e)})
+        finally:
+            with self._lock:
+                self._cancel_events.pop(job_id, None)
+
+    def shutdown(self, wait=True):
+        for event in list(self._cancel_events.values()):
+            event.set()
+        self._executor.shutdown(wait=wait)
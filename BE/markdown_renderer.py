@@ -0,0 +1,338 @@
+import contextlib
+import os
+
+from call_graph import CallGraph
+from diagram_generator import DiagramGenerator
+
+# Chunks are gathered up to this size before each write to the sink
+WRITE_BUFFER_BYTES = 64 * 1024
+# Packages given a drill-down diagram of their own
+MAX_PACKAGE_DIAGRAMS = 10
+
+ENTRY_POINT_NAMES = {
+    "main.py", "app.py", "__main__.py", "cli.py", "manage.py",
+    "main.jac", "index.js", "main.go", "main.ts"
+}
+
+RUN_COMMANDS = {
+    ".py": "python {}",
+    ".jac": "jac run {}",
+    ".js": "node {}",
+    ".go": "go run {}"
+}
+
+FENCE_LANGUAGES = {
+    ".py": "python",
+    ".jac": "jac",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".mjs": "javascript",
+    ".cjs": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+    ".go": "go",
+    ".java": "java"
+}
+
+
+class MarkdownRenderer:
+    """Stream the generated documentation section by section.
+
+    Every section is a generator of text chunks, so the document is never
+    held in memory as a whole: chunks are encoded and written to a file or
+    any other sink with a ``write`` method (an HTTP response, a socket) as
+    they are produced. ``on_section(title, start, end)`` is called once a
+    section has been flushed, with its byte range in the output.
+    """
+
+    def __init__(self, repo_url, readme_summary, file_tree, code_graph):
+        self.repo_url = repo_url
+        self.readme_summary = readme_summary
+        self.file_tree = file_tree
+        self.code_graph = code_graph
+        self.root_path = file_tree.get("path", "")
+        # (title, start, end) byte ranges of the sections rendered last
+        self.section_offsets = []
+
+    def sections(self):
+        """(title, chunk generator) pairs in document order"""
+        return [
+            ("Table of Contents", self._table_of_contents()),
+            ("Project Overview", self._overview()),
+            ("Repository Structure", self._repository_structure()),
+            ("Installation", self._installation()),
+            ("Usage", self._usage()),
+            ("API Reference", self._api_reference()),
+            ("Architecture", self._architecture()),
+            ("Code Analysis", self._code_analysis())
+        ]
+
+    def iter_chunks(self):
+        """Yield the whole document as text chunks"""
+        for _, chunks in self.sections():
+            yield from chunks
+
+    def render(self, sink, on_section=None):
+        """Write the document to sink, returning the number of bytes written"""
+        written = 0
+        self.section_offsets = []
+        for title, chunks in self.sections():
+            start = written
+            buffer, buffered = [], 0
+            for chunk in chunks:
+                data = chunk.encode('utf-8')
+                buffer.append(data)
+                buffered += len(data)
+                if buffered >= WRITE_BUFFER_BYTES:
+                    sink.write(b"".join(buffer))
+                    written += buffered
+                    buffer, buffered = [], 0
+            if buffer:
+                sink.write(b"".join(buffer))
+                written += buffered
+            if hasattr(sink, "flush"):
+                sink.flush()
+            self.section_offsets.append((title, start, written))
+            if on_section:
+                on_section(title, start, written)
+        return written
+
+    def save(self, path, on_section=None):
+        """Render into path, replacing any previous document only once complete"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        try:
+            with open(path + ".tmp", 'wb') as f:
+                written = self.render(f, on_section)
+        except BaseException:
+            # An interrupted render (cancellation, client gone) leaves nothing behind;
+            # if the file could not even be created, the original error is what matters
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path + ".tmp")
+            raise
+        os.replace(path + ".tmp", path)
+        return written
+
+    def _relative(self, path):
+        return os.path.relpath(path, self.root_path) if self.root_path else path
+
+    def _table_of_contents(self):
+        repo_name = self.repo_url.split('/')[-1]
+        yield f"# {repo_name} Documentation\n\n"
+        yield "## Table of Contents\n"
+        yield "- [Project Overview](#project-overview)\n"
+        yield "- [Repository Structure](#repository-structure)\n"
+        yield "- [Installation](#installation)\n"
+        yield "- [Usage](#usage)\n"
+        yield "- [API Reference](#api-reference)\n"
+        yield "- [Architecture](#architecture)\n"
+        yield "- [Code Analysis](#code-analysis)\n\n"
+
+    def _overview(self):
+        yield "## Project Overview\n\n"
+        yield f"{self.readme_summary}\n\n"
+        yield f"**Repository URL**: {self.repo_url}\n\n"
+
+    def _repository_structure(self):
+        yield "## Repository Structure\n\n"
+        yield "```\n"
+        # Iterative depth-first walk; each entry carries its line prefix
+        stack = [(child, "") for child in reversed(self.file_tree.get("children", []))]
+        while stack:
+            item, indent = stack.pop()
+            if item["type"] == "directory":
+                yield f"{indent}{item['name']}/\n"
+                stack.extend((child, indent + "    ") for child in reversed(item.get("children", [])))
+            else:
+                yield f"{indent}├── {item['name']}\n"
+        yield "```\n\n"
+
+    def _installation(self):
+        yield "## Installation\n\n"
+        index = self.file_tree["index"]
+        found = False
+
+        # Check for common installation files (O(1) lookups in the file index)
+        if index.has_name("requirements.txt"):
+            found = True
+            yield "### Using pip\n\n"
+            yield "```bash\npip install -r requirements.txt\n```\n\n"
+
+        if index.has_name("setup.py"):
+            found = True
+            yield "### Using setup.py\n\n"
+            yield "```bash\npython setup.py install\n```\n\n"
+
+        if index.has_name("package.json"):
+            found = True
+            yield "### Using npm\n\n"
+            yield "```bash\nnpm install\n```\n\n"
+
+        if not found:
+            yield "Please refer to the repository's README for installation instructions.\n\n"
+
+    def _usage(self):
+        yield "## Usage\n\n"
+        nodes = self.code_graph["nodes"]
+        entry_points = [
+            file_path for file_path in nodes
+            if os.path.basename(file_path) in ENTRY_POINT_NAMES
+        ]
+
+        if not entry_points:
+            yield "No entry points were detected; see the [API Reference](#api-reference) below.\n\n"
+            return
+
+        yield "### Entry Points\n\n"
+        for file_path in entry_points:
+            rel_path = self._relative(file_path)
+            command = RUN_COMMANDS.get(os.path.splitext(file_path)[1])
+            yield f"#### {rel_path}\n\n"
+            if command:
+                yield f"```bash\n{command.format(rel_path)}\n```\n\n"
+
+            functions = nodes[file_path].get("functions", [])
+            public = [func for func in functions if not func["name"].startswith('_')]
+            if public:
+                yield "**Defines**:\n\n"
+                for func in public:
+                    yield f"- `{func['signature']}`\n"
+                yield "\n"
+
+    def _api_reference(self):
+        yield "## API Reference\n\n"
+
+        # Group by file
+        for file_path, file_data in self.code_graph["nodes"].items():
+            classes = file_data.get("classes", [])
+            functions = file_data.get("functions", [])
+            if not functions and not classes:
+                continue
+
+            language = FENCE_LANGUAGES.get(os.path.splitext(file_path)[1], "")
+            yield f"### {self._relative(file_path)}\n\n"
+
+            # Classes
+            for cls in classes:
+                # Jac archetypes are labelled by their kind (Node, Edge, Obj, ...)
+                yield f"#### {cls.get('kind', 'class').capitalize()}: {cls['name']}\n\n"
+                if cls.get("docstring"):
+                    yield f"{cls['docstring']}\n\n"
+
+                if cls.get("fields"):
+                    yield "**Fields**:\n\n"
+                    for field in cls["fields"]:
+                        yield f"- `{field['name']}`: {field['type']}\n"
+                    yield "\n"
+
+                # Methods
+                if cls.get("methods"):
+                    yield "**Methods**:\n\n"
+                    for method in cls["methods"]:
+                        yield f"- `{method['signature']}`\n"
+                        if method.get("docstring"):
+                            yield f"  - {method['docstring']}\n"
+                    yield "\n"
+
+            # Functions
+            for func in functions:
+                kind = "Walker" if "walker" in func["signature"].split()[:2] else "Function"
+                yield f"#### {kind}: {func['name']}\n\n"
+                yield f"```{language}\n{func['signature']}\n```\n\n"
+                if func.get("docstring"):
+                    yield f"{func['docstring']}\n\n"
+
+                if func.get("parameters"):
+                    yield "**Parameters**:\n\n"
+                    for param in func["parameters"]:
+                        yield f"- `{param['name']}`: {param['type']}\n"
+                    yield "\n"
+
+    def _architecture(self):
+        yield "## Architecture\n\n"
+        yield "### Package Overview\n\n"
+        yield "```mermaid\n"
+        yield from DiagramGenerator.iter_architecture_diagram(self.file_tree, self.code_graph)
+        yield "\n```\n\n"
+
+        yield "### Class Diagram\n\n"
+        yield "```mermaid\n"
+        yield from DiagramGenerator.iter_class_diagram(self.code_graph)
+        yield "\n```\n\n"
+
+        yield "### Function Call Graph\n\n"
+        yield "```mermaid\n"
+        yield from DiagramGenerator.iter_function_call_graph(self.code_graph)
+        yield "\n```\n\n"
+
+        # Each diagram above fits a budget; the busiest packages get a closer look
+        for name, chunks in DiagramGenerator.iter_package_diagrams(self.code_graph, MAX_PACKAGE_DIAGRAMS):
+            yield f"### Package: {name}\n\n"
+            yield "```mermaid\n"
+            yield from chunks
+            yield "\n```\n\n"
+
+    def _code_analysis(self):
+        yield "## Code Analysis\n\n"
+        nodes = self.code_graph["nodes"]
+
+        counts = {"functions": 0, "classes": 0, "methods": 0, "imports": 0}
+        languages = {}
+        definitions = []
+        for file_path, file_data in nodes.items():
+            classes = file_data.get("classes", [])
+            methods = sum(len(cls.get("methods", [])) for cls in classes)
+            counts["functions"] += len(file_data.get("functions", []))
+            counts["classes"] += len(classes)
+            counts["methods"] += methods
+            counts["imports"] += len(file_data.get("imports", []))
+            extension = os.path.splitext(file_path)[1] or "(none)"
+            languages[extension] = languages.get(extension, 0) + 1
+            definitions.append((len(file_data.get("functions", [])) + len(classes) + methods, file_path))
+
+        yield "### Summary\n\n"
+        yield "| Metric | Count |\n|---|---|\n"
+        yield f"| Files analysed | {len(nodes)} |\n"
+        yield f"| Classes | {counts['classes']} |\n"
+        yield f"| Functions | {counts['functions']} |\n"
+        yield f"| Methods | {counts['methods']} |\n"
+        yield f"| Imports | {counts['imports']} |\n\n"
+
+        coverage = self.code_graph.get("coverage")
+        if coverage and not coverage["complete"]:
+            yield "### Coverage\n\n"
+            yield (f"This analysis was limited by its {coverage['stopped_by'] or 'budget'} budget and covers "
+                   f"{coverage['files_analysed']} of {coverage['files_total']} files "
+                   f"({coverage['bytes_analysed']} of {coverage['bytes_total']} bytes). Files were analysed "
+                   f"in priority order, which accounts for {coverage['priority_covered']:.0%} of the "
+                   f"repository's total priority.\n\n")
+            if coverage["top_skipped"]:
+                yield "Highest-priority files not analysed:\n\n"
+                for file_path in coverage["top_skipped"]:
+                    yield f"- `{file_path}`\n"
+                yield "\n"
+
+        yield "### Files by Extension\n\n"
+        for extension, count in sorted(languages.items(), key=lambda item: item[1], reverse=True):
+            yield f"- `{extension}`: {count}\n"
+        yield "\n"
+
+        graph = CallGraph.for_graph(self.code_graph)
+        stats = graph.stats()
+        yield "### Resolved Relationships\n\n"
+        yield (f"{stats['calls']} calls, {stats['imports']} imports and "
+               f"{stats['inherits']} inheritance links were resolved between definitions.\n\n")
+
+        coupling = graph.module_coupling()[:10]
+        if coupling:
+            yield "### Most Connected Modules\n\n"
+            for directory, count in coupling:
+                yield f"- `{self._relative(directory) or '.'}`: {count} cross-file links\n"
+            yield "\n"
+
+        largest = sorted(definitions, reverse=True)[:10]
+        if largest and largest[0][0]:
+            yield "### Largest Files\n\n"
+            for count, file_path in largest:
+                if count:
+                    yield f"- `{self._relative(file_path)}`: {count} definitions\n"
+            yield "\n"
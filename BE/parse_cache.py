@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "codebase_genius")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ParseCache:
+    """Persistent content-addressed cache of parser results.
+
+    Entries are keyed by the git blob SHA of the file content and the parser
+    version, so a cached analysis is valid for any path and any clone that has
+    the same bytes. Storage is a single SQLite file under the cache directory
+    with size-bounded LRU eviction.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or os.environ.get("CODEBASE_GENIUS_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes or int(os.environ.get("CODEBASE_GENIUS_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.path = os.path.join(self.cache_dir, "parse_cache.sqlite3")
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                blob_sha TEXT NOT NULL,
+                parser_version TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (blob_sha, parser_version)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide cache, or None if disabled via environment"""
+        if os.environ.get("CODEBASE_GENIUS_PARSE_CACHE", "1") == "0":
+            return None
+        with cls._shared_lock:
+            if cls._shared is None:
+                try:
+                    cls._shared = cls()
+                except (OSError, sqlite3.Error) as e:
+                    print(f"Parse cache unavailable: {e}")
+                    return None
+            return cls._shared
+
+    @staticmethod
+    def hash_file(file_path):
+        """Compute the git blob SHA-1 of a file without loading it whole"""
+        try:
+            size = os.path.getsize(file_path)
+            digest = hashlib.sha1(f"blob {size}\0".encode())
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+            return digest.hexdigest()
+        except OSError:
+            return None
+
+    def get(self, blob_sha, parser_version):
+        """Return the cached analysis dict for a blob, or None on a miss"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM entries WHERE blob_sha = ? AND parser_version = ?",
+                (blob_sha, parser_version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE blob_sha = ? AND parser_version = ?",
+                (time.time(), blob_sha, parser_version)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def contains(self, blob_sha, parser_version):
+        """Check for an entry without counting a lookup or touching its LRU position"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM entries WHERE blob_sha = ? AND parser_version = ?",
+                (blob_sha, parser_version)
+            ).fetchone()
+        return row is not None
+
+    def put(self, blob_sha, parser_version, analysis):
+        """Store an analysis dict for a blob, evicting old entries if needed"""
+        # The path is not part of the content, it is re-attached on lookup
+        record = {key: value for key, value in analysis.items() if key != "file_path"}
+        payload = zlib.compress(json.dumps(record, separators=(',', ':')).encode('utf-8'))
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._conn.execute(
+                "SELECT size FROM entries WHERE blob_sha = ? AND parser_version = ?",
+                (blob_sha, parser_version)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (blob_sha, parser_version, payload, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (blob_sha, parser_version, payload, size, time.time())
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the store is at 90% of its bound"""
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            "SELECT blob_sha, parser_version, size FROM entries ORDER BY last_access ASC"
+        )
+        doomed = []
+        for blob_sha, parser_version, size in rows:
+            if self._total_bytes <= target:
+                break
+            doomed.append((blob_sha, parser_version))
+            self._total_bytes -= size
+        self._conn.executemany(
+            "DELETE FROM entries WHERE blob_sha = ? AND parser_version = ?", doomed
+        )
+        self.evictions += len(doomed)
+
+    def stats(self):
+        """Return hit/miss counters and current store size"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,193 +1,525 @@
 import ast
 import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Any
-import tree_sitter
-from tree_sitter import Language, Parser
+import ingest
+import instrumentation
+from jac_parser import JacParser
+from parse_cache import ParseCache
+from treesitter_backend import TreeSitterBackend
 
-class ParserUtils:
+# Files smaller than this are parsed inline; a pool costs more than it saves
+MIN_PARALLEL_FILES = 16
+# Upper bound on files per chunk, so early results stream back promptly
+MAX_CHUNK_FILES = 64
+
+_worker_parser = None
+# CPython 3.11 keeps the AST conversion's recursion depth in interpreter-wide
+# state, so concurrent ast.parse calls from threads (two jobs parsing inline)
+# can fail with "AST constructor recursion depth mismatch" (gh-106905)
+_ast_lock = threading.Lock()
+
+
+def available_cpus():
+    """Count the CPUs this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _init_parse_worker():
+    """Create one parser per worker process"""
+    global _worker_parser
+    _worker_parser = ParserUtils(cache=False)
+
+
+def parse_pool(workers=None):
+    """A process pool of parse workers that several ParserUtils runs can share"""
+    return ProcessPoolExecutor(max_workers=workers or available_cpus(), initializer=_init_parse_worker)
+
+
+def _parse_chunk(chunk):
+    """Parse a chunk of file infos inside a worker process"""
+    return [_worker_parser._parse_measured(file_info) for file_info in chunk]
+
+
+class PythonAnalyzer(ast.NodeVisitor):
+    """Collect functions, classes, methods, imports and call sites in one traversal.
+    
+    Top-level functions go to ``functions`` and methods to their class; calls
+    made inside nested functions or lambdas are attributed to the enclosing
+    recorded function. Classes defined inside a class or function are listed
+    with the rest under their qualified name (``Outer.Inner``). Only plain
+    data is kept, never references to AST nodes.
+    """
+    
+    # Node types that can never contain a definition, import or call
+    _LEAF_TYPES = (
+        ast.Name, ast.Constant, ast.expr_context, ast.operator, ast.unaryop,
+        ast.boolop, ast.cmpop, ast.Pass, ast.Break, ast.Continue, ast.alias
+    )
     
     def __init__(self):
-        self.python_parser = self._setup_python_parser()
+        self.functions = []
+        self.classes = []
+        self.imports = []
+        # Stack of (kind, info, seen_calls); info is the record calls are attributed to
+        self._scopes = []
+        # Qualified names of the enclosing classes and functions
+        self._qualnames = []
+        self._dispatch = {}
     
-    def _setup_python_parser(self):
-        """Setup Tree-sitter Python parser"""
-        try:
-            # Try to load built-in parser
-            PYTHON_LANGUAGE = Language('build/languages.so', 'python')
-            parser = Parser()
-            parser.set_language(PYTHON_LANGUAGE)
-            return parser
-        except:
-            # Fallback to AST parser
-            return None
+    def visit(self, node):
+        node_type = type(node)
+        method = self._dispatch.get(node_type)
+        if method is None:
+            method = getattr(self, 'visit_' + node_type.__name__, self.generic_visit)
+            self._dispatch[node_type] = method
+        method(node)
+    
+    def generic_visit(self, node):
+        leaf_types = self._LEAF_TYPES
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST) and not isinstance(item, leaf_types):
+                        self.visit(item)
+            elif isinstance(value, ast.AST) and not isinstance(value, leaf_types):
+                self.visit(value)
+    
+    def visit_ClassDef(self, node):
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        for base in node.bases:
+            self.visit(base)
+        
+        qualname = self._qualnames[-1] + "." + node.name if self._qualnames else node.name
+        class_info = {
+            "name": qualname,
+            "docstring": ast.get_docstring(node),
+            "methods": [],
+            "parent_classes": [
+                name for name in (_dotted_name(base) for base in node.bases) if name
+            ],
+            "line_number": node.lineno
+        }
+        self.classes.append(class_info)
+        
+        self._scopes.append(("class", class_info, None))
+        self._qualnames.append(qualname)
+        for statement in node.body:
+            self.visit(statement)
+        self._qualnames.pop()
+        self._scopes.pop()
+    
+    def visit_FunctionDef(self, node):
+        self._visit_function(node, False)
+    
+    def visit_AsyncFunctionDef(self, node):
+        self._visit_function(node, True)
+    
+    def _visit_function(self, node, is_async):
+        # Decorators, defaults and annotations run in the enclosing scope
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.visit(node.args)
+        if node.returns is not None:
+            self.visit(node.returns)
+        
+        parent = self._scopes[-1] if self._scopes else None
+        if parent is None or parent[0] == "class":
+            func_info = {
+                "name": node.name,
+                "signature": _function_signature(node, is_async),
+                "docstring": ast.get_docstring(node),
+                "parameters": _function_parameters(node.args),
+                "return_type": _render_expr(node.returns) if node.returns is not None else None,
+                "calls": [],
+                "line_number": node.lineno,
+                "is_async": is_async
+            }
+            if parent is None:
+                self.functions.append(func_info)
+            else:
+                parent[1]["methods"].append(func_info)
+            scope = ("function", func_info, set())
+        else:
+            # Nested function: its calls belong to the enclosing function
+            scope = parent
+        
+        self._scopes.append(scope)
+        self._qualnames.append(self._qualnames[-1] + "." + node.name if self._qualnames else node.name)
+        for statement in node.body:
+            self.visit(statement)
+        self._qualnames.pop()
+        self._scopes.pop()
+    
+    def visit_Call(self, node):
+        if self._scopes and self._scopes[-1][0] == "function":
+            callee = _dotted_name(node.func)
+            _, func_info, seen_calls = self._scopes[-1]
+            if callee and callee not in seen_calls:
+                seen_calls.add(callee)
+                func_info["calls"].append(callee)
+        self.generic_visit(node)
+    
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.imports.append({
+                "module": alias.name,
+                "names": [alias.name],
+                "aliases": [alias.asname],
+                "level": 0,
+                "from": False,
+                "line_number": node.lineno
+            })
+    
+    def visit_ImportFrom(self, node):
+        self.imports.append({
+            "module": node.module,
+            "names": [alias.name for alias in node.names],
+            "aliases": [alias.asname for alias in node.names],
+            "level": node.level,
+            "from": True,
+            "line_number": node.lineno
+        })
+
+
+def _dotted_name(node):
+    """Render Name/Attribute chains such as ``self.client.get`` as a string"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+    elif isinstance(node, ast.Subscript):
+        # Generic[T] and friends: keep the generic's name
+        return _dotted_name(node.value)
+    else:
+        return None
+    return '.'.join(reversed(parts))
+
+
+def _function_parameters(args):
+    """Extract parameters, including keyword-only and variadic ones, with their annotations"""
+    params = []
+    for arg in args.posonlyargs + args.args:
+        params.append({"name": arg.arg, "type": _render_expr(arg.annotation) if arg.annotation else "Any"})
+    if args.vararg:
+        params.append({"name": "*" + args.vararg.arg,
+                       "type": _render_expr(args.vararg.annotation) if args.vararg.annotation else "Any"})
+    for arg in args.kwonlyargs:
+        params.append({"name": arg.arg, "type": _render_expr(arg.annotation) if arg.annotation else "Any"})
+    if args.kwarg:
+        params.append({"name": "**" + args.kwarg.arg,
+                       "type": _render_expr(args.kwarg.annotation) if args.kwarg.annotation else "Any"})
+    return params
+
+
+def _function_signature(node, is_async):
+    """Extract function signature, including annotations and return type"""
+    args = node.args
+    positional = args.posonlyargs + args.args
+    # Defaults align with the last positional parameters
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    
+    rendered = []
+    for index, (arg, default) in enumerate(zip(positional, defaults)):
+        rendered.append(_render_arg(arg, default))
+        if args.posonlyargs and index == len(args.posonlyargs) - 1:
+            rendered.append("/")
+    if args.vararg:
+        rendered.append("*" + _render_arg(args.vararg, None))
+    elif args.kwonlyargs:
+        rendered.append("*")
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        rendered.append(_render_arg(arg, default))
+    if args.kwarg:
+        rendered.append("**" + _render_arg(args.kwarg, None))
+    
+    prefix = "async def" if is_async else "def"
+    returns = f" -> {_render_expr(node.returns)}" if node.returns is not None else ""
+    return f"{prefix} {node.name}({', '.join(rendered)}){returns}"
+
+
+def _render_arg(arg, default):
+    text = arg.arg
+    if arg.annotation is not None:
+        text += ": " + _render_expr(arg.annotation)
+    if default is not None:
+        text += (" = " if arg.annotation is not None else "=") + _render_expr(default)
+    return text
+
+
+def _render_expr(node):
+    """Render an annotation or default; simple forms skip the cost of ast.unparse"""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Constant) and not isinstance(node.value, str):
+        return repr(node.value)
+    if isinstance(node, ast.Attribute):
+        name = _dotted_name(node)
+        if name:
+            return name
+    return ast.unparse(node)
+
+
+class ParserUtils:
+    
+    # Bump whenever the shape or content of parse results changes, so cached
+    # analyses produced by an older parser are not served.
+    PARSER_VERSION = "8"
+    
+    def __init__(self, cache=None, pool=None, pool_workers=None):
+        self.tree_sitter = TreeSitterBackend()
+        self.jac_parser = JacParser()
+        self.cache = ParseCache.shared() if cache is None else (cache or None)
+        # A shared parse_pool(); each run then keeps only a few chunks queued on it
+        if pool is not None and not pool_workers:
+            raise ValueError("pool_workers is required with a shared pool")
+        self.pool = pool
+        self.pool_workers = pool_workers
     
     def parse_file(self, file_info):
         """Parse a source code file"""
         file_path = file_info["path"]
-        file_extension = file_info.get("extension", "")
         
+        metrics = instrumentation.current()
+        
+        # Oversized files are rejected on their size, so hashing them would be wasted I/O
+        if self.cache is None or ingest.exceeds_limit(file_info.get("size")):
+            return self._parse_recorded(file_info, metrics)
+        
+        # Use the blob SHA from the git index when known, so hits never open the file
+        blob_sha = file_info.get("blob_sha") or ParseCache.hash_file(file_path)
+        if blob_sha is None:
+            return self._parse_recorded(file_info, metrics)
+        
+        cached = self.cache.get(blob_sha, self.PARSER_VERSION)
+        if cached is not None:
+            cached["file_path"] = file_path
+            metrics.record_file(file_path, 0.0, 0, "cached")
+            return cached
+        
+        analysis = self._parse_recorded(file_info, metrics)
+        self._store(blob_sha, analysis)
+        return analysis
+    
+    def _parse_recorded(self, file_info, metrics):
+        analysis, seconds, bytes_read, outcome = self._parse_measured(file_info)
+        metrics.record_file(file_info["path"], seconds, bytes_read, outcome)
+        return analysis
+    
+    def parse_files(self, file_infos, workers=None):
+        """Parse many files across a process pool, yielding (file_info, analysis) in input order"""
+        file_infos = list(file_infos)
+        workers = workers or self.pool_workers or available_cpus()
+        metrics = instrumentation.current()
+        
+        # Serve cache hits in this process; only misses are shipped to workers
+        results = [None] * len(file_infos)
+        pending = []
+        blob_shas = {}
+        for index, file_info in enumerate(file_infos):
+            if self.cache is not None and not ingest.exceeds_limit(file_info.get("size")):
+                blob_sha = file_info.get("blob_sha") or ParseCache.hash_file(file_info["path"])
+                if blob_sha is not None:
+                    blob_shas[index] = blob_sha
+                    cached = self.cache.get(blob_sha, self.PARSER_VERSION)
+                    if cached is not None:
+                        cached["file_path"] = file_info["path"]
+                        results[index] = cached
+                        metrics.record_file(file_info["path"], 0.0, 0, "cached")
+                        continue
+            pending.append(index)
+        
+        if workers <= 1 or len(pending) < MIN_PARALLEL_FILES:
+            for index, file_info in enumerate(file_infos):
+                if results[index] is None:
+                    results[index] = self._parse_recorded(file_info, metrics)
+                    if index in blob_shas:
+                        self._store(blob_shas[index], results[index])
+                yield file_info, results[index]
+            return
+        
+        chunks = self._balanced_chunks(file_infos, pending, workers)
+        pool = self.pool or ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker)
+        # On a shared pool a run queues at most two chunks per worker, so
+        # concurrent runs take turns instead of the largest one going first
+        window = workers * 2 if self.pool else len(chunks)
+        futures = []
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except:
-            try:
-                with open(file_path, 'r', encoding='latin-1') as f:
-                    content = f.read()
-            except:
-                return None
+            for chunk in chunks[:window]:
+                futures.append(pool.submit(_parse_chunk, [file_infos[index] for index in chunk]))
+            
+            # Chunks are contiguous runs of the priority order, so waiting on them
+            # in submission order streams results back in priority order
+            next_index = 0
+            for position, chunk in enumerate(chunks):
+                future = futures[position]
+                if position + window < len(chunks):
+                    futures.append(pool.submit(
+                        _parse_chunk, [file_infos[index] for index in chunks[position + window]]
+                    ))
+                for index, (analysis, seconds, bytes_read, outcome) in zip(chunk, future.result()):
+                    metrics.record_file(file_infos[index]["path"], seconds, bytes_read, outcome)
+                    results[index] = analysis
+                    if index in blob_shas:
+                        self._store(blob_shas[index], analysis)
+                while next_index <= chunk[-1]:
+                    yield file_infos[next_index], results[next_index]
+                    results[next_index] = None
+                    next_index += 1
+            
+            while next_index < len(file_infos):
+                yield file_infos[next_index], results[next_index]
+                next_index += 1
+        finally:
+            if self.pool is None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            else:
+                for future in futures:
+                    future.cancel()
+    
+    def _balanced_chunks(self, file_infos, indices, workers):
+        """Split indices into contiguous chunks of roughly equal byte size"""
+        sizes = {}
+        for index in indices:
+            size = file_infos[index].get("size")
+            if size is None:
+                try:
+                    size = os.path.getsize(file_infos[index]["path"])
+                except OSError:
+                    size = 0
+            sizes[index] = max(size, 1)
+        
+        # Several chunks per worker keeps every core busy when sizes are skewed
+        target = max(sum(sizes.values()) // (workers * 4), 1)
+        chunks = []
+        current = []
+        current_bytes = 0
+        for index in indices:
+            current.append(index)
+            current_bytes += sizes[index]
+            if current_bytes >= target or len(current) >= MAX_CHUNK_FILES:
+                chunks.append(current)
+                current = []
+                current_bytes = 0
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def _store(self, blob_sha, analysis):
+        """Save a fresh parse result in the cache"""
+        if self.cache is not None and analysis is not None:
+            self.cache.put(blob_sha, self.PARSER_VERSION, analysis)
+    
+    def filter_uncached(self, file_infos):
+        """Return the files whose parse results are not cached and must be read"""
+        if self.cache is None:
+            return list(file_infos)
+        return [
+            file_info for file_info in file_infos
+            if not (file_info.get("blob_sha") and
+                    self.cache.contains(file_info["blob_sha"], self.PARSER_VERSION))
+        ]
+    
+    def files_to_fetch(self, file_infos):
+        """Files a partial clone must fetch blobs for: uncached ones within the size limit
+
+        Oversized files are skipped on their size alone, so fetching them
+        would only cost a network round trip for nothing.
+        """
+        return [
+            file_info for file_info in self.filter_uncached(file_infos)
+            if not ingest.exceeds_limit(file_info.get("size"))
+        ]
+    
+    def cache_stats(self):
+        """Return parse cache counters, or None when caching is disabled"""
+        return self.cache.stats() if self.cache is not None else None
+    
+    def _parse_uncached(self, file_info):
+        """Read and parse a file without consulting the cache"""
+        return self._parse_measured(file_info)[0]
+    
+    def _parse_measured(self, file_info):
+        """Parse a file, returning (analysis, seconds, bytes read, outcome)
+        
+        The outcome is "parsed", "recovered" (Python that only tree-sitter
+        could read), "skipped" (no parser for the language) or the reason
+        the file yielded nothing: "read_error", "syntax_error", "parse_error",
+        or one of the ingest reasons "too_large", "binary" and "minified".
+        """
+        started = time.perf_counter()
+        file_path = file_info["path"]
+        file_extension = file_info.get("extension", "")
         
+        if not (file_extension in ('.py', '.jac') or self.tree_sitter.supports(file_extension)):
+            # Only a preview is kept, so only the first block is read
+            content, bytes_read, reason = ingest.read_preview(file_path, size=file_info.get("size"))
+            if content is None:
+                return None, time.perf_counter() - started, bytes_read, reason
+            return self._parse_generic_file(content, file_path), time.perf_counter() - started, bytes_read, "skipped"
+        
+        content, bytes_read, reason = ingest.read_text(file_path, file_info.get("size"), source=True)
+        if content is None:
+            return None, time.perf_counter() - started, bytes_read, reason
+        
+        outcome = "parsed"
         if file_extension == '.py':
-            return self._parse_python_file(content, file_path)
+            # ast gives the richest result; tree-sitter still recovers
+            # definitions from files ast rejects (Python 2, syntax errors)
+            analysis = self._parse_python_file(content, file_path)
+            if analysis is None:
+                analysis = self.tree_sitter.parse(content, file_path, file_extension)
+                outcome = "recovered" if analysis else "syntax_error"
         elif file_extension == '.jac':
-            return self._parse_jac_file(content, file_path)
+            analysis = self._parse_jac_file(content, file_path)
         else:
-            return self._parse_generic_file(content, file_path)
+            analysis = self.tree_sitter.parse(content, file_path, file_extension)
+            if analysis is None:
+                outcome = "parse_error"
+        return analysis, time.perf_counter() - started, bytes_read, outcome
     
     def _parse_python_file(self, content, file_path):
-        """Parse Python file using AST"""
+        """Parse Python file with a single scoped AST pass"""
         try:
-            tree = ast.parse(content)
-            
-            analysis = {
-                "functions": [],
-                "classes": [],
-                "imports": [],
-                "file_path": file_path
-            }
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    func_info = {
-                        "name": node.name,
-                        "signature": self._get_function_signature(node),
-                        "docstring": ast.get_docstring(node),
-                        "parameters": self._get_function_parameters(node),
-                        "line_number": node.lineno
-                    }
-                    analysis["functions"].append(func_info)
-                
-                elif isinstance(node, ast.ClassDef):
-                    class_info = {
-                        "name": node.name,
-                        "docstring": ast.get_docstring(node),
-                        "methods": [],
-                        "parent_classes": [base.id for base in node.bases if isinstance(base, ast.Name)],
-                        "line_number": node.lineno
-                    }
-                    
-                    # Extract methods
-                    for item in node.body:
-                        if isinstance(item, ast.FunctionDef):
-                            method_info = {
-                                "name": item.name,
-                                "signature": self._get_function_signature(item),
-                                "docstring": ast.get_docstring(item)
-                            }
-                            class_info["methods"].append(method_info)
-                    
-                    analysis["classes"].append(class_info)
-                
-                elif isinstance(node, (ast.Import, ast.ImportFrom)):
-                    import_info = {
-                        "module": node.names[0].name if isinstance(node, ast.Import) else node.module,
-                        "names": [alias.name for alias in node.names],
-                        "line_number": node.lineno
-                    }
-                    analysis["imports"].append(import_info)
-            
-            return analysis
-            
-        except SyntaxError:
+            with _ast_lock:
+                tree = ast.parse(content)
+        except (SyntaxError, ValueError):
             return None
-    
-    def _parse_jac_file(self, content, file_path):
-        """Parse Jac file (simplified)"""
-        # Basic Jac parsing - can be extended
-        analysis = {
-            "functions": [],
-            "classes": [],
-            "imports": [],
-            "file_path": file_path
-        }
         
-        lines = content.split('\n')
-        for i, line in enumerate(lines):
-            line = line.strip()
-            
-            # Detect walkers (similar to functions)
-            if line.startswith('walker '):
-                parts = line.split()
-                if len(parts) >= 2:
-                    func_info = {
-                        "name": parts[1],
-                        "signature": line,
-                        "docstring": self._extract_jac_docstring(lines, i),
-                        "parameters": self._extract_jac_parameters(line),
-                        "line_number": i + 1
-                    }
-                    analysis["functions"].append(func_info)
-            
-            # Detect nodes (similar to classes)
-            elif line.startswith('node '):
-                parts = line.split()
-                if len(parts) >= 2:
-                    class_info = {
-                        "name": parts[1],
-                        "docstring": self._extract_jac_docstring(lines, i),
-                        "methods": [],
-                        "parent_classes": [],
-                        "line_number": i + 1
-                    }
-                    analysis["classes"].append(class_info)
+        analyzer = PythonAnalyzer()
+        analyzer.visit(tree)
+        # The analysis holds only strings, so the tree can go right away
+        del tree
         
-        return analysis
+        return {
+            "functions": analyzer.functions,
+            "classes": analyzer.classes,
+            "imports": analyzer.imports,
+            "file_path": file_path
+        }
+    
+    def _parse_jac_file(self, content, file_path):
+        """Parse Jac file: archetypes, walkers, abilities, fields and imports in one pass"""
+        return self.jac_parser.parse(content, file_path)
     
     def _parse_generic_file(self, content, file_path):
-        """Parse generic file type"""
+        """Parse generic file type; content is already cut to a preview"""
         return {
             "functions": [],
             "classes": [],
             "imports": [],
             "file_path": file_path,
-            "content_preview": content[:500] + "..." if len(content) > 500 else content
+            "content_preview": content
         }
     
-    def _get_function_signature(self, func_node):
-        """Extract function signature"""
-        args = [arg.arg for arg in func_node.args.args]
-        return f"def {func_node.name}({', '.join(args)})"
-    
-    def _get_function_parameters(self, func_node):
-        """Extract function parameters"""
-        params = []
-        for arg in func_node.args.args:
-            param_info = {
-                "name": arg.arg,
-                "type": "Any"  # Can be enhanced with type hints
-            }
-            params.append(param_info)
-        return params
-    
-    def _extract_jac_docstring(self, lines, start_line):
-        """Extract docstring from Jac code"""
-        docstring = ""
-        for i in range(start_line + 1, min(start_line + 10, len(lines))):
-            line = lines[i].strip()
-            if line.startswith('/*') or line.startswith('#'):
-                docstring += line + "\n"
-            else:
-                break
-        return docstring.strip() if docstring else None
-    
-    def _extract_jac_parameters(self, line):
-        """Extract parameters from Jac walker definition"""
-        # Simplified parameter extraction
-        if '(' in line and ')' in line:
-            param_str = line.split('(', 1)[1].split(')')[0]
-            params = [p.strip() for p in param_str.split(',') if p.strip()]
-            return [{"name": p, "type": "Any"} for p in params]
-        return []
-    
     def build_relationships(self, file_analysis, file_tree):
         """Build relationships between code elements"""
         relationships = {
@@ -0,0 +1,297 @@
+import hashlib
+import os
+import time
+
+from call_graph import CallGraph
+from diagram_generator import DiagramEngine
+from graph_index import CodeGraphIndex
+import graph_store
+from instrumentation import Instrumentation, current
+from markdown_renderer import MarkdownRenderer
+from parser_utils import ParserUtils
+import prioritizer
+from summarizer import SummarizationService
+from utils import GitUtils
+
+DEFAULT_OUTPUT_ROOT = "./outputs"
+
+# Share of the overall progress (start, end percent) given to each stage
+STAGES = {
+    "clone": (0, 20),
+    "map": (20, 25),
+    "readme": (25, 30),
+    "prioritize": (30, 32),
+    "parse": (32, 80),
+    "graph": (80, 85),
+    "docs": (85, 100)
+}
+
+
+def normalize_url(repo_url):
+    """Canonical form of a repository URL, so spellings of one repository map to one key"""
+    url = repo_url.strip().rstrip('/')
+    if url.endswith('.git'):
+        url = url[:-len('.git')]
+    return url
+
+
+class PipelineCancelled(Exception):
+    """Raised inside a pipeline run once its job has been cancelled"""
+
+
+class GitCloner:
+    """Clones repositories with git into temporary directories"""
+
+    def head_commit(self, repo_url):
+        return GitUtils.get_remote_head(repo_url)
+
+    def clone(self, repo_url, strategy=None):
+        return GitUtils.clone_repository(repo_url, strategy)
+
+    def release(self, local_path):
+        GitUtils.remove_clone(local_path)
+
+
+class DirectoryCloner:
+    """Stand-in for git that serves existing local directories by URL"""
+
+    def __init__(self, directories, commit="local"):
+        self.directories = directories
+        self.commit = commit
+
+    def head_commit(self, repo_url):
+        local_path = self.directories.get(repo_url)
+        if local_path is None:
+            return None
+        return GitUtils.get_head_commit(local_path) or self.commit
+
+    def clone(self, repo_url, strategy=None):
+        return self.directories.get(repo_url)
+
+    def release(self, local_path):
+        pass
+
+
+def prioritize_files(file_tree, budget=None):
+    """Files best-first by prioritizer score, cut to what the budget's file and byte limits allow"""
+    return prioritizer.prioritize(file_tree, budget)[1]
+
+
+def build_code_graph(parser, prioritized_files, file_tree, workers=None, on_file=None, deadline=None):
+    """Build the code graph the build_code_context_graph walker produces
+
+    With a deadline (a time.monotonic() value) parsing stops at the first
+    file finished after it, keeping the best-first prefix parsed so far.
+    """
+    code_graph = {
+        "nodes": {},
+        "edges": [],
+        "file_dependencies": {}
+    }
+    relationship_seconds = 0.0
+    results = parser.parse_files(prioritized_files, workers)
+    try:
+        for file_info, file_analysis in results:
+            if on_file:
+                on_file(file_info)
+            if file_analysis:
+                code_graph["nodes"][file_info["path"]] = {
+                    "type": "file",
+                    "name": file_info["name"],
+                    "functions": file_analysis["functions"],
+                    "classes": file_analysis["classes"],
+                    "imports": file_analysis["imports"]
+                }
+                started = time.perf_counter()
+                relationships = parser.build_relationships(file_analysis, file_tree)
+                code_graph["edges"].extend(relationships["edges"])
+                code_graph["file_dependencies"][file_info["path"]] = relationships["dependencies"]
+                relationship_seconds += time.perf_counter() - started
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+    finally:
+        # Cancels chunks still queued in the worker pool when the deadline cut the stream short
+        results.close()
+    # Interleaved with parsing, so timed as a total rather than a span of its own
+    current().add_span("relationships", relationship_seconds)
+    return code_graph
+
+
+class DocumentationPipeline:
+    """The documentation workflow, which the supervisor's walker also runs.
+
+    Git access and README summarization are injectable, so the pipeline can
+    run against local directories and without an LLM (the default summarizer
+    is the shared SummarizationService). Progress is reported
+    as ``progress(stage, percent)`` with percent over the whole run, and
+    ``cancelled()`` is polled between stages and files. With svg_diagrams
+    (or CODEBASE_GENIUS_SVG_DIAGRAMS=1) the diagrams are also laid out with
+    Graphviz into a diagrams/ directory next to the document.
+    """
+
+    def __init__(self, cloner=None, summarizer=None, parser=None,
+                 output_root=DEFAULT_OUTPUT_ROOT, workers=None, svg_diagrams=None):
+        self.cloner = cloner or GitCloner()
+        self.summarizer = summarizer or SummarizationService.shared().summarize
+        self.parser = parser or ParserUtils()
+        self.output_root = output_root
+        self.workers = workers
+        if svg_diagrams is None:
+            svg_diagrams = os.environ.get("CODEBASE_GENIUS_SVG_DIAGRAMS") == "1"
+        self.svg_diagrams = svg_diagrams
+
+    def head_commit(self, repo_url):
+        """Commit a run of repo_url would document, or None if unknown"""
+        return self.cloner.head_commit(repo_url)
+
+    def output_path(self, repo_url):
+        repo_name = repo_url.rstrip('/').split('/')[-1].replace('.git', '')
+        return os.path.join(self.output_root, repo_name, "docs.md")
+
+    def run_directory(self, repo_url, commit, run_id):
+        """Output directory of one run: <url hash>/<commit>/<run id>, never shared with another run"""
+        digest = hashlib.sha1(normalize_url(repo_url).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.output_root, digest, commit or "unknown", run_id)
+
+    def run(self, repo_url, clone_strategy=None, progress=None, cancelled=None, on_section=None,
+            profile=False, budget=None, output_dir=None):
+        """Clone, analyse and document a repository; returns the saved document's details
+
+        on_section(title, start, end) is called as each documentation section
+        is flushed to the output file, with its byte range. Every stage is
+        recorded as an instrumentation span and saved next to the document;
+        profile=True also captures cProfile and tracemalloc data for the run.
+        budget (a prioritizer.Budget or its dict form) bounds the analysis:
+        files are parsed best-first until a limit is reached, and the
+        document and result["coverage"] report what was left out.
+        output_dir (see run_directory) is where the document, graph and metrics
+        go; without one they go to output_path(repo_url), which later runs of
+        the same repository overwrite.
+        """
+        if isinstance(budget, dict):
+            budget = prioritizer.Budget.from_dict(budget)
+        if budget is not None:
+            budget.start()
+        metrics = Instrumentation(repo_url, profile=profile)
+        with metrics.activated():
+            result = self._run(repo_url, clone_strategy, progress, cancelled, on_section, metrics, budget,
+                               output_dir)
+        result["metrics"] = metrics
+        result["metrics_paths"] = metrics.save(os.path.dirname(result["documentation_path"]))
+        return result
+
+    def _run(self, repo_url, clone_strategy, progress, cancelled, on_section, metrics, budget, output_dir):
+
+        def report(stage, fraction=1.0):
+            if cancelled and cancelled():
+                raise PipelineCancelled(repo_url)
+            if progress:
+                start, end = STAGES[stage]
+                progress(stage, int(start + (end - start) * fraction))
+
+        report("clone", 0.0)
+        with metrics.span("clone", strategy=clone_strategy or "default"):
+            local_path = self.cloner.clone(repo_url, clone_strategy)
+        if not local_path:
+            raise RuntimeError(f"Could not clone {repo_url}")
+
+        try:
+            commit = GitUtils.get_head_commit(local_path)
+            report("map", 0.0)
+            with metrics.span("map") as span:
+                if clone_strategy == "partial":
+                    file_tree = GitUtils.generate_file_tree_from_git(local_path)
+                else:
+                    file_tree = GitUtils.annotate_blob_hashes(GitUtils.generate_file_tree(local_path))
+                file_tree = GitUtils.filter_irrelevant_directories(file_tree)
+                span.finish(files=file_tree["file_count"])
+
+            report("readme", 0.0)
+            with metrics.span("readme"):
+                readme_content = GitUtils.find_and_parse_readme(file_tree)
+                if readme_content:
+                    readme_summary = self.summarizer(readme_content)
+                else:
+                    readme_summary = "No README file found in the repository."
+
+            report("prioritize", 0.0)
+            with metrics.span("prioritize") as span:
+                prioritized_files = prioritize_files(file_tree, budget)
+                span.finish(selected=len(prioritized_files))
+                if file_tree.get("lazy"):
+                    fetched = GitUtils.materialize_files(local_path, self.parser.files_to_fetch(prioritized_files))
+                    metrics.count("blobs_fetched", fetched)
+            metrics.count("files_skipped", file_tree["file_count"] - len(prioritized_files), reason="budget")
+
+            report("parse", 0.0)
+            total = max(len(prioritized_files), 1)
+            analysed = []
+
+            def on_file(file_info):
+                analysed.append(file_info)
+                report("parse", len(analysed) / total)
+
+            deadline = budget.analysis_deadline() if budget else None
+            with metrics.span("parse", files=len(prioritized_files)) as span:
+                code_graph = build_code_graph(self.parser, prioritized_files, file_tree, self.workers, on_file,
+                                              deadline)
+                stopped_by = None
+                if len(analysed) < len(prioritized_files):
+                    stopped_by = "seconds"
+                    metrics.count("files_skipped", len(prioritized_files) - len(analysed), reason="deadline")
+                span.finish(analysed=len(analysed))
+            code_graph["coverage"] = prioritizer.coverage_report(file_tree, analysed, budget, stopped_by)
+
+            report("graph", 0.0)
+            with metrics.span("graph"):
+                with metrics.span("index"):
+                    code_graph["index"] = CodeGraphIndex(code_graph)
+                with metrics.span("call_graph") as span:
+                    code_graph["call_graph"] = CallGraph.build(code_graph, file_tree["path"])
+                    span.finish(**code_graph["call_graph"].stats())
+
+            report("docs", 0.0)
+            renderer = MarkdownRenderer(repo_url, readme_summary, file_tree, code_graph)
+            sections_total = len(renderer.sections())
+            rendered = [0]
+            section_started = [time.perf_counter()]
+
+            def section_done(title, start, end):
+                now = time.perf_counter()
+                metrics.add_span("docs." + title, now - section_started[0], bytes=end - start)
+                section_started[0] = now
+                if on_section:
+                    on_section(title, start, end)
+                rendered[0] += 1
+                report("docs", rendered[0] / sections_total)
+
+            if output_dir:
+                documentation_path = os.path.join(output_dir, "docs.md")
+            else:
+                documentation_path = self.output_path(repo_url)
+            with metrics.span("docs"):
+                written = renderer.save(documentation_path, section_done)
+            # Saved beside the document, so later queries can map it instead of re-parsing
+            with metrics.span("graph_store") as span:
+                graph_path = os.path.join(os.path.dirname(documentation_path), graph_store.GRAPH_FILE)
+                span.finish(bytes=graph_store.save(code_graph, graph_path))
+
+            diagrams = []
+            if self.svg_diagrams:
+                with metrics.span("svg_diagrams"):
+                    diagrams = DiagramEngine.for_graph(code_graph).save_svgs(
+                        os.path.join(os.path.dirname(documentation_path), "diagrams")
+                    )
+        finally:
+            self.cloner.release(local_path)
+
+        return {
+            "documentation_path": documentation_path,
+            "commit": commit,
+            "bytes": written,
+            "sections": renderer.section_offsets,
+            "diagrams": diagrams,
+            "graph_path": graph_path,
+            "coverage": code_graph["coverage"],
+            "files": len(code_graph["nodes"])
+        }
@@ -0,0 +1,329 @@
+import math
+import os
+import re
+import time
+
+from utils import GitUtils
+
+# Names that usually start a program
+ENTRY_POINT_NAMES = {
+    "main.py", "app.py", "__main__.py", "cli.py", "manage.py", "wsgi.py", "asgi.py", "server.py",
+    "main.jac", "index.js", "main.go", "main.ts", "index.ts", "server.js", "app.js"
+}
+CORE_DIRS = ("/src/", "/lib/", "/core/", "/app/", "/pkg/")
+TEST_MARKERS = ("/test", "/tests/", "test_", "_test.", ".spec.", "/spec/")
+PRESCAN_EXTENSIONS = ('.py', '.jac', '.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs')
+# Files the parser has no grammar for are still listed, after the source files
+PARSED_EXTENSIONS = PRESCAN_EXTENSIONS + ('.go', '.java')
+
+# Imports sit at the top of a file; the pre-scan reads no further
+HEAD_BYTES = 8192
+# Commits searched for the last change of each file
+RECENCY_COMMITS = 500
+# Files around this size carry the most definitions per byte parsed
+IDEAL_FILE_BYTES = 8 * 1024
+
+# Weights of the score components, each normalised to [0, 1]
+WEIGHTS = {
+    "entry_point": 3.0,
+    "fan_in": 2.5,
+    "location": 1.0,
+    "recency": 1.0,
+    "size": 0.5
+}
+NON_SOURCE_FACTOR = 0.2
+
+# Shares of a wall-clock budget: the pre-scan may use the first, graph and docs keep the last
+PRESCAN_SHARE = 0.2
+DOCS_RESERVE_SHARE = 0.15
+
+PYTHON_IMPORT = re.compile(rb"^[ \t]*(?:from[ \t]+(\.*[\w.]*)[ \t]+import[ \t]+\(?([\w, \t*]+)|import[ \t]+([\w., \t]+))",
+                           re.MULTILINE)
+JS_IMPORT = re.compile(rb"""(?:\bfrom\s*|\bimport\s*\(?\s*|\brequire\(\s*)['"]([^'"]+)['"]""")
+JAC_IMPORT = re.compile(rb"^[ \t]*import[ \t]*(?::py[ \t]*)?\{?[ \t]*([\w., \t]+)", re.MULTILINE)
+
+
+class Budget:
+    """Limits on one analysis: wall-clock seconds for the run, files and bytes parsed"""
+
+    def __init__(self, seconds=None, files=None, bytes=None):
+        self.seconds = seconds
+        self.files = files
+        self.bytes = bytes
+        self.started = time.monotonic()
+
+    @classmethod
+    def from_dict(cls, options):
+        """Budget from {"seconds": ..., "files": ..., "bytes": ...}, or None if it sets no limit"""
+        if not options:
+            return None
+        budget = cls(options.get("seconds"), options.get("files"), options.get("bytes"))
+        return budget if budget.to_dict() else None
+
+    def to_dict(self):
+        return {name: value for name, value in
+                (("seconds", self.seconds), ("files", self.files), ("bytes", self.bytes)) if value is not None}
+
+    def start(self):
+        self.started = time.monotonic()
+        return self
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def deadline(self, share=1.0):
+        """Monotonic time by which share of the wall-clock budget is spent, or None"""
+        if self.seconds is None:
+            return None
+        return self.started + self.seconds * share
+
+    def analysis_deadline(self):
+        """When parsing must stop, leaving time to build the graph and write the docs"""
+        return self.deadline(1.0 - DOCS_RESERVE_SHARE)
+
+    def analysis_expired(self):
+        deadline = self.analysis_deadline()
+        return deadline is not None and time.monotonic() >= deadline
+
+    def select(self, ranked_files):
+        """Best-first files that fit the file and byte limits, and the first limit that excluded any"""
+        if self.files is None and self.bytes is None:
+            return list(ranked_files), None
+        selected = []
+        total_bytes = 0
+        stopped_by = None
+        for file in ranked_files:
+            if self.files is not None and len(selected) >= self.files:
+                stopped_by = stopped_by or "files"
+                break
+            size = file.get("size") or 0
+            if self.bytes is not None and total_bytes + size > self.bytes:
+                # Smaller files further down may still fit
+                stopped_by = stopped_by or "bytes"
+                continue
+            selected.append(file)
+            total_bytes += size
+        return selected, stopped_by
+
+
+def _module_names(rel_path):
+    """Dotted names a source file can be imported by"""
+    stem, extension = os.path.splitext(rel_path.replace(os.sep, '/'))
+    if extension == '.py' and (stem == '__init__' or stem.endswith('/__init__')):
+        stem = stem[:-len('__init__')].rstrip('/')
+    parts = [part for part in stem.split('/') if part]
+    # Also without a leading source directory (src/pkg/mod.py is imported as pkg.mod)
+    names = {'.'.join(parts[start:]) for start in range(len(parts))}
+    return names
+
+
+class _ModuleIndex:
+    """Dotted names and relative paths of source files, for resolving pre-scanned imports"""
+
+    def __init__(self, root, files):
+        self.root = root
+        self.by_name = {}
+        self.by_path = {}
+        for file_id, file in enumerate(files):
+            rel_path = os.path.relpath(file["path"], root).replace(os.sep, '/')
+            self.by_path[rel_path] = file_id
+            for name in _module_names(rel_path):
+                # Ambiguous names resolve to nothing rather than to a guess
+                self.by_name[name] = file_id if name not in self.by_name else None
+
+    def resolve_python(self, rel_path, module, names, level):
+        package = rel_path.rsplit('/', 1)[0].replace('/', '.') if '/' in rel_path else ""
+        if level:
+            base = package.split('.') if package else []
+            base = base[:len(base) - (level - 1)] if level > 1 else base
+            module = '.'.join(part for part in base + ([module] if module else []) if part)
+        targets = []
+        for name in names:
+            # "from pkg import mod" imports a submodule when one exists
+            target = self.by_name.get(f"{module}.{name}" if module else name)
+            if target is not None:
+                targets.append(target)
+        if not targets and module:
+            target = self.by_name.get(module)
+            if target is not None:
+                targets.append(target)
+        return targets
+
+    def resolve_path(self, rel_path, specifier):
+        if not specifier.startswith('.'):
+            target = self.by_name.get(specifier.replace('/', '.'))
+            return [target] if target is not None else []
+        base = os.path.normpath(os.path.join(os.path.dirname(rel_path), specifier)).replace(os.sep, '/')
+        for candidate in [base] + [base + extension for extension in PRESCAN_EXTENSIONS] + \
+                [base + "/index" + extension for extension in PRESCAN_EXTENSIONS]:
+            if candidate in self.by_path:
+                return [self.by_path[candidate]]
+        return []
+
+
+def _head(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(HEAD_BYTES)
+    except OSError:
+        return b""
+
+
+def import_fan_in(file_tree, files, deadline=None):
+    """Number of other files importing each file, from a pre-scan of file heads
+
+    Stops early (leaving the remaining files unscanned) once deadline passes.
+    Returns (fan-in per file, files scanned).
+    """
+    fan_in = [0] * len(files)
+    # Blobs of a partial clone are not checked out; reading them would fetch every one
+    if file_tree.get("lazy"):
+        return fan_in, 0
+
+    sources = [file_id for file_id, file in enumerate(files) if file.get("extension") in PRESCAN_EXTENSIONS]
+    index = _ModuleIndex(file_tree["path"], [files[file_id] for file_id in sources])
+    scanned = 0
+    for position, file_id in enumerate(sources):
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        scanned += 1
+        file = files[file_id]
+        rel_path = os.path.relpath(file["path"], file_tree["path"]).replace(os.sep, '/')
+        head = _head(file["path"])
+        targets = set()
+        extension = file["extension"]
+        if extension == '.py':
+            for match in PYTHON_IMPORT.finditer(head):
+                from_module, from_names, plain = match.groups()
+                if plain is not None:
+                    for module in plain.decode('utf-8', 'replace').split(','):
+                        module = module.split(' as ')[0].strip()
+                        targets.update(index.resolve_python(rel_path, module, [], 0))
+                else:
+                    module = from_module.decode('utf-8', 'replace')
+                    level = len(module) - len(module.lstrip('.'))
+                    names = [name.split(' as ')[0].strip() for name in
+                             from_names.decode('utf-8', 'replace').split(',')]
+                    targets.update(index.resolve_python(rel_path, module.lstrip('.'),
+                                                        [name for name in names if name and name != '*'], level))
+        elif extension == '.jac':
+            for match in JAC_IMPORT.finditer(head):
+                for module in match.group(1).decode('utf-8', 'replace').split(','):
+                    targets.update(index.resolve_python(rel_path, module.strip(), [], 0))
+        else:
+            for match in JS_IMPORT.finditer(head):
+                targets.update(index.resolve_path(rel_path, match.group(1).decode('utf-8', 'replace')))
+        for target in targets:
+            if target != position:
+                fan_in[sources[target]] += 1
+    return fan_in, scanned
+
+
+def _entry_point_score(file):
+    name = file["name"].lower()
+    if name in ENTRY_POINT_NAMES:
+        return 1.0
+    stem = os.path.splitext(name)[0]
+    if "main" in stem:
+        return 0.8
+    if stem in ("setup", "__init__", "config", "settings", "routes", "urls", "api"):
+        return 0.5
+    return 0.0
+
+
+def _location_score(rel_path):
+    path = "/" + rel_path.lower()
+    score = 1.0 - 0.1 * min(path.count('/') - 1, 5)
+    if any(term in path for term in CORE_DIRS):
+        score += 0.3
+    if any(term in path for term in TEST_MARKERS):
+        score -= 0.6
+    return min(max(score, 0.0), 1.0)
+
+
+def _size_score(size):
+    if not size:
+        return 0.0
+    return max(0.0, 1.0 - abs(math.log10(size) - math.log10(IDEAL_FILE_BYTES)) / 2.5)
+
+
+def score_files(file_tree, budget=None):
+    """Score every file of the tree; returns the files best-first, each with a "priority" key
+
+    The score weighs entry-point likelihood, import fan-in from a pre-scan of
+    file heads, location (depth, core directories, tests), recency of the
+    last commit touching the file (or its mtime) and size.
+    """
+    files = list(file_tree["files"])
+    root = file_tree["path"]
+    deadline = budget.deadline(PRESCAN_SHARE) if budget else None
+    fan_in, _ = import_fan_in(file_tree, files, deadline)
+    max_fan_in = max(fan_in, default=0)
+
+    last_modified = GitUtils.get_last_modified(root, RECENCY_COMMITS)
+    times = [last_modified.get(file["path"]) or file.get("mtime") or 0 for file in files]
+    known = [value for value in times if value]
+    oldest, newest = (min(known), max(known)) if known else (0, 0)
+    span = newest - oldest
+
+    for file, fan_in_count, modified in zip(files, fan_in, times):
+        rel_path = os.path.relpath(file["path"], root).replace(os.sep, '/')
+        components = {
+            "entry_point": _entry_point_score(file),
+            # Logarithmic, so a handful of importers already counts
+            "fan_in": math.log1p(fan_in_count) / math.log1p(max_fan_in) if max_fan_in else 0.0,
+            "location": _location_score(rel_path),
+            "recency": (modified - oldest) / span if span and modified else 0.0,
+            "size": _size_score(file.get("size"))
+        }
+        score = sum(WEIGHTS[name] * value for name, value in components.items())
+        # Empty files and files without a parser add nothing to the graph
+        if file.get("extension") not in PARSED_EXTENSIONS or file.get("size") == 0:
+            score *= NON_SOURCE_FACTOR
+        file["priority"] = round(score, 4)
+        file["fan_in"] = fan_in_count
+
+    # Ties keep the tree order, so equal scores give a stable document
+    return sorted(files, key=lambda file: -file["priority"])
+
+
+def prioritize(file_tree, budget=None):
+    """Ranked files and the best-first selection a budget allows
+
+    Returns (ranked, selected, stopped_by), where stopped_by names the file or
+    byte limit that left files out, or is None.
+    """
+    ranked = score_files(file_tree, budget)
+    if budget is None:
+        return ranked, ranked, None
+    selected, stopped_by = budget.select(ranked)
+    return ranked, selected, stopped_by
+
+
+def coverage_report(file_tree, analysed, budget=None, stopped_by=None):
+    """How much of a scored file tree a (possibly budget-limited) analysis covered
+
+    analysed is the list of files parsed, a best-first prefix of the
+    selection. stopped_by names the limit that cut the analysis short; when
+    omitted it is the file or byte limit of the budget, if either left files out.
+    """
+    root = file_tree["path"]
+    ranked = sorted(file_tree["files"], key=lambda file: -file.get("priority", 0))
+    if stopped_by is None and budget is not None:
+        stopped_by = budget.select(ranked)[1]
+    analysed_paths = {file["path"] for file in analysed}
+    total_score = sum(file.get("priority", 0) for file in ranked) or 1.0
+    skipped = [file for file in ranked if file["path"] not in analysed_paths]
+    return {
+        "complete": not skipped,
+        "stopped_by": stopped_by if skipped else None,
+        "budget": budget.to_dict() if budget else None,
+        "elapsed": round(budget.elapsed(), 3) if budget else None,
+        "files_total": len(ranked),
+        "files_analysed": len(analysed),
+        "bytes_total": sum(file.get("size") or 0 for file in ranked),
+        "bytes_analysed": sum(file.get("size") or 0 for file in analysed),
+        # Share of the total priority covered; best-first keeps it above the file share
+        "priority_covered": round(sum(file.get("priority", 0) for file in analysed) / total_score, 4),
+        "top_skipped": [os.path.relpath(file["path"], root) for file in skipped[:10]]
+    }
@@ -0,0 +1,501 @@
+import asyncio
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "codebase_genius")
+DEFAULT_MODEL = "gpt-4o-mini"
+
+README_INSTRUCTION = (
+    "Summarize this README file concisely, highlighting the project's purpose, "
+    "key features, and main usage."
+)
+
+# Latency percentiles are taken over this many most recent requests
+LATENCY_WINDOW = 4096
+# Reduce passes over partial summaries before the remainder is truncated
+MAX_REDUCE_PASSES = 4
+
+# Separates the inputs of a batched prompt and the answers to it
+BATCH_MARKER = "### INPUT {}"
+BATCH_MARKER_PATTERN = re.compile(r"^### INPUT (\d+)\s*$", re.MULTILINE)
+
+
+def count_tokens(text):
+    """Token count with tiktoken when installed, else a ~4 characters per token estimate"""
+    if tiktoken is not None:
+        return len(_encoding().encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+_encoding_cache = []
+
+
+def _encoding():
+    if not _encoding_cache:
+        _encoding_cache.append(tiktoken.get_encoding("cl100k_base"))
+    return _encoding_cache[0]
+
+
+def chunk_text(text, max_tokens):
+    """Split text into pieces of at most max_tokens, preferring paragraph and line breaks"""
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    chunks, current, current_tokens = [], [], 0
+    for piece in _split_units(text, max_tokens):
+        tokens = count_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def _split_units(text, max_tokens):
+    """Paragraphs, then lines, then fixed-size slices, each within max_tokens"""
+    for paragraph in re.split(r'(?<=\n\n)', text):
+        if count_tokens(paragraph) <= max_tokens:
+            yield paragraph
+            continue
+        for line in paragraph.splitlines(keepends=True):
+            if count_tokens(line) <= max_tokens:
+                yield line
+                continue
+            width = max_tokens * 4
+            for start in range(0, len(line), width):
+                yield line[start:start + width]
+
+
+def extractive_summary(text, max_sentences=5):
+    """Summarize text by its first sentences of prose, without a model"""
+    prose = []
+    in_code = False
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            in_code = not in_code
+            continue
+        # Headings, badges, tables, HTML and list markers carry little prose
+        if in_code or not stripped or stripped[0] in "#[!<|>-*=":
+            continue
+        prose.append(stripped)
+    sentences = re.split(r'(?<=[.!?])\s+', " ".join(prose))
+    summary = " ".join(sentences[:max_sentences]).strip()
+    return summary or "No README summary available."
+
+
+class ExtractiveClient:
+    """Local stand-in for a language model: answers with the leading sentences of each input.
+
+    Understands the batch format of SummarizationService, so batching,
+    caching and chunking can be exercised without network access.
+    """
+
+    model = "extractive"
+
+    async def complete(self, prompt, max_tokens):
+        body = prompt.split("\n\n", 1)[1] if "\n\n" in prompt else prompt
+        parts = BATCH_MARKER_PATTERN.split(body)
+        if len(parts) > 1:
+            answers = [
+                BATCH_MARKER.format(parts[i]) + "\n" + extractive_summary(parts[i + 1], 2)
+                for i in range(1, len(parts) - 1, 2)
+            ]
+            text = "\n".join(answers)
+        else:
+            text = extractive_summary(body)
+        return text, {"prompt_tokens": count_tokens(prompt), "completion_tokens": count_tokens(text)}
+
+
+class OpenAIClient:
+    """Chat completion client for OpenAI-compatible APIs"""
+
+    def __init__(self, model=None, api_key=None, base_url=None):
+        from openai import AsyncOpenAI
+        self.model = model or os.environ.get("CODEBASE_GENIUS_LLM_MODEL", DEFAULT_MODEL)
+        self._client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+
+    async def complete(self, prompt, max_tokens):
+        response = await self._client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens
+        )
+        usage = response.usage
+        return response.choices[0].message.content or "", {
+            "prompt_tokens": usage.prompt_tokens if usage else 0,
+            "completion_tokens": usage.completion_tokens if usage else 0
+        }
+
+
+def default_client():
+    """OpenAI when an API key is configured and the package installed, else the local extractive client"""
+    if os.environ.get("OPENAI_API_KEY"):
+        try:
+            return OpenAIClient()
+        except ImportError:
+            print("openai is not installed, falling back to extractive summaries")
+    return ExtractiveClient()
+
+
+class ResponseCache:
+    """Persistent summary cache keyed by model, instruction and content hash"""
+
+    def __init__(self, cache_dir=None):
+        cache_dir = cache_dir or os.environ.get("CODEBASE_GENIUS_CACHE_DIR", DEFAULT_CACHE_DIR)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "summaries.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def key(model, instruction, text):
+        digest = hashlib.sha256()
+        for part in (model, instruction, text):
+            digest.update(part.encode('utf-8'))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_many(self, keys):
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            # SQLite caps bound parameters; look keys up in slices
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, summary FROM summaries WHERE key IN ({', '.join('?' for _ in batch)})",
+                    batch
+                )
+                found.update(rows)
+        return found
+
+    def put(self, key, summary):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, created_at) VALUES (?, ?, ?)",
+                (key, summary, time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RateLimiter:
+    """Token bucket allowing requests_per_minute, with bursts up to one second's worth
+
+    Shared by every thread and event loop of the process: each acquire
+    reserves the next free slot under a thread lock, then sleeps in its own
+    loop until the slot is due.
+    """
+
+    def __init__(self, requests_per_minute):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Below zero, the bucket owes tokens to callers already waiting
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class ConcurrencyLimit:
+    """Semaphore shared by every thread and event loop of the process
+
+    A released slot is handed straight to the longest waiting caller,
+    whichever loop it waits in.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return
+            loop = asyncio.get_running_loop()
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = (loop, waiter) in self._waiters
+                if queued:
+                    self._waiters.remove((loop, waiter))
+            # A slot handed over just before the cancellation is passed on
+            if not queued and waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(self._hand_over, waiter)
+                    return
+            self.active -= 1
+
+    def _hand_over(self, waiter):
+        if waiter.cancelled():
+            self.release()
+        else:
+            waiter.set_result(None)
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+class SummarizationService:
+    """Token-budgeted, cached, batched and rate-limited summarization.
+
+    Inputs are deduplicated by content hash and served from a persistent
+    cache where possible. Inputs above the chunk budget are summarized chunk
+    by chunk and the partial summaries summarized again; small inputs are
+    packed together into one prompt up to the batch budget. Requests run
+    concurrently under a semaphore and a requests-per-minute limiter, and
+    failed requests are retried with exponential backoff. The limits belong
+    to the service, so they hold across calls, threads and event loops,
+    e.g. every job sharing SummarizationService.shared().
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, client=None, cache=None, max_concurrency=4, requests_per_minute=60,
+                 chunk_tokens=3000, batch_tokens=2000, summary_tokens=300, max_retries=3):
+        self.client = client or default_client()
+        self.cache = ResponseCache() if cache is None else (cache or None)
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.chunk_tokens = chunk_tokens
+        self.batch_tokens = batch_tokens
+        self.summary_tokens = summary_tokens
+        self.max_retries = max_retries
+        self._limiter = RateLimiter(requests_per_minute)
+        self._concurrency = ConcurrencyLimit(max_concurrency)
+
+        self._metrics_lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._counters = {
+            "requests": 0,
+            "batched_inputs": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "deduplicated": 0,
+            "retries": 0,
+            "failures": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "latency_total": 0.0,
+            "truncated": 0
+        }
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide service"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(
+                    max_concurrency=int(os.environ.get("CODEBASE_GENIUS_LLM_CONCURRENCY", 4)),
+                    requests_per_minute=int(os.environ.get("CODEBASE_GENIUS_LLM_RPM", 60))
+                )
+            return cls._shared
+
+    def summarize(self, text, instruction=README_INSTRUCTION):
+        """Summarize one text, blocking until done"""
+        return self.summarize_many({"text": text}, instruction)["text"]
+
+    def summarize_many(self, texts, instruction):
+        """Summarize a mapping of id -> text, blocking until done"""
+        return asyncio.run(self.summarize_many_async(texts, instruction))
+
+    async def summarize_many_async(self, texts, instruction):
+        """Summarize a mapping of id -> text, returning id -> summary"""
+        model = getattr(self.client, "model", type(self.client).__name__)
+        keys = {item_id: ResponseCache.key(model, instruction, text) for item_id, text in texts.items()}
+
+        # Identical contents are summarized once
+        unique = {}
+        for item_id, key in keys.items():
+            unique.setdefault(key, texts[item_id])
+        self._count("deduplicated", len(keys) - len(unique))
+
+        summaries = self.cache.get_many(unique) if self.cache else {}
+        self._count("cache_hits", len(summaries))
+        pending = {key: text for key, text in unique.items() if key not in summaries}
+        self._count("cache_misses", len(pending))
+
+        if pending:
+            context = (instruction, self._limiter, self._concurrency)
+
+            small, large = [], []
+            for key, text in pending.items():
+                (large if count_tokens(text) > self.batch_tokens else small).append(key)
+
+            tasks = [self._summarize_large(pending[key], context) for key in large]
+            tasks += [self._summarize_batch([(key, pending[key]) for key in batch], context)
+                      for batch in self._batches(small, pending)]
+            results = await asyncio.gather(*tasks)
+
+            fresh = dict(zip(large, results[:len(large)]))
+            for batch_result in results[len(large):]:
+                fresh.update(batch_result)
+            for key, summary in fresh.items():
+                if self.cache:
+                    self.cache.put(key, summary)
+            summaries.update(fresh)
+
+        return {item_id: summaries[key] for item_id, key in keys.items()}
+
+    def _batches(self, keys, texts):
+        """Group small inputs so each prompt stays within the batch budget"""
+        batch, batch_tokens = [], 0
+        for key in keys:
+            tokens = count_tokens(texts[key])
+            if batch and batch_tokens + tokens > self.batch_tokens:
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append(key)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    async def _summarize_batch(self, items, context):
+        instruction = context[0]
+        if len(items) == 1:
+            key, text = items[0]
+            return {key: await self._request(f"{instruction}\n\n{text}", context)}
+
+        body = "\n".join(f"{BATCH_MARKER.format(i)}\n{text}" for i, (_, text) in enumerate(items))
+        prompt = (
+            f"{instruction}\nSummarize each input below separately. Start every summary "
+            f"with the marker line of its input (### INPUT <n>) and add nothing else.\n\n{body}"
+        )
+        response = await self._request(prompt, context, self.summary_tokens * len(items))
+        self._count("batched_inputs", len(items))
+
+        parts = BATCH_MARKER_PATTERN.split(response)
+        answers = {int(parts[i]): parts[i + 1].strip() for i in range(1, len(parts) - 1, 2)}
+        results = {}
+        for i, (key, text) in enumerate(items):
+            if answers.get(i):
+                results[key] = answers[i]
+            else:
+                # The model skipped or merged this input; ask for it on its own
+                results[key] = await self._request(f"{instruction}\n\n{text}", context)
+        return results
+
+    async def _summarize_large(self, text, context):
+        """Map-reduce over chunks until the combined summaries fit one request
+
+        A pass that does not shrink the text (a model echoing long parts back)
+        would never converge, so after it, or MAX_REDUCE_PASSES passes, the
+        remainder is cut to its first chunk.
+        """
+        instruction = context[0]
+        tokens = count_tokens(text)
+        passes = 0
+        while tokens > self.chunk_tokens:
+            chunks = chunk_text(text, self.chunk_tokens)
+            partials = await asyncio.gather(*(
+                self._request(f"{instruction}\nThis is part {i + 1} of {len(chunks)}.\n\n{chunk}", context)
+                for i, chunk in enumerate(chunks)
+            ))
+            text = "\n\n".join(partials)
+            previous, tokens = tokens, count_tokens(text)
+            passes += 1
+            if tokens > self.chunk_tokens and (tokens >= previous or passes == MAX_REDUCE_PASSES):
+                print(f"Partial summaries still {tokens} tokens after {passes} passes, truncating")
+                self._count("truncated")
+                text = chunk_text(text, self.chunk_tokens)[0]
+                break
+        return await self._request(f"{instruction}\n\n{text}", context)
+
+    async def _request(self, prompt, context, max_tokens=None):
+        _, limiter, semaphore = context
+        max_tokens = max_tokens or self.summary_tokens
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                await limiter.acquire()
+                started = time.perf_counter()
+                try:
+                    text, usage = await self.client.complete(prompt, max_tokens)
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        self._count("failures")
+                        raise
+                    self._count("retries")
+                    error = e
+                else:
+                    self._record(time.perf_counter() - started, usage)
+                    return text.strip()
+            # Back off outside the semaphore so other requests proceed
+            delay = min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+            print(f"Summarization request failed ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def _count(self, name, amount=1):
+        with self._metrics_lock:
+            self._counters[name] += amount
+
+    def _record(self, latency, usage):
+        with self._metrics_lock:
+            self._counters["requests"] += 1
+            self._counters["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            self._counters["completion_tokens"] += usage.get("completion_tokens", 0)
+            self._counters["latency_total"] += latency
+            self._latencies.append(latency)
+
+    def metrics(self):
+        """Request, cache and token counters plus latency percentiles in seconds"""
+        with self._metrics_lock:
+            metrics = dict(self._counters)
+            latencies = sorted(self._latencies)
+        lookups = metrics["cache_hits"] + metrics["cache_misses"]
+        metrics["cache_hit_rate"] = metrics["cache_hits"] / lookups if lookups else 0.0
+        for name, quantile in (("latency_p50", 0.5), ("latency_p95", 0.95)):
+            metrics[name] = latencies[min(int(len(latencies) * quantile), len(latencies) - 1)] if latencies else 0.0
+        return metrics
@@ -0,0 +1,44 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# The backend modules import each other as siblings, as they do when run from BE/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import RepoSpec, generate_repository
+from parser_utils import ParserUtils
+from pipeline import DirectoryCloner, DocumentationPipeline
+
+
+@pytest.fixture(scope="session")
+def synthetic_repo(tmp_path_factory):
+    """A small committed git repository of Python and Jac modules"""
+    path, _ = generate_repository(RepoSpec(files=40, seed=1), str(tmp_path_factory.mktemp("repos")))
+    return path
+
+
+@pytest.fixture
+def make_pipeline(tmp_path):
+    """Pipeline factory serving {url: directory} without git, an LLM or the shared parse cache"""
+    def make(directories, **kwargs):
+        kwargs.setdefault("summarizer", lambda *args, **kw: "Summary.")
+        kwargs.setdefault("parser", ParserUtils(cache=False))
+        kwargs.setdefault("output_root", str(tmp_path / "outputs"))
+        kwargs.setdefault("workers", 1)
+        return DocumentationPipeline(cloner=DirectoryCloner(directories), **kwargs)
+    return make
+
+
+@pytest.fixture
+def blocking_summarizer():
+    """A summarizer holding every call until its release event is set (at the latest on teardown)"""
+    release = threading.Event()
+
+    def summarize(*args, **kwargs):
+        release.wait(30)
+        return "Summary."
+    summarize.release = release
+    yield summarize
+    release.set()
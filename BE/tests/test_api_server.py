@@ -0,0 +1,157 @@
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from api_server import create_server
+from jobs import JobManager, JobStore
+
+
+@pytest.fixture
+def serve(tmp_path):
+    servers = []
+
+    def start(manager):
+        server = create_server(manager, "127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append((server, manager))
+        return server.server_address[1]
+    yield start
+    for server, manager in servers:
+        server.shutdown()
+        server.server_close()
+        manager.shutdown()
+
+
+def request(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request(method, path, json.dumps(body) if body is not None else None, headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def test_full_queue_answers_429(synthetic_repo, make_pipeline, serve, tmp_path, blocking_summarizer):
+    directories = {url: synthetic_repo for url in ("a", "b", "c")}
+    manager = JobManager(make_pipeline(directories, summarizer=blocking_summarizer),
+                         JobStore(str(tmp_path / "jobs.sqlite3")), workers=1, max_queue=1)
+    port = serve(manager)
+    try:
+        status, _, body = request(port, "POST", "/generate_docs", {"github_url": "a"})
+        assert status == 200
+        # The first job must be running, not waiting, before the queue fills
+        while manager.status(json.loads(body)["task_id"])["status"] == "queued":
+            time.sleep(0.02)
+        assert request(port, "POST", "/generate_docs", {"github_url": "b"})[0] == 200
+        status, headers, _ = request(port, "POST", "/generate_docs", {"github_url": "c"})
+        assert status == 429
+        assert headers["Retry-After"]
+    finally:
+        blocking_summarizer.release.set()
+
+
+@pytest.fixture
+def documented(synthetic_repo, make_pipeline, serve, tmp_path):
+    """(port, task id, document bytes) of a completed job"""
+    manager = JobManager(make_pipeline({"repo": synthetic_repo}), JobStore(str(tmp_path / "jobs.sqlite3")))
+    port = serve(manager)
+    task_id, _ = manager.submit("repo")
+    deadline = time.monotonic() + 60
+    while manager.status(task_id)["status"] != "completed":
+        assert manager.status(task_id)["status"] in ("queued", "processing") and time.monotonic() < deadline
+        time.sleep(0.02)
+    with open(manager.status(task_id)["documentation_path"], 'rb') as f:
+        return port, task_id, f.read()
+
+
+def read_events(port, task_id, headers=None):
+    """[(id, event, data)] of an SSE stream, read until the server closes it"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    try:
+        conn.request("GET", f"/events/{task_id}", headers=headers or {})
+        response = conn.getresponse()
+        assert response.status == 200
+        assert response.getheader("Content-Type") == "text/event-stream"
+        events = []
+        for block in response.read().decode("utf-8").split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+            if fields:
+                events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+        return events
+    finally:
+        conn.close()
+
+
+def test_event_stream_of_a_finished_job(documented):
+    port, task_id, document = documented
+    events = read_events(port, task_id)
+    assert events[0][1] == "status" and events[0][2]["task_id"] == task_id
+    assert events[-1][1] == "status" and events[-1][2]["status"] == "completed"
+    sections = [data for _, event, data in events if event == "section"]
+    assert sections and sections[-1]["end"] <= len(document)
+    assert [seq for seq, _, _ in events[1:]] == sorted(seq for seq, _, _ in events[1:])
+
+
+def test_event_stream_resumes_after_last_event_id(documented):
+    port, task_id, _ = documented
+    events = read_events(port, task_id)[1:]
+    middle = len(events) // 2
+    resumed = read_events(port, task_id, {"Last-Event-ID": str(events[middle][0])})
+    assert resumed == events[middle + 1:]
+
+
+def test_cancel_endpoint(synthetic_repo, make_pipeline, serve, tmp_path, blocking_summarizer):
+    manager = JobManager(make_pipeline({"repo": synthetic_repo}, summarizer=blocking_summarizer),
+                         JobStore(str(tmp_path / "jobs.sqlite3")), workers=1)
+    port = serve(manager)
+    try:
+        task_id, _ = manager.submit("repo")
+        while manager.status(task_id)["status"] == "queued":
+            time.sleep(0.02)
+        status, _, body = request(port, "POST", f"/cancel/{task_id}")
+        assert status == 200 and json.loads(body) == {"cancelled": True}
+    finally:
+        blocking_summarizer.release.set()
+    # The stream of a live job ends with its cancellation
+    assert read_events(port, task_id)[-1][1:] == ("status", {"status": "cancelled"})
+    assert json.loads(request(port, "POST", f"/cancel/{task_id}")[2]) == {"cancelled": False}
+
+
+def test_document_without_range_is_sent_whole(documented):
+    port, task_id, document = documented
+    status, headers, body = request(port, "GET", f"/documents/{task_id}")
+    assert status == 200
+    assert body == document
+    assert headers["Accept-Ranges"] == "bytes"
+    assert "Content-Range" not in headers
+
+
+@pytest.mark.parametrize("header, part", [
+    ("bytes=0-9", slice(0, 10)),
+    ("bytes=10-", slice(10, None)),
+    ("bytes=-7", slice(-7, None)),
+])
+def test_document_range(documented, header, part):
+    port, task_id, document = documented
+    status, headers, body = request(port, "GET", f"/documents/{task_id}", headers={"Range": header})
+    assert status == 206
+    assert body == document[part]
+    start = part.start % len(document)
+    assert headers["Content-Range"] == f"bytes {start}-{start + len(body) - 1}/{len(document)}"
+    assert int(headers["Content-Length"]) == len(body)
+
+
+def test_document_range_past_the_end_is_416(documented):
+    port, task_id, document = documented
+    status, headers, _ = request(port, "GET", f"/documents/{task_id}", headers={"Range": f"bytes={len(document)}-"})
+    assert status == 416
+    assert headers["Content-Range"] == f"bytes */{len(document)}"
+
+
+def test_unknown_document_is_404(documented):
+    port, _, _ = documented
+    assert request(port, "GET", "/documents/0123abcd")[0] == 404
@@ -0,0 +1,92 @@
+import json
+import shutil
+
+from batch import MANIFEST_FILE, BatchRunner
+from parse_cache import ParseCache
+from parser_utils import ParserUtils
+from pipeline import DirectoryCloner
+
+FORKS = ["https://example.com/alice/project", "https://example.com/bob/project.git"]
+
+
+class RecordingCloner(DirectoryCloner):
+    def __init__(self, directories):
+        super().__init__(directories)
+        self.cloned = []
+        self.released = []
+
+    def clone(self, repo_url, strategy=None):
+        local_path = super().clone(repo_url, strategy)
+        if local_path:
+            self.cloned.append(local_path)
+        return local_path
+
+    def release(self, local_path):
+        self.released.append(local_path)
+
+
+def fork_directories(synthetic_repo, tmp_path):
+    """A copy of the synthetic repository per fork, sharing every blob"""
+    directories = {}
+    for url in FORKS:
+        path = tmp_path / "forks" / url.split('/')[-2]
+        shutil.copytree(synthetic_repo, path)
+        directories[url] = str(path)
+    return directories
+
+
+def runner(cloner, tmp_path, **kwargs):
+    kwargs.setdefault("summarizer", lambda *args, **kw: "Summary.")
+    kwargs.setdefault("parser", ParserUtils(cache=ParseCache(str(tmp_path / "cache"))))
+    return BatchRunner(cloner=cloner, output_root=str(tmp_path / "outputs"), workers=2, parse_workers=1, **kwargs)
+
+
+def test_forks_are_served_from_the_cache(synthetic_repo, tmp_path):
+    manifest = runner(RecordingCloner(fork_directories(synthetic_repo, tmp_path)), tmp_path).run(FORKS)
+    leader, follower = manifest["repositories"]
+    assert [leader["status"], follower["status"]] == ["completed", "completed"]
+    assert leader["family"] == follower["family"] == "project"
+    # The follower waited for its leader, so every file it parses is a cache hit
+    assert leader["outcomes"].get("parsed")
+    assert follower["outcomes"] == {"cached": sum(leader["outcomes"].values())}
+    assert leader["documentation_path"] != follower["documentation_path"]
+
+
+def test_clones_are_released_when_a_run_fails(synthetic_repo, tmp_path):
+    def failing_summarizer(*args, **kwargs):
+        raise RuntimeError("model unavailable")
+
+    cloner = RecordingCloner({"https://example.com/team/project": synthetic_repo})
+    manifest = runner(cloner, tmp_path, summarizer=failing_summarizer).run(
+        ["https://example.com/team/project", "https://example.com/team/missing"]
+    )
+    failed, missing = manifest["repositories"]
+    assert failed["status"] == "error" and failed["error"] == "RuntimeError: model unavailable"
+    assert missing["status"] == "error" and "Could not clone" in missing["error"]
+    assert cloner.cloned == [synthetic_repo]
+    assert cloner.released == cloner.cloned
+    assert manifest["leaked_clones_removed"] == 0
+    assert manifest["totals"]["failed"] == 2
+
+
+def test_manifest_shape(synthetic_repo, tmp_path):
+    urls = ["https://example.com/team/project", " ", "https://example.com/team/project.git/"]
+    manifest = runner(RecordingCloner({urls[0]: synthetic_repo}), tmp_path).run(urls)
+
+    assert set(manifest) == {"started", "finished", "workers", "clone_strategy", "budget",
+                             "leaked_clones_removed", "totals", "repositories", "manifest_path"}
+    # Blank lines are dropped and spellings of one repository run once
+    assert {key: manifest["totals"][key] for key in ("repositories", "completed", "failed")} == {
+        "repositories": 1, "completed": 1, "failed": 0
+    }
+    (record,) = manifest["repositories"]
+    assert set(record) == {"url", "family", "status", "error", "commit", "documentation_path", "graph_path",
+                           "files", "coverage_complete", "outcomes", "stages", "seconds"}
+    assert record["url"] == urls[0] and record["coverage_complete"]
+    assert set(record["stages"]) == {"clone", "map", "readme", "prioritize", "parse", "graph", "docs"}
+    assert sum(record["outcomes"].values()) >= record["files"]
+
+    assert manifest["manifest_path"] == str(tmp_path / "outputs" / MANIFEST_FILE)
+    with open(manifest["manifest_path"], encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved == {key: value for key, value in manifest.items() if key != "manifest_path"}
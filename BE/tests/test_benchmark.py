@@ -0,0 +1,45 @@
+import tracemalloc
+
+from benchmark import Workload, compare, legacy_jac_extract, main, measure
+from instrumentation import Instrumentation
+
+
+def result(files_per_second=100.0, **extra):
+    metrics = {"files_per_second": files_per_second, "samples": 1, "p50_ms": 1.0, "p99_ms": 1.0,
+               "peak_memory": None}
+    metrics.update(extra)
+    return metrics
+
+
+def test_jac_scanner_is_gated_on_its_ratio_to_the_legacy_scanner():
+    baseline = {"results": {"s/jac_parse": result(legacy_ratio=4.0)}}
+    assert compare({"results": {"s/jac_parse": result(legacy_ratio=4.8)}}, baseline) == []
+    regressions = compare({"results": {"s/jac_parse": result(legacy_ratio=6.0)}}, baseline)
+    assert regressions == ["s/jac_parse: 6.0x the line-prefix scanner, baseline 4.0x"]
+
+
+def test_legacy_extractor_only_sees_walkers_and_nodes():
+    analysis = legacy_jac_extract("node A {\n# doc\n}\nedge E {}\nwalker w {\n    can f;\n}\n", "x.jac")
+    assert [cls["name"] for cls in analysis["classes"]] == ["A"]
+    assert analysis["classes"][0]["docstring"] == "# doc"
+    assert [(f["name"], f["line_number"]) for f in analysis["functions"]] == [("w", 5)]
+
+
+def test_gate_needs_a_baseline(tmp_path):
+    args = ["--files", "20", "--stages", "jac_parse", "jac_parse_legacy", "--repeat", "1", "--no-memory",
+            "--work-root", str(tmp_path / "repos"), "--baseline", str(tmp_path / "baseline.json")]
+    assert main(args) == 2
+    assert main(args + ["--write-baseline"]) == 0
+    assert (tmp_path / "baseline.json").exists()
+    # Generous tolerance: the gate itself is under test, not this machine's timing
+    assert main(args + ["--tolerance", "100"]) == 0
+
+
+def test_memory_pass_leaves_a_profiled_run_tracing(synthetic_repo):
+    run = Instrumentation("run", profile=True)
+    with run.activated():
+        metrics = measure("file_tree", Workload(synthetic_repo, {"source_files": 40, "lines": 0}), repeat=1)
+        # The benchmark shares tracemalloc with the run instead of stopping it
+        assert tracemalloc.is_tracing()
+        assert metrics["peak_memory"] >= 0
+    assert not tracemalloc.is_tracing()
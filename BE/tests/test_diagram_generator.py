@@ -0,0 +1,58 @@
+import pytest
+
+from diagram_generator import DiagramEngine
+from parser_utils import ParserUtils
+from pipeline import build_code_graph, prioritize_files
+from utils import GitUtils
+
+
+def engine_for(repo, **kwargs):
+    file_tree = GitUtils.generate_file_tree(str(repo))
+    code_graph = build_code_graph(ParserUtils(cache=False), prioritize_files(file_tree), file_tree, workers=1)
+    return DiagramEngine(code_graph, file_tree["path"], **kwargs)
+
+
+def diagrams_of(engine):
+    yield engine.overview()
+    yield engine.call_graph()
+    for cluster, _, _ in engine.clusters():
+        yield engine.call_graph(cluster)
+        yield engine.package_diagram(cluster)
+
+
+@pytest.mark.parametrize("max_nodes, max_edges", [(4, 3), (6, 10), (40, 80)])
+def test_diagrams_stay_within_budget(synthetic_repo, max_nodes, max_edges):
+    engine = engine_for(synthetic_repo, max_nodes=max_nodes, max_edges=max_edges)
+    assert len(engine.clusters()) <= max_nodes
+    omitted = 0
+    for diagram in diagrams_of(engine):
+        assert len(diagram.nodes) <= max_nodes, diagram.title
+        assert len(diagram.edges) <= max_edges, diagram.title
+        omitted += diagram.omitted_nodes + diagram.omitted_edges
+        if diagram.omitted_nodes or diagram.omitted_edges:
+            assert "left out to fit the budget" in "".join(diagram.iter_mermaid())
+    # The tight budgets must actually have cut something
+    assert omitted or max_nodes == 40
+
+
+def test_same_named_files_in_different_packages_stay_apart(tmp_path):
+    for package in ("alpha", "beta"):
+        (tmp_path / package).mkdir()
+        (tmp_path / package / "__init__.py").write_text("")
+        (tmp_path / package / "util.py").write_text(
+            "def helper():\n    return 1\n\n\ndef run():\n    return helper()\n"
+        )
+    engine = engine_for(tmp_path)
+
+    diagram = engine.call_graph()
+    assert sorted(diagram.groups.values()) == ["alpha/util.py", "beta/util.py"]
+    node_ids = [node_id for node_id, _, _ in diagram.nodes]
+    assert len(node_ids) == len(set(node_ids)) == 4
+    # Each run() calls the helper of its own package
+    groups = {node_id: group for node_id, _, group in diagram.nodes}
+    assert len(diagram.edges) == 2
+    assert all(groups[source] == groups[target] for source, target, _ in diagram.edges)
+
+    names = [name for _, name, _ in engine.clusters()]
+    assert sorted(names) == ["alpha", "beta"]
+    assert engine.cluster_of("alpha") != engine.cluster_of("beta")
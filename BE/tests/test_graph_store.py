@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from graph_store import GraphStore, GraphStoreError, save
+from parser_utils import ParserUtils
+from pipeline import build_code_graph, prioritize_files
+from utils import GitUtils
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def plain(code_graph):
+    return {
+        "nodes": {path: node for path, node in code_graph["nodes"].items()},
+        "edges": list(code_graph["edges"]),
+        "file_dependencies": {path: deps for path, deps in code_graph["file_dependencies"].items()}
+    }
+
+
+@pytest.fixture(scope="module", params=["synthetic", "backend"])
+def code_graph(request, synthetic_repo):
+    # Python and Jac modules generated by the benchmark, and this backend's own sources
+    root = synthetic_repo if request.param == "synthetic" else BACKEND
+    file_tree = GitUtils.filter_irrelevant_directories(GitUtils.generate_file_tree(root))
+    return plain(build_code_graph(ParserUtils(cache=False), prioritize_files(file_tree), file_tree, workers=1))
+
+
+def test_round_trip(code_graph, tmp_path):
+    path = str(tmp_path / "graph.bin")
+    save(code_graph, path)
+    with GraphStore.open(path) as store:
+        assert store.load_code_graph() == code_graph
+        # Lazily decoded views hold the same records
+        assert plain(store.code_graph()) == code_graph
+
+
+def test_find_definitions(code_graph, tmp_path):
+    path = str(tmp_path / "graph.bin")
+    save(code_graph, path)
+    file_path, node = next((path, node) for path, node in code_graph["nodes"].items() if node["classes"])
+    cls = node["classes"][0]
+    with GraphStore.open(path) as store:
+        assert (file_path, "class", cls["line_number"]) in store.find_definitions(cls["name"])
+        assert store.find_definitions("no_such_definition") == []
+
+
+def test_text_survives_unchanged(tmp_path):
+    docstring = "Ünïcödé, emoji \U0001F600 and a lone surrogate \udc80"
+    code_graph = {
+        "nodes": {"/src/a.py": {
+            "type": "file", "name": "a.py",
+            "functions": [{"name": "f", "signature": "def f()", "docstring": docstring, "parameters": [],
+                           "return_type": None, "calls": ["g"], "line_number": 1, "is_async": True}],
+            "classes": [],
+            "imports": [{"module": None, "names": ["b"], "aliases": [None], "level": 1, "from": True,
+                         "line_number": 1}]
+        }},
+        "edges": [],
+        "file_dependencies": {"/src/a.py": []}
+    }
+    path = str(tmp_path / "graph.bin")
+    save(code_graph, path)
+    with GraphStore.open(path) as store:
+        assert store.load_code_graph() == code_graph
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "graph.bin"
+    path.write_bytes(b"not a graph store at all")
+    with pytest.raises(GraphStoreError):
+        GraphStore.open(str(path))
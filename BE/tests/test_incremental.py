@@ -0,0 +1,137 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+from call_graph import CallGraph
+from graph_store import GRAPH_FILE, save as save_graph
+from incremental import IncrementalAnalyzer
+from parser_utils import ParserUtils
+from pipeline import build_code_graph, prioritize_files
+from utils import GitUtils
+
+URL = "https://example.com/team/project.git"
+
+
+def git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+
+def write(repo, path, text):
+    path = repo / path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def commit(repo, message):
+    git(repo, "add", "-A")
+    git(repo, "-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "-q", "-m", message)
+    return GitUtils.get_head_commit(str(repo))
+
+
+def analyse(parser, repo):
+    file_tree = GitUtils.filter_irrelevant_directories(
+        GitUtils.annotate_blob_hashes(GitUtils.generate_file_tree(str(repo)))
+    )
+    return file_tree, build_code_graph(parser, prioritize_files(file_tree), file_tree, workers=1)
+
+
+def comparable(code_graph):
+    """Nodes, edges and dependencies in a form that ignores edge order"""
+    return {
+        "nodes": json.loads(json.dumps(dict(code_graph["nodes"]), sort_keys=True)),
+        "edges": sorted(json.dumps(edge, sort_keys=True) for edge in code_graph["edges"]),
+        "dependencies": json.loads(json.dumps(dict(code_graph["file_dependencies"]), sort_keys=True)),
+        "relationships": CallGraph.for_graph(code_graph).stats()
+    }
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    git(repo, "init", "-q")
+    write(repo, "README.md", "# Project\n")
+    write(repo, "pkg/__init__.py", "")
+    write(repo, "pkg/core.py", "from pkg.util import helper\n\n\nclass Engine:\n    def run(self):\n        return helper()\n")
+    write(repo, "pkg/util.py", "def helper():\n    return 1\n")
+    write(repo, "pkg/old.py", "def unused():\n    pass\n")
+    return repo
+
+
+@pytest.fixture
+def analyzer(tmp_path):
+    return IncrementalAnalyzer(ParserUtils(cache=False), str(tmp_path / "outputs"))
+
+
+def test_patch_matches_a_full_rebuild(repo, analyzer):
+    parser = analyzer.parser
+    first = commit(repo, "first")
+    file_tree, code_graph = analyse(parser, repo)
+    analyzer.save_state(URL, str(repo), first, code_graph, "Summary.")
+
+    write(repo, "pkg/core.py", "from pkg.util import helper\nfrom pkg.extra import more\n\n\n"
+                               "class Engine:\n    def run(self):\n        return helper() + more()\n")
+    write(repo, "pkg/extra.py", "def more():\n    return 2\n")
+    os.remove(repo / "pkg/old.py")
+    second = commit(repo, "second")
+
+    plan = analyzer.plan(URL, str(repo))
+    assert plan["mode"] == "incremental" and plan["commit"] == second
+    assert not analyzer.readme_changed(plan["changes"])
+
+    file_tree, rebuilt = analyse(parser, repo)
+    patched = analyzer.patch_code_graph(plan["state"]["code_graph"], plan["changes"], file_tree, workers=1)
+    assert str(repo / "pkg/old.py") not in patched["nodes"]
+    assert comparable(patched) == comparable(rebuilt)
+    # The added module sits where a full run puts it, not at the end
+    assert list(patched["nodes"]) == list(rebuilt["nodes"])
+    assert list(patched["file_dependencies"]) == list(rebuilt["file_dependencies"])
+    # Engine.run now also calls the added module
+    assert CallGraph.for_graph(patched).stats()["calls"] == 2
+
+
+def test_same_commit_is_unchanged(repo, analyzer):
+    first = commit(repo, "first")
+    file_tree, code_graph = analyse(analyzer.parser, repo)
+    analyzer.save_state(URL, str(repo), first, code_graph, "Summary.")
+
+    plan = analyzer.plan(URL, str(repo))
+    assert plan["mode"] == "unchanged"
+    assert plan["state"]["readme_summary"] == "Summary."
+
+
+def test_without_state_the_plan_is_a_full_run(repo, analyzer):
+    commit(repo, "first")
+    assert analyzer.plan(URL, str(repo))["mode"] == "full"
+
+
+def test_readme_edits_are_noticed(repo, analyzer):
+    first = commit(repo, "first")
+    file_tree, code_graph = analyse(analyzer.parser, repo)
+    analyzer.save_state(URL, str(repo), first, code_graph, "Summary.")
+    write(repo, "README.md", "# Project\n\nNow with more words.\n")
+    commit(repo, "docs")
+
+    assert analyzer.readme_changed(analyzer.plan(URL, str(repo))["changes"])
+
+
+def test_state_points_at_the_graph_saved_with_the_document(repo, analyzer):
+    first = commit(repo, "first")
+    file_tree, code_graph = analyse(analyzer.parser, repo)
+    graph_path = os.path.join(os.path.dirname(analyzer.state_path(URL)), "docs", GRAPH_FILE)
+    os.makedirs(os.path.dirname(graph_path))
+    save_graph(code_graph, graph_path)
+    written = os.stat(graph_path).st_mtime_ns
+
+    analyzer.save_state(URL, str(repo), first, code_graph, "Summary.", graph_path)
+    assert os.stat(graph_path).st_mtime_ns == written
+    assert not os.path.exists(os.path.join(os.path.dirname(analyzer.state_path(URL)), GRAPH_FILE))
+    state = analyzer.load_state(URL)
+    assert list(state["code_graph"]["nodes"]) == list(code_graph["nodes"])
+
+    # A later document replaces the graph, which no longer fits this state
+    save_graph(code_graph, graph_path)
+    os.utime(graph_path, ns=(written + 10**9, written + 10**9))
+    assert analyzer.load_state(URL) is None
@@ -0,0 +1,66 @@
+import mmap
+
+import pytest
+
+import ingest
+from parser_utils import ParserUtils
+
+
+def test_binary_files_are_skipped(tmp_path):
+    path = tmp_path / "blob.py"
+    path.write_bytes(b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR" * 10)
+    assert ingest.read_text(str(path)) == (None, path.stat().st_size, "binary")
+
+
+def test_minified_sources_are_skipped(tmp_path):
+    path = tmp_path / "bundle.js"
+    path.write_text("var a=1;" * 2000)
+    text, bytes_read, reason = ingest.read_text(str(path), source=True)
+    assert (text, bytes_read, reason) == (None, ingest.SNIFF_BYTES, "minified")
+    # Only source files are held to the line-length rule
+    assert ingest.read_text(str(path))[2] is None
+
+
+def test_oversized_files_are_rejected_unread(tmp_path, monkeypatch):
+    path = tmp_path / "big.py"
+    path.write_text("x = 1\n" * 100)
+    assert ingest.read_text(str(path), max_bytes=100) == (None, 0, "too_large")
+    monkeypatch.setenv("CODEBASE_GENIUS_MAX_FILE_BYTES", "100")
+    assert ingest.exceeds_limit(path.stat().st_size)
+
+    analysis, _, bytes_read, outcome = ParserUtils(cache=False)._parse_measured(
+        {"path": str(path), "extension": ".py", "size": path.stat().st_size}
+    )
+    assert (analysis, bytes_read, outcome) == (None, 0, "too_large")
+
+
+def test_large_files_are_decoded_from_a_mapping(tmp_path, monkeypatch):
+    mapped = []
+
+    class RecordingMap(mmap.mmap):
+        def __init__(self, *args, **kwargs):
+            mapped.append(args)
+
+    monkeypatch.setattr(ingest.mmap, "mmap", RecordingMap)
+    # Blocks that split the multi-byte characters
+    monkeypatch.setattr(ingest, "DECODE_BLOCK_BYTES", 4095)
+    text = "# café ünïcödé\ndef f():\n    return 'ß'\n" * (ingest.MMAP_THRESHOLD // 30)
+    path = tmp_path / "large.py"
+    path.write_text(text, encoding="utf-8")
+
+    assert ingest.read_text(str(path), source=True) == (text, len(text.encode("utf-8")), None)
+    assert len(mapped) == 1
+
+    small = tmp_path / "small.py"
+    small.write_text("x = 'é'\n", encoding="utf-8")
+    assert ingest.read_text(str(small))[0] == "x = 'é'\n"
+    assert len(mapped) == 1
+
+
+@pytest.mark.parametrize("data, encoding", [
+    ("x = 'é'\n".encode("utf-8"), "utf-8"),
+    ("x = 'é'\n".encode("utf-16"), "utf-16"),
+    (b"x = '\xe9'\n", "latin-1"),
+])
+def test_encoding_is_detected_from_the_head(data, encoding):
+    assert ingest.detect_encoding(data) == encoding
@@ -0,0 +1,41 @@
+import tracemalloc
+
+from instrumentation import Instrumentation, current
+
+
+def test_deactivate_ends_profiling_on_an_early_exit():
+    outer = Instrumentation("outer").activate()
+    run = Instrumentation("run", profile=True).activate()
+    assert current() is run and tracemalloc.is_tracing()
+
+    # A walker that stops before save() still deactivates in its finally block
+    run.deactivate()
+    assert current() is outer
+    assert not tracemalloc.is_tracing()
+    run.deactivate()
+    outer.deactivate()
+    assert current() is not outer
+
+
+def test_overlapping_profiled_runs_share_tracing(tmp_path):
+    first = Instrumentation("first", profile=True)
+    second = Instrumentation("second", profile=True)
+    with first.activated():
+        with second.activated():
+            assert tracemalloc.is_tracing()
+        # The inner run ending does not stop the outer one's tracing
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+
+    paths = first.save(str(tmp_path))
+    assert set(paths) == {"metrics", "profile", "allocations"}
+
+
+def test_tracing_started_elsewhere_is_left_running():
+    tracemalloc.start()
+    try:
+        with Instrumentation("run", profile=True).activated():
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,131 @@
+import glob
+import os
+
+import pytest
+
+from jac_parser import JacParser
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JAC_FILES = sorted(glob.glob(os.path.join(BACKEND, "*.jac")))
+
+SOURCE = '''"""Module doc."""
+import:py os, json as j;
+import from utils { helper, other as alias }
+
+// A person in the graph
+node Person :Entity, Named: {
+    has name: str, age: int = 0, tags: list = [1, {2: 3}];
+    has meta: dict = {"a;b": {"c}": 1}};
+
+    can greet(other: Person, times: int = 1) -> str {
+        """Say hello."""
+        if times > 1 { return "hi {" * times; }
+        return f"hi {other.name}";
+    }
+    can leave;
+}
+
+edge Knows { has since: int; }
+
+walker Greeter {
+    has input target, count: int = 1;
+    has output greeting;
+    can people.find_people;
+    can start with `root entry {
+        /* braces } in comments are ignored */
+        visit [-->];
+        x = people:rank(here, "a/b", {"k": 1});
+    }
+}
+'''
+
+
+def parse(source, path="test.jac"):
+    return JacParser().parse(source, path)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def by_name(records):
+    return {record["name"]: record for record in records}
+
+
+def test_archetypes_fields_and_abilities():
+    classes = by_name(parse(SOURCE)["classes"])
+    assert list(classes) == ["Person", "Knows"]
+
+    person = classes["Person"]
+    assert person["kind"] == "node"
+    assert person["docstring"] == "A person in the graph"
+    assert person["parent_classes"] == ["Entity", "Named"]
+    assert person["line_number"] == 6
+    assert [(field["name"], field["type"]) for field in person["fields"]] == [
+        ("name", "str"), ("age", "int"), ("tags", "list"), ("meta", "dict")
+    ]
+    greet, leave = person["methods"]
+    assert greet["name"] == "greet" and greet["line_number"] == 10
+    assert greet["docstring"] == "Say hello."
+    assert [param["name"] for param in greet["parameters"]] == ["other", "times"]
+    assert greet["return_type"] == "str"
+    assert leave["signature"] == "can leave"
+
+    assert classes["Knows"]["kind"] == "edge"
+    assert classes["Knows"]["fields"] == [{"name": "since", "type": "int"}]
+
+
+def test_walkers_and_their_dependencies():
+    greeter, = parse(SOURCE)["functions"]
+    assert greeter["name"] == "Greeter"
+    assert [param["name"] for param in greeter["parameters"]] == ["target", "count"]
+    assert greeter["return_type"] == "greeting"
+    # Declared with can, and invoked from its entry ability
+    assert greeter["calls"] == ["people.find_people", "people.rank"]
+
+
+def test_imports():
+    imports = parse(SOURCE)["imports"]
+    assert [(i["module"], i["names"], i["aliases"], i["from"]) for i in imports] == [
+        ("os", ["os"], [None], False),
+        ("json", ["json"], ["j"], False),
+        ("utils", ["helper"], [None], True),
+        ("utils", ["other"], ["alias"], True)
+    ]
+    assert [i["line_number"] for i in imports] == [2, 2, 3, 3]
+
+
+@pytest.mark.parametrize("path", JAC_FILES, ids=os.path.basename)
+def test_backend_jac_files(path):
+    source = read(path)
+    analysis = parse(source, path)
+    lines = source.split("\n")
+    assert analysis["functions"], "every backend Jac file defines walkers"
+    for record in analysis["functions"] + analysis["classes"]:
+        assert record["name"] in lines[record["line_number"] - 1]
+    for walker in analysis["functions"]:
+        assert all('.' in call for call in walker["calls"])
+
+
+def test_backend_walkers_link_to_each_other():
+    analyses = {os.path.basename(path): parse(read(path), path) for path in JAC_FILES}
+    main = analyses["main.jac"]
+    kinds = {record["name"]: record["kind"] for record in main["classes"]}
+    assert kinds["repository"] == "node"
+    assert kinds["calls"] == "edge"
+    assert kinds["codebase_graph"] == "graph"
+    generate = by_name(main["functions"])["generate_documentation"]
+    assert "supervisor.generate_documentation_workflow" in generate["calls"]
+    assert "supervisor.incremental_documentation_workflow" in generate["calls"]
+
+    # Every walker-to-walker dependency points at a walker of the named module
+    walkers = {(name[:-len(".jac")], walker["name"])
+               for name, analysis in analyses.items() for walker in analysis["functions"]}
+    modules = {module for module, _ in walkers}
+    for analysis in analyses.values():
+        for walker in analysis["functions"]:
+            for call in walker["calls"]:
+                module, _, name = call.partition('.')
+                if module in modules:
+                    assert (module, name) in walkers, call
@@ -0,0 +1,107 @@
+import os
+import sqlite3
+import time
+
+import pytest
+
+from jobs import CANCELLED, COMPLETED, ERROR, PROCESSING, QUEUED, JobManager, JobStore, QueueFull, TERMINAL_STATES
+
+
+def wait_for(manager, job_id, statuses=(COMPLETED, ERROR), timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.status(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {manager.status(job_id)['status']}")
+
+
+@pytest.fixture
+def manager_for(tmp_path):
+    managers = []
+
+    def make(pipeline, **kwargs):
+        manager = JobManager(pipeline, JobStore(str(tmp_path / "jobs.sqlite3")), **kwargs)
+        managers.append(manager)
+        return manager
+    yield make
+    for manager in managers:
+        manager.shutdown()
+
+
+def test_same_commit_is_deduplicated(synthetic_repo, make_pipeline, manager_for):
+    manager = manager_for(make_pipeline({"repo": synthetic_repo}))
+    first, deduplicated = manager.submit("repo")
+    assert not deduplicated
+    job = wait_for(manager, first)
+    assert job["status"] == COMPLETED, job["error"]
+    assert os.path.exists(job["documentation_path"])
+
+    again, deduplicated = manager.submit("repo")
+    assert deduplicated and again == first
+
+
+def test_concurrent_runs_get_their_own_output_directory(synthetic_repo, make_pipeline, manager_for):
+    manager = manager_for(make_pipeline({"repo": synthetic_repo}))
+    # Different budgets keep the second request from joining the first
+    first, _ = manager.submit("repo", budget={"files": 5})
+    second, deduplicated = manager.submit("repo", budget={"files": 10})
+    assert not deduplicated
+    jobs = [wait_for(manager, first), wait_for(manager, second)]
+    assert [job["status"] for job in jobs] == [COMPLETED, COMPLETED], [job["error"] for job in jobs]
+    assert jobs[0]["output_dir"] != jobs[1]["output_dir"]
+    for job in jobs:
+        assert os.path.dirname(job["documentation_path"]) == job["output_dir"]
+        assert os.path.exists(job["documentation_path"])
+
+
+def test_full_queue_raises(synthetic_repo, make_pipeline, manager_for, blocking_summarizer):
+    directories = {url: synthetic_repo for url in ("a", "b", "c")}
+    manager = manager_for(make_pipeline(directories, summarizer=blocking_summarizer), workers=1, max_queue=1)
+    try:
+        running, _ = manager.submit("a")
+        wait_for(manager, running, (PROCESSING,))
+        waiting, _ = manager.submit("b")
+        assert manager.status(waiting)["status"] == QUEUED
+        with pytest.raises(QueueFull):
+            manager.submit("c")
+    finally:
+        blocking_summarizer.release.set()
+    assert wait_for(manager, waiting)["status"] == COMPLETED
+
+
+def test_cancel_stops_running_and_queued_jobs(synthetic_repo, make_pipeline, manager_for, blocking_summarizer):
+    directories = {url: synthetic_repo for url in ("a", "b")}
+    manager = manager_for(make_pipeline(directories, summarizer=blocking_summarizer), workers=1)
+    try:
+        running, _ = manager.submit("a")
+        wait_for(manager, running, (PROCESSING,))
+        waiting, _ = manager.submit("b")
+        # A queued job is cancelled at once and never starts
+        assert manager.cancel(waiting)
+        assert manager.status(waiting)["status"] == CANCELLED
+        assert manager.cancel(running)
+    finally:
+        blocking_summarizer.release.set()
+    # A running one stops at its next checkpoint instead of completing
+    assert wait_for(manager, running, TERMINAL_STATES)["status"] == CANCELLED
+    assert manager.status(waiting)["status"] == CANCELLED
+    assert not manager.cancel(running)
+    assert [event for _, event, data in manager.events_since(waiting, timeout=0)] == ["status"]
+
+
+def test_store_adds_output_dir_to_old_databases(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, repo_url TEXT NOT NULL, commit_sha TEXT, "
+                 "options TEXT NOT NULL, status TEXT NOT NULL, stage TEXT, progress INTEGER NOT NULL DEFAULT 0, "
+                 "documentation_path TEXT, result TEXT, error TEXT, created_at REAL NOT NULL, "
+                 "updated_at REAL NOT NULL)")
+    conn.commit()
+    conn.close()
+
+    store = JobStore(path)
+    job = store.get(store.create("repo", None, {}, output_dir="out"))
+    assert job["output_dir"] == "out"
+    store.close()
@@ -0,0 +1,68 @@
+import json
+import threading
+
+import pytest
+
+from parser_utils import MIN_PARALLEL_FILES, ParserUtils, parse_pool
+from pipeline import build_code_graph, prioritize_files
+from utils import GitUtils
+
+
+class _Finalized:
+    def __del__(self):
+        # Python code run from a collection lets another thread take over mid-parse
+        sum(range(50))
+
+
+def test_inline_python_parsing_is_thread_safe():
+    source = "\n".join(f"def f{i}(a, b):\n    return [x for x in ((a + b) * {i} for _ in range(3))]\n"
+                       for i in range(200))
+    parser = ParserUtils(cache=False)
+    failures = []
+
+    def parse():
+        for _ in range(10):
+            garbage = [_Finalized() for _ in range(100)]
+            for item in garbage:
+                item.cycle = item
+            del garbage
+            try:
+                if len(parser._parse_python_file(source, "m.py")["functions"]) != 200:
+                    failures.append("incomplete")
+            except SystemError as e:
+                failures.append(str(e))
+
+    threads = [threading.Thread(target=parse) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert failures == []
+
+
+def graph_of(parser, repo, workers):
+    file_tree = GitUtils.generate_file_tree(repo)
+    files = prioritize_files(file_tree)
+    # Round-tripped so tuples and lists compare alike
+    return json.loads(json.dumps(build_code_graph(parser, files, file_tree, workers)))
+
+
+def test_parallel_parsing_matches_serial(synthetic_repo):
+    serial = graph_of(ParserUtils(cache=False), synthetic_repo, 1)
+    assert len(serial["nodes"]) > MIN_PARALLEL_FILES
+    assert graph_of(ParserUtils(cache=False), synthetic_repo, 3) == serial
+
+    pool = parse_pool(2)
+    try:
+        assert graph_of(ParserUtils(cache=False, pool=pool, pool_workers=2), synthetic_repo, None) == serial
+    finally:
+        pool.shutdown()
+
+
+def test_shared_pool_needs_its_worker_count():
+    pool = parse_pool(1)
+    try:
+        with pytest.raises(ValueError):
+            ParserUtils(cache=False, pool=pool)
+    finally:
+        pool.shutdown()
@@ -0,0 +1,84 @@
+import pytest
+
+from prioritizer import Budget, coverage_report, prioritize
+from utils import GitUtils
+
+
+def ranked(*sizes):
+    return [{"path": f"/repo/f{index}.py", "size": size, "priority": 1.0 - index / 10}
+            for index, size in enumerate(sizes)]
+
+
+def test_without_limits_everything_is_selected():
+    files = ranked(10, 20, 30)
+    assert Budget(seconds=5).select(files) == (files, None)
+    assert Budget.from_dict({}) is None
+    assert Budget.from_dict({"files": 2}).to_dict() == {"files": 2}
+
+
+def test_file_limit_keeps_the_best_files():
+    files = ranked(10, 20, 30)
+    assert Budget(files=2).select(files) == (files[:2], "files")
+
+
+def test_byte_limit_skips_files_that_do_not_fit():
+    files = ranked(60, 50, 30, 10)
+    selected, stopped_by = Budget(bytes=100).select(files)
+    # The second file does not fit after the first, but smaller ones further down do
+    assert selected == [files[0], files[2], files[3]]
+    assert stopped_by == "bytes"
+
+
+def test_first_limit_reached_is_reported():
+    files = ranked(60, 50, 30, 10)
+    assert Budget(files=2, bytes=100).select(files) == ([files[0], files[2]], "bytes")
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "tests").mkdir()
+    (tmp_path / "main.py").write_text("from pkg import core\n\ncore.run()\n")
+    (tmp_path / "pkg" / "__init__.py").write_text("")
+    (tmp_path / "pkg" / "core.py").write_text("def run():\n    pass\n" * 40)
+    (tmp_path / "pkg" / "leaf.py").write_text("from pkg import core\n" + "x = 1\n" * 40)
+    (tmp_path / "tests" / "test_core.py").write_text("from pkg import core\n" + "x = 1\n" * 40)
+    (tmp_path / "notes.txt").write_text("plain text\n" * 40)
+    return GitUtils.generate_file_tree(str(tmp_path))
+
+
+def names(files):
+    return [file["name"] for file in files]
+
+
+def test_ranking_prefers_entry_points_and_imported_modules(tree):
+    order, _, _ = prioritize(tree)
+    order = names(order)
+    assert order.index("main.py") < order.index("leaf.py")
+    assert order.index("core.py") < order.index("leaf.py")
+    assert order.index("leaf.py") < order.index("test_core.py")
+    # Files without a parser go last
+    assert order[-1] == "notes.txt"
+
+
+def test_budget_selection_and_coverage(tree):
+    budget = Budget(files=2)
+    order, selected, stopped_by = prioritize(tree, budget)
+    assert selected == order[:2] and stopped_by == "files"
+
+    coverage = coverage_report(tree, selected, budget)
+    assert not coverage["complete"]
+    assert coverage["stopped_by"] == "files"
+    assert coverage["files_analysed"] == 2 and coverage["files_total"] == len(order)
+    # Best-first, so the covered priority is at least the covered share of files
+    assert coverage["priority_covered"] >= 2 / len(order)
+    assert coverage_report(tree, order)["complete"]
+
+
+def test_budgeted_run_reports_its_coverage(synthetic_repo, make_pipeline):
+    result = make_pipeline({"repo": synthetic_repo}).run("repo", budget={"files": 5})
+    coverage = result["coverage"]
+    assert coverage["files_analysed"] == 5
+    assert coverage["stopped_by"] == "files" and not coverage["complete"]
+    with open(result["documentation_path"], encoding="utf-8") as f:
+        assert "### Coverage" in f.read()
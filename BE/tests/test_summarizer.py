@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+
+from summarizer import (LATENCY_WINDOW, ExtractiveClient, RateLimiter, ResponseCache, SummarizationService,
+                        chunk_text, count_tokens)
+
+TEXTS = {f"doc{i}": f"Module {i} parses files. It also writes reports. Nothing else happens here." for i in range(6)}
+
+
+class SlowClient(ExtractiveClient):
+    """Extractive answers after a short delay, tracking how many requests overlap"""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    async def complete(self, prompt, max_tokens):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.05)
+            return await super().complete(prompt, max_tokens)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_duplicates_and_repeats_are_served_once(tmp_path):
+    service = SummarizationService(ExtractiveClient(), ResponseCache(str(tmp_path)), requests_per_minute=6000)
+    texts = dict(TEXTS, copy=TEXTS["doc0"])
+    first = service.summarize_many(texts, "Summarize.")
+    assert first["copy"] == first["doc0"] and first["doc1"].startswith("Module 1")
+    assert service.metrics()["deduplicated"] == 1
+
+    requests = service.metrics()["requests"]
+    assert service.summarize_many(texts, "Summarize.") == first
+    assert service.metrics()["requests"] == requests
+    assert service.metrics()["cache_hits"] == len(TEXTS)
+
+
+def test_concurrency_limit_holds_across_threads():
+    client = SlowClient()
+    # Batches of one input each, so every text is its own request
+    service = SummarizationService(client, False, max_concurrency=2, requests_per_minute=60000, batch_tokens=1)
+    threads = [threading.Thread(target=service.summarize, args=(text,)) for text in TEXTS.values()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert service.metrics()["requests"] == len(TEXTS)
+    assert client.peak == 2
+
+
+def test_rate_limit_holds_across_event_loops():
+    # 20 requests a second, with bursts of up to 20
+    limiter = RateLimiter(1200)
+
+    def acquire(count):
+        async def run():
+            for _ in range(count):
+                await limiter.acquire()
+        asyncio.run(run())
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=acquire, args=(10,)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 30 requests: 20 from the burst, then 10 at 20 a second
+    assert time.monotonic() - started >= 0.45
+
+
+class EchoClient(ExtractiveClient):
+    """Answers with the whole input, so partial summaries never get shorter"""
+
+    async def complete(self, prompt, max_tokens):
+        return prompt, {}
+
+
+def test_reduce_stops_when_a_pass_does_not_shrink():
+    service = SummarizationService(EchoClient(), False, requests_per_minute=60000, chunk_tokens=50,
+                                   batch_tokens=50)
+    text = "\n\n".join(f"Paragraph {i} describes one more part of the module in detail." for i in range(40))
+    summary = service.summarize(text, "Summarize.")
+    metrics = service.metrics()
+    assert metrics["truncated"] == 1
+    # One map pass over the chunks plus the final request, not an endless loop
+    assert metrics["requests"] == len(chunk_text(text, 50)) + 1
+    assert count_tokens(summary) <= 50 + count_tokens("Summarize.\n\n")
+
+
+def test_latency_window_is_bounded():
+    service = SummarizationService(ExtractiveClient(), False)
+    for _ in range(LATENCY_WINDOW + 10):
+        service._record(0.5, {})
+    metrics = service.metrics()
+    assert len(service._latencies) == LATENCY_WINDOW
+    assert metrics["requests"] == LATENCY_WINDOW + 10
+    assert metrics["latency_total"] == 0.5 * (LATENCY_WINDOW + 10)
+    assert metrics["latency_p50"] == 0.5
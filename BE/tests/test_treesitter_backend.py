@@ -0,0 +1,99 @@
+import pytest
+
+from call_graph import CALLS, CallGraph
+from parser_utils import ParserUtils
+from pipeline import build_code_graph, prioritize_files
+from treesitter_backend import TreeSitterBackend
+from utils import GitUtils
+
+JS_SOURCE = """import render, { parse, format as fmt } from './text';
+import * as path from './path';
+import './polyfill';
+const fs = require('fs');
+const { join, resolve: absolute } = require('./path');
+
+/** Loads a file */
+export function load(name) {
+    return fmt(parse(fs.readFileSync(path.join(name))));
+}
+
+class Loader extends Base {
+    run() { return load(absolute('x')); }
+}
+"""
+
+GO_SOURCE = """package main
+
+import (
+    f "fmt"
+    "os"
+    _ "net/http/pprof"
+)
+
+// Point is a position
+type Point struct { X int }
+
+func main() {
+    f.Println(os.Args)
+}
+"""
+
+
+@pytest.fixture(scope="module")
+def backend():
+    return TreeSitterBackend()
+
+
+def imports(analysis):
+    return [(i["module"], list(zip(i["names"], i["aliases"])), i["from"]) for i in analysis["imports"]]
+
+
+@pytest.mark.parametrize("extension", [".js", ".ts"])
+def test_javascript_imports_keep_their_bindings(backend, extension):
+    analysis = backend.parse(JS_SOURCE, "loader" + extension, extension)
+    assert imports(analysis) == [
+        ("./text", [("./text", "render"), ("parse", None), ("format", "fmt")], True),
+        ("./path", [("./path", "path")], False),
+        ("./polyfill", [("./polyfill", None)], False),
+        ("fs", [("fs", "fs")], False),
+        ("./path", [("join", None), ("resolve", "absolute")], True)
+    ]
+    load, = analysis["functions"]
+    assert load["docstring"] == "Loads a file"
+    assert load["calls"] == ["fmt", "parse", "fs.readFileSync", "path.join"]
+    loader, = analysis["classes"]
+    assert loader["parent_classes"] == ["Base"]
+    assert loader["methods"][0]["calls"] == ["load", "absolute"]
+
+
+def test_go_imports_keep_their_aliases(backend):
+    analysis = backend.parse(GO_SOURCE, "main.go", ".go")
+    assert imports(analysis) == [
+        ("fmt", [("fmt", "f")], False),
+        ("os", [("os", None)], False),
+        ("net/http/pprof", [("net/http/pprof", None)], False)
+    ]
+    assert analysis["functions"][0]["calls"] == ["f.Println"]
+    assert analysis["classes"][0]["name"] == "Point"
+    assert analysis["classes"][0]["docstring"] == "Point is a position"
+
+
+def test_javascript_calls_resolve_across_files(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "text.js").write_text(
+        "export default function render(x) { return x; }\n"
+        "export function parse(x) { return x; }\n"
+        "export function format(x) { return x; }\n"
+    )
+    (tmp_path / "src" / "app.js").write_text(
+        "import { parse, format as fmt } from './text';\n"
+        "const text = require('./text');\n"
+        "export function main(x) { return fmt(parse(x)) + text.format(x); }\n"
+    )
+    file_tree = GitUtils.generate_file_tree(str(tmp_path))
+    code_graph = build_code_graph(ParserUtils(cache=False), prioritize_files(file_tree), file_tree, workers=1)
+    graph = CallGraph.for_graph(code_graph, str(tmp_path))
+    calls = {(graph.names[source], graph.names[target]) for source, target, _ in graph.iter_edges(CALLS)}
+    assert {(source.split('.')[-1], target.split('.')[-1]) for source, target in calls} == {
+        ("main", "parse"), ("main", "format")
+    }
@@ -0,0 +1,80 @@
+import os
+import subprocess
+
+import pytest
+
+from utils import GitIgnore, GitUtils
+
+
+def tree_paths(root):
+    file_tree = GitUtils.generate_file_tree(str(root))
+    return sorted(os.path.relpath(file["path"], str(root)).replace(os.sep, '/') for file in file_tree["files"])
+
+
+def touch(root, *paths):
+    for path in paths:
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text("x = 1\n")
+
+
+@pytest.mark.parametrize("rule, kept", [
+    # Anchored to the root: only the top-level out/ is ignored
+    ("/out/", ["src/main.py", "src/out/x.py"]),
+    # Unanchored: out/ directories at any depth
+    ("out/", ["src/main.py"]),
+    # A slash in the middle anchors too
+    ("src/out", ["out/x.py", "src/main.py"]),
+])
+def test_gitignore_anchoring(tmp_path, rule, kept):
+    touch(tmp_path, "out/x.py", "src/out/x.py", "src/main.py")
+    (tmp_path / ".gitignore").write_text(rule + "\n")
+    assert tree_paths(tmp_path) == kept
+
+
+def test_root_anchored_directory_rule(tmp_path):
+    (tmp_path / ".gitignore").write_text("/build/\n")
+    rules = [GitIgnore.load(str(tmp_path / ".gitignore"), "")]
+    assert GitIgnore.is_ignored(rules, "build", True)
+    assert not GitIgnore.is_ignored(rules, "src/build", True)
+    assert not GitIgnore.is_ignored(rules, "src/build/x.py", False)
+    # Directory rules never match files of the same name
+    assert not GitIgnore.is_ignored(rules, "build", False)
+
+
+def test_nested_gitignore_and_negation(tmp_path):
+    touch(tmp_path, "pkg/a.log", "pkg/keep.log", "pkg/a.py", "b.log")
+    (tmp_path / "pkg" / ".gitignore").write_text("*.log\n!keep.log\n")
+    assert tree_paths(tmp_path) == ["b.log", "pkg/a.py", "pkg/keep.log"]
+
+
+def test_symlinks_are_skipped(tmp_path):
+    touch(tmp_path, "src/main.py")
+    os.symlink(tmp_path / "src", tmp_path / "loop")
+    os.symlink(tmp_path / "src" / "main.py", tmp_path / "alias.py")
+    assert tree_paths(tmp_path) == ["src/main.py"]
+
+
+def test_partial_clone_checks_out_only_the_readme(synthetic_repo):
+    clone = GitUtils.clone_repository(synthetic_repo, "partial", use_reference=False)
+    try:
+        assert sorted(os.listdir(clone)) == [".git", "README.md"]
+    finally:
+        GitUtils.remove_clone(clone)
+
+
+def test_failed_partial_checkout_falls_back_to_a_full_clone(synthetic_repo, monkeypatch, capsys):
+    run = subprocess.run
+
+    def failing_checkout(command, **kwargs):
+        if "checkout" in command and "README.md" in command:
+            return subprocess.CompletedProcess(command, 1, "", "fatal: unable to fetch README.md")
+        return run(command, **kwargs)
+
+    monkeypatch.setattr(subprocess, "run", failing_checkout)
+    clone = GitUtils.clone_repository(synthetic_repo, "partial", use_reference=False)
+    try:
+        assert os.path.exists(os.path.join(clone, "main.py"))
+        assert "unable to fetch README.md" in capsys.readouterr().out
+    finally:
+        GitUtils.remove_clone(clone)
@@ -0,0 +1,493 @@
+import importlib
+from collections import OrderedDict
+
+from tree_sitter import Language, Parser, Query, QueryCursor
+
+# Trees kept per worker for incremental re-parsing of edited files
+MAX_CACHED_TREES = 256
+MAX_SIGNATURE_LENGTH = 200
+
+# Nodes that wrap a definition and carry its leading doc comment
+DECLARATION_WRAPPERS = (
+    "export_statement", "type_declaration", "lexical_declaration", "variable_declaration",
+    "variable_declarator"
+)
+
+
+class LanguageSpec:
+    """A tree-sitter grammar plus the query that extracts definitions from it.
+
+    The query uses a fixed capture vocabulary:
+        @function.def / @function.name / @function.params
+        @class.def / @class.name
+        @import / @import.module, plus @import.clause (the JS/TS import clause
+            or the pattern a require() result is assigned to) and
+            @import.alias (a Go package alias)
+        @call / @call.name / @call.object
+    """
+
+    def __init__(self, name, module, query, entry_point="language",
+                 superclass_fields=("superclasses",), docstring="comment"):
+        self.name = name
+        self.module = module
+        self.entry_point = entry_point
+        self.query = query
+        self.superclass_fields = superclass_fields
+        # "python" reads the first string statement of the body, "comment"
+        # the comment block immediately preceding the definition
+        self.docstring = docstring
+
+
+PYTHON_SPEC = LanguageSpec(
+    "python", "tree_sitter_python",
+    """
+    (function_definition name: (identifier) @function.name parameters: (parameters) @function.params) @function.def
+    (class_definition name: (identifier) @class.name) @class.def
+    (import_statement name: (_) @import.module) @import
+    (import_from_statement module_name: (_) @import.module) @import
+    (call function: (_) @call.name) @call
+    """,
+    docstring="python"
+)
+
+JAVASCRIPT_QUERY = """
+    (function_declaration name: (identifier) @function.name parameters: (formal_parameters) @function.params) @function.def
+    (method_definition name: (property_identifier) @function.name parameters: (formal_parameters) @function.params) @function.def
+    (variable_declarator name: (identifier) @function.name value: [(arrow_function) (function_expression)] @function.def)
+    (class_declaration name: (_) @class.name) @class.def
+    (import_statement (import_clause)? @import.clause source: (string) @import.module) @import
+    (variable_declarator name: (_) @import.clause
+        value: (call_expression function: (identifier) @_require arguments: (arguments . (string) @import.module .))
+        (#eq? @_require "require")) @import
+    (expression_statement
+        (call_expression function: (identifier) @_require arguments: (arguments . (string) @import.module .))
+        (#eq? @_require "require")) @import
+    (call_expression function: (_) @call.name) @call
+    (new_expression constructor: (_) @call.name) @call
+"""
+
+TYPESCRIPT_QUERY = JAVASCRIPT_QUERY + """
+    (interface_declaration name: (type_identifier) @class.name) @class.def
+"""
+
+DEFAULT_GRAMMARS = {
+    ".py": PYTHON_SPEC,
+    ".js": LanguageSpec("javascript", "tree_sitter_javascript", JAVASCRIPT_QUERY,
+                        superclass_fields=()),
+    ".ts": LanguageSpec("typescript", "tree_sitter_typescript", TYPESCRIPT_QUERY,
+                        entry_point="language_typescript", superclass_fields=()),
+    ".tsx": LanguageSpec("tsx", "tree_sitter_typescript", TYPESCRIPT_QUERY,
+                         entry_point="language_tsx", superclass_fields=()),
+    ".go": LanguageSpec(
+        "go", "tree_sitter_go",
+        """
+        (function_declaration name: (identifier) @function.name parameters: (parameter_list) @function.params) @function.def
+        (method_declaration name: (field_identifier) @function.name parameters: (parameter_list) @function.params) @function.def
+        (type_spec name: (type_identifier) @class.name type: [(struct_type) (interface_type)]) @class.def
+        (import_spec name: (_)? @import.alias path: (interpreted_string_literal) @import.module) @import
+        (call_expression function: (_) @call.name) @call
+        """,
+        superclass_fields=()
+    ),
+    ".java": LanguageSpec(
+        "java", "tree_sitter_java",
+        """
+        (method_declaration name: (identifier) @function.name parameters: (formal_parameters) @function.params) @function.def
+        (constructor_declaration name: (identifier) @function.name parameters: (formal_parameters) @function.params) @function.def
+        (class_declaration name: (identifier) @class.name) @class.def
+        (interface_declaration name: (identifier) @class.name) @class.def
+        (import_declaration (scoped_identifier) @import.module) @import
+        (method_invocation object: (_) @call.object name: (identifier) @call.name) @call
+        (method_invocation !object name: (identifier) @call.name) @call
+        (object_creation_expression type: (_) @call.name) @call
+        """,
+        superclass_fields=("superclass", "interfaces")
+    ),
+}
+DEFAULT_GRAMMARS[".jsx"] = DEFAULT_GRAMMARS[".js"]
+DEFAULT_GRAMMARS[".mjs"] = DEFAULT_GRAMMARS[".js"]
+DEFAULT_GRAMMARS[".cjs"] = DEFAULT_GRAMMARS[".js"]
+
+
+class TreeSitterBackend:
+    """Query-driven multi-language parser built on tree-sitter.
+
+    Grammars are Python packages (tree-sitter-python, tree-sitter-javascript,
+    ...) loaded on first use; extensions whose grammar is not installed are
+    reported as unsupported. One parser and one compiled query are kept per
+    language, and the last tree of each file is kept so that an edited file
+    is re-parsed incrementally.
+    """
+
+    def __init__(self, grammars=None):
+        self.grammars = dict(DEFAULT_GRAMMARS if grammars is None else grammars)
+        self._languages = {}
+        self._trees = OrderedDict()
+
+    def register_grammar(self, extension, spec):
+        """Add or replace the grammar used for a file extension"""
+        self.grammars[extension] = spec
+        self._languages.pop(spec.name, None)
+
+    def supports(self, extension):
+        return self._load(extension) is not None
+
+    def _load(self, extension):
+        """Return (parser, query, spec) for an extension, or None if unavailable"""
+        spec = self.grammars.get(extension)
+        if spec is None:
+            return None
+        if spec.name not in self._languages:
+            try:
+                module = importlib.import_module(spec.module)
+                language = Language(getattr(module, spec.entry_point)())
+                self._languages[spec.name] = (Parser(language), Query(language, spec.query), spec)
+            except Exception as e:
+                if not isinstance(e, ImportError):
+                    print(f"Tree-sitter grammar {spec.name} unavailable: {e}")
+                self._languages[spec.name] = None
+        return self._languages[spec.name]
+
+    def parse(self, content, file_path, extension):
+        """Parse source text into functions/classes/imports, or None if unsupported"""
+        loaded = self._load(extension)
+        if loaded is None:
+            return None
+        parser, query, spec = loaded
+
+        source = content.encode('utf-8', 'surrogateescape')
+        tree = self._parse_tree(parser, source, file_path)
+        matches = QueryCursor(query).matches(tree.root_node)
+        return self._extract(matches, spec, file_path)
+
+    def _parse_tree(self, parser, source, file_path):
+        """Parse, reusing the previous tree of the same file when there is one"""
+        previous = self._trees.pop(file_path, None)
+        if previous is not None and previous[0] == source:
+            tree = previous[1]
+        elif previous is not None:
+            old_source, old_tree = previous
+            old_tree.edit(**_single_edit(old_source, source))
+            tree = parser.parse(source, old_tree)
+        else:
+            tree = parser.parse(source)
+
+        self._trees[file_path] = (source, tree)
+        if len(self._trees) > MAX_CACHED_TREES:
+            self._trees.popitem(last=False)
+        return tree
+
+    def _extract(self, matches, spec, file_path):
+        analysis = {
+            "functions": [],
+            "classes": [],
+            "imports": [],
+            "file_path": file_path
+        }
+
+        # (start_byte, end_byte, kind, record) for every definition, used to
+        # nest methods in classes and attribute calls to functions
+        scopes = []
+        calls = []
+        for _, captures in matches:
+            if "function.def" in captures:
+                node = captures["function.def"][0]
+                name = _text(captures["function.name"][0])
+                params = captures.get("function.params")
+                params_node = params[0] if params else node.child_by_field_name("parameters")
+                func_info = {
+                    "name": name,
+                    "signature": _signature(node, name),
+                    "docstring": _docstring(node, spec),
+                    "parameters": _parameters(params_node) if params_node is not None else [],
+                    "return_type": (_field_text(node, "return_type") or _field_text(node, "result") or
+                                    _field_text(node, "type")),
+                    "calls": [],
+                    "line_number": node.start_point[0] + 1,
+                    "is_async": _text(node).startswith("async")
+                }
+                scopes.append((node.start_byte, node.end_byte, "function", func_info))
+            elif "class.def" in captures:
+                node = captures["class.def"][0]
+                class_info = {
+                    "name": _text(captures["class.name"][0]),
+                    "docstring": _docstring(node, spec),
+                    "methods": [],
+                    "parent_classes": _superclasses(node, spec),
+                    "line_number": node.start_point[0] + 1
+                }
+                scopes.append((node.start_byte, node.end_byte, "class", class_info))
+            elif "import" in captures:
+                node = captures["import"][0]
+                module, alias = _aliased(captures["import.module"][0])
+                module = module.strip('"\'`')
+                names, aliases, level = [], [], 0
+                from_import = node.type == "import_from_statement"
+                if from_import:
+                    # Python relative imports: leading dots are the level
+                    level = len(module) - len(module.lstrip('.'))
+                    module = module[level:]
+                    for child in node.children_by_field_name("name"):
+                        name, name_alias = _aliased(child)
+                        names.append(name)
+                        aliases.append(name_alias)
+                elif "import.clause" in captures:
+                    names, aliases = _import_clause(captures["import.clause"][0], module)
+                    # Named specifiers bind members; default and namespace imports bind the module
+                    from_import = any(name != module for name in names)
+                elif "import.alias" in captures:
+                    # Go: "_" and "." bind no name of their own
+                    alias = _text(captures["import.alias"][0])
+                    alias = alias if alias not in ("_", ".") else None
+                analysis["imports"].append({
+                    "module": module or None,
+                    "names": names or [module],
+                    "aliases": aliases or [alias],
+                    "level": level,
+                    # Python "from X import X" binds X's member, not the module
+                    "from": from_import,
+                    "line_number": node.start_point[0] + 1
+                })
+            elif "call" in captures:
+                callee = _callee(captures)
+                if callee:
+                    calls.append((captures["call"][0].start_byte, callee))
+
+        # Outer definitions sort before the definitions they contain
+        scopes.sort(key=lambda scope: (scope[0], -scope[1]))
+        # (start_byte, end_byte, record that calls inside are attributed to)
+        call_owners = []
+        stack = []
+        for start, end, kind, record in scopes:
+            while stack and stack[-1][1] <= start:
+                stack.pop()
+            parent = stack[-1] if stack else None
+            owner = record
+            if kind == "class":
+                analysis["classes"].append(record)
+                owner = None
+            elif parent is None:
+                analysis["functions"].append(record)
+            elif parent[2] == "class":
+                parent[3]["methods"].append(record)
+            else:
+                # Nested function: its calls belong to the enclosing function
+                owner = parent[3]
+            stack.append((start, end, kind, record if kind == "class" else owner))
+            call_owners.append((start, end, owner))
+
+        _attribute_calls(calls, call_owners)
+        return analysis
+
+
+def _attribute_calls(calls, call_owners):
+    """Record each call on the innermost function that contains it"""
+    calls.sort()
+    stack = []
+    position = 0
+    seen = {}
+    for call_start, callee in calls:
+        while position < len(call_owners) and call_owners[position][0] <= call_start:
+            stack.append(call_owners[position])
+            position += 1
+        while stack and stack[-1][1] <= call_start:
+            stack.pop()
+        # Skip calls outside any function, e.g. in class bodies or at module level
+        if not stack or stack[-1][2] is None:
+            continue
+        owner = stack[-1][2]
+        owner_calls = seen.setdefault(id(owner), set())
+        if callee not in owner_calls:
+            owner_calls.add(callee)
+            owner["calls"].append(callee)
+
+
+def _text(node):
+    return node.text.decode('utf-8', 'replace')
+
+
+def _aliased(node):
+    """Split an ``x as y`` import node into (name, alias)"""
+    if node.type == "aliased_import":
+        alias = node.child_by_field_name("alias")
+        return _text(node.child_by_field_name("name")), _text(alias) if alias is not None else None
+    return _text(node), None
+
+
+def _import_clause(node, module):
+    """(names, aliases) bound by a JS/TS import clause or require() pattern
+
+    Default and namespace imports, and a require() assigned to a plain
+    name, bind the module itself: their name is the module, their alias
+    the local name. Named specifiers and destructured properties bind
+    members of the module.
+    """
+    names, aliases = [], []
+    if node.type == "identifier":
+        return [module], [_text(node)]
+    for child in node.named_children:
+        if child.type == "identifier":
+            names.append(module)
+            aliases.append(_text(child))
+        elif child.type == "namespace_import":
+            local = next((grandchild for grandchild in child.named_children if grandchild.type == "identifier"), None)
+            names.append(module)
+            aliases.append(_text(local) if local is not None else None)
+        elif child.type == "named_imports":
+            for specifier in child.named_children:
+                if specifier.type != "import_specifier":
+                    continue
+                alias = specifier.child_by_field_name("alias")
+                names.append(_text(specifier.child_by_field_name("name")))
+                aliases.append(_text(alias) if alias is not None else None)
+        elif child.type == "shorthand_property_identifier_pattern":
+            names.append(_text(child))
+            aliases.append(None)
+        elif child.type == "pair_pattern":
+            key, value = child.child_by_field_name("key"), child.child_by_field_name("value")
+            if key is not None and value is not None and value.type == "identifier":
+                names.append(_text(key))
+                aliases.append(_text(value) if _text(value) != _text(key) else None)
+    return names, aliases
+
+
+def _field_text(node, field):
+    child = node.child_by_field_name(field)
+    return _text(child).lstrip(':').strip() if child is not None else None
+
+
+def _signature(node, name):
+    """Source text of a definition up to its body, on one line"""
+    body = node.child_by_field_name("body")
+    end = body.start_byte if body is not None else node.end_byte
+    text = node.text[:end - node.start_byte].decode('utf-8', 'replace')
+    text = ' '.join(text.split()).rstrip(':{ ')
+    if name not in text:
+        # Arrow functions and function expressions are named by their variable
+        text = f"{name} = {text}"
+    if len(text) > MAX_SIGNATURE_LENGTH:
+        text = text[:MAX_SIGNATURE_LENGTH] + "..."
+    return text or name
+
+
+def _parameters(params_node):
+    params = []
+    for child in params_node.named_children:
+        if child.type in ("comment", "line_comment", "block_comment"):
+            continue
+        name_node = child.child_by_field_name("name") or child.child_by_field_name("pattern")
+        if name_node is None and child.named_child_count and child.named_children[0].type == "identifier":
+            # Python typed parameters carry the name as an unnamed first child
+            name_node = child.named_children[0]
+        type_node = child.child_by_field_name("type")
+        name = _text(name_node) if name_node is not None else _text(child)
+        params.append({
+            "name": name,
+            "type": _text(type_node).lstrip(':').strip() if type_node is not None else "Any"
+        })
+    return params
+
+
+def _superclasses(node, spec):
+    parents = []
+    for field in spec.superclass_fields:
+        child = node.child_by_field_name(field)
+        if child is None:
+            continue
+        for parent in child.named_children:
+            if parent.type in ("identifier", "attribute", "type_identifier", "scoped_type_identifier"):
+                parents.append(_text(parent))
+            elif parent.type in ("type_list", "generic_type"):
+                parents.extend(_text(grandchild) for grandchild in parent.named_children
+                               if grandchild.type.endswith("identifier"))
+    # JS/TS keep the base class in a class_heritage child rather than a field
+    for child in node.named_children:
+        if child.type == "class_heritage":
+            parents.extend(
+                _text(grandchild) for grandchild in child.named_children
+                if grandchild.type in ("identifier", "member_expression")
+            )
+            for clause in child.named_children:
+                if clause.type in ("extends_clause", "implements_clause"):
+                    parents.extend(_text(grandchild) for grandchild in clause.named_children
+                                   if grandchild.type.endswith("identifier") or
+                                   grandchild.type == "member_expression")
+    return parents
+
+
+def _docstring(node, spec):
+    if spec.docstring == "python":
+        body = node.child_by_field_name("body")
+        if body is None or body.named_child_count == 0:
+            return None
+        first = body.named_children[0]
+        if first.type == "expression_statement" and first.named_child_count == 1 \
+                and first.named_children[0].type == "string":
+            raw = _text(first.named_children[0])
+            for quote in ('"""', "'''", '"', "'"):
+                if raw.endswith(quote):
+                    start = raw.find(quote)
+                    return raw[start + len(quote):-len(quote)].strip() or None
+        return None
+
+    # Comment block directly above the definition or its wrapping declaration
+    target = node
+    while target.parent is not None and target.parent.type in DECLARATION_WRAPPERS:
+        target = target.parent
+    lines = []
+    sibling = target.prev_named_sibling
+    while sibling is not None and "comment" in sibling.type:
+        lines.append(_text(sibling))
+        sibling = sibling.prev_named_sibling
+    if not lines:
+        return None
+    text = '\n'.join(reversed(lines))
+    cleaned = [line.strip().lstrip('/*').rstrip('*/').strip() for line in text.splitlines()]
+    return '\n'.join(line for line in cleaned if line) or None
+
+
+def _callee(captures):
+    name = _text(captures["call.name"][0])
+    if "call.object" in captures:
+        name = _text(captures["call.object"][0]) + "." + name
+    # Keep dotted names only; chained or computed callees are not resolvable
+    name = name.replace("?.", ".").replace("::", ".")
+    if not name or any(char in name for char in "()[]{}\"' \n\t"):
+        return None
+    return name
+
+
+def _single_edit(old, new):
+    """Describe the change between two sources as one tree-sitter edit"""
+    limit = min(len(old), len(new))
+    prefix = _common_length(lambda n: old[:n] == new[:n], limit)
+    suffix = _common_length(lambda n: old[len(old) - n:] == new[len(new) - n:], limit - prefix)
+
+    old_end = len(old) - suffix
+    new_end = len(new) - suffix
+    return {
+        "start_byte": prefix,
+        "old_end_byte": old_end,
+        "new_end_byte": new_end,
+        "start_point": _point(old, prefix),
+        "old_end_point": _point(old, old_end),
+        "new_end_point": _point(new, new_end)
+    }
+
+
+def _common_length(matches, limit):
+    """Largest n <= limit with matches(n), by binary search over slice comparisons"""
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if matches(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _point(source, offset):
+    row = source.count(b'\n', 0, offset)
+    column = offset - (source.rfind(b'\n', 0, offset) + 1)
+    return (row, column)
@@ -1,95 +1,648 @@
+import hashlib
 import os
+import re
 import subprocess
 import tempfile
 import shutil
+from array import array
 from pathlib import Path
 import requests
+import ingest
+
+DEFAULT_MIRROR_DIR = os.path.join(os.path.expanduser("~"), ".cache", "codebase_genius", "mirrors")
+DEFAULT_REFERENCE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "codebase_genius", "references")
+
+CLONE_STRATEGIES = {
+    "full": [],
+    "shallow": ["--depth", "1", "--single-branch"],
+    "partial": ["--filter=blob:none", "--no-checkout"],
+    "sparse": ["--filter=blob:none", "--sparse"]
+}
+
+# Checked out by the sparse strategy: source files plus what the docs read
+SPARSE_PATTERNS = [
+    "*.py", "*.jac", "*.js", "*.jsx", "*.ts", "*.tsx", "*.go", "*.java",
+    "README*", "readme*", "requirements.txt", "setup.py", "pyproject.toml", "package.json"
+]
+
+IRRELEVANT_DIRS = {'.git', '__pycache__', 'node_modules', 'venv', 'env', '.idea', 'build', 'dist'}
+
+
+class FileIndex:
+    """Flat, column-oriented index over the files of a tree.
+    
+    Columns are parallel arrays indexed by position in ``file_tree["files"]``;
+    the lookup tables answer name, path and extension queries in O(1).
+    """
+    
+    __slots__ = ("paths", "names", "extensions", "sizes", "mtimes",
+                 "by_path", "by_name", "extension_counts")
+    
+    def __init__(self, files):
+        self.paths = [f["path"] for f in files]
+        self.names = [f["name"] for f in files]
+        self.extensions = [f["extension"] for f in files]
+        self.sizes = array('q', (f.get("size", 0) for f in files))
+        self.mtimes = array('d', (f.get("mtime", 0.0) for f in files))
+        
+        self.by_path = {path: position for position, path in enumerate(self.paths)}
+        self.by_name = {}
+        self.extension_counts = {}
+        for position, name in enumerate(self.names):
+            self.by_name.setdefault(name, []).append(position)
+        for extension in self.extensions:
+            self.extension_counts[extension] = self.extension_counts.get(extension, 0) + 1
+    
+    def __len__(self):
+        return len(self.paths)
+    
+    def has_name(self, name):
+        return name in self.by_name
+    
+    def find(self, name):
+        """Return the paths of all files with the given base name"""
+        return [self.paths[position] for position in self.by_name.get(name, [])]
+    
+    def total_bytes(self):
+        return sum(self.sizes)
+
+
+class GitIgnore:
+    """Minimal .gitignore matcher for one directory's rule file"""
+    
+    def __init__(self, base, rules):
+        # base is the directory of the .gitignore relative to the repo root ("" or "a/b/")
+        self.base = base
+        self.rules = rules
+    
+    @staticmethod
+    def load(path, base):
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return None
+        
+        rules = []
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith('#'):
+                continue
+            negate = line.startswith('!')
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith('/')
+            # A slash at the start or in the middle anchors the rule; a trailing one does not
+            anchored = '/' in line.rstrip('/')
+            line = line.strip('/')
+            if not line:
+                continue
+            rules.append((GitIgnore._compile(line, anchored), negate, dir_only))
+        return GitIgnore(base, rules) if rules else None
+    
+    @staticmethod
+    def _compile(pattern, anchored):
+        regex = ""
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith("**/", i):
+                regex += "(?:.*/)?"
+                i += 3
+            elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+                regex += "/.*"
+                i += 3
+            elif pattern[i] == '*':
+                regex += "[^/]*"
+                i += 1
+            elif pattern[i] == '?':
+                regex += "[^/]"
+                i += 1
+            elif pattern[i] == '[' and ']' in pattern[i + 1:]:
+                close = pattern.index(']', i + 1)
+                body = pattern[i + 1:close]
+                regex += '[' + ('^' + body[1:] if body.startswith('!') else body) + ']'
+                i = close + 1
+            else:
+                regex += re.escape(pattern[i])
+                i += 1
+        # Unanchored patterns match a name at any depth below the .gitignore
+        prefix = "" if anchored else "(?:.*/)?"
+        return re.compile(prefix + regex + "$")
+    
+    @staticmethod
+    def is_ignored(ignore_rules, rel_path, is_dir):
+        """Apply rule files from the root down; the last matching rule wins"""
+        ignored = False
+        for rule_file in ignore_rules:
+            if not rel_path.startswith(rule_file.base):
+                continue
+            local_path = rel_path[len(rule_file.base):]
+            for regex, negate, dir_only in rule_file.rules:
+                if dir_only and not is_dir:
+                    continue
+                if regex.match(local_path):
+                    ignored = not negate
+        return ignored
 
 class GitUtils:
     
     @staticmethod
-    def clone_repository(repo_url):
-        """Clone repository to temporary directory"""
+    def clone_repository(repo_url, strategy=None, use_reference=None, timeout=None):
+        """Clone repository to temporary directory
+        
+        Strategies:
+            full    - complete history and checkout
+            shallow - only the tip commit (--depth 1)
+            partial - tree without blobs (--filter=blob:none --no-checkout);
+                      blobs are fetched later by materialize_files
+            sparse  - blobless clone with only source and project files checked out
+        """
+        strategy = strategy or os.environ.get("CODEBASE_GENIUS_CLONE_STRATEGY", "full")
+        if strategy not in CLONE_STRATEGIES:
+            print(f"Unknown clone strategy: {strategy}")
+            return None
+        if use_reference is None:
+            use_reference = bool(os.environ.get("CODEBASE_GENIUS_REFERENCE_DIR"))
+        timeout = timeout or int(os.environ.get("CODEBASE_GENIUS_CLONE_TIMEOUT", 300))
+        
+        temp_dir = None
         try:
             # Create temporary directory
             temp_dir = tempfile.mkdtemp(prefix="codebase_genius_")
             
+            command = ["git", "clone"] + CLONE_STRATEGIES[strategy]
+            if use_reference:
+                reference = GitUtils.update_reference(repo_url)
+                if reference:
+                    # Objects already in the shared reference are borrowed, not copied
+                    command += ["--reference-if-able", reference]
+            command += [repo_url, temp_dir]
+            
             # Clone repository
             result = subprocess.run(
-                ["git", "clone", repo_url, temp_dir],
+                command,
                 capture_output=True,
                 text=True,
-                timeout=300  # 5 minute timeout
+                timeout=timeout
             )
             
-            if result.returncode == 0:
-                return temp_dir
-            else:
+            if result.returncode != 0:
                 print(f"Git clone failed: {result.stderr}")
+                GitUtils.remove_clone(temp_dir)
                 return None
+            
+            if strategy == "sparse":
+                result = subprocess.run(
+                    ["git", "-C", temp_dir, "sparse-checkout", "set", "--no-cone"] + SPARSE_PATTERNS,
+                    capture_output=True,
+                    text=True,
+                    timeout=timeout
+                )
+            elif strategy == "partial":
+                # READMEs are read before prioritization, fetch them up front
+                result = subprocess.run(
+                    ["git", "-C", temp_dir, "ls-tree", "-z", "--name-only", "HEAD"],
+                    capture_output=True,
+                    text=True,
+                    timeout=timeout
+                )
+                # A repository without a README is fine; only a failing checkout is not
+                readmes = [name for name in result.stdout.split("\0") if name.lower().startswith("readme")]
+                if result.returncode == 0 and readmes:
+                    result = subprocess.run(
+                        ["git", "-C", temp_dir, "checkout", "HEAD", "--"] + readmes,
+                        capture_output=True,
+                        text=True,
+                        timeout=timeout
+                    )
+            
+            if result.returncode == 0:
+                return temp_dir
+            
+            # The clone itself worked, so a complete one should too
+            print(f"Git checkout failed after a {strategy} clone, retrying as a full clone: {result.stderr}")
+            GitUtils.remove_clone(temp_dir)
+            return GitUtils.clone_repository(repo_url, "full", use_reference, timeout)
                 
         except Exception as e:
             print(f"Error cloning repository: {e}")
+            GitUtils.remove_clone(temp_dir)
+            return None
+    
+    @staticmethod
+    def remove_clone(local_path):
+        """Delete a temporary clone made by clone_repository; other paths are left alone"""
+        if not local_path:
+            return False
+        temp_root = os.path.realpath(tempfile.gettempdir())
+        local_path = os.path.realpath(local_path)
+        if (os.path.dirname(local_path) != temp_root or
+                not os.path.basename(local_path).startswith("codebase_genius_")):
+            return False
+        shutil.rmtree(local_path, ignore_errors=True)
+        return True
+    
+    @staticmethod
+    def reference_path(repo_url, reference_root=None):
+        """Return the shared bare reference repository used for a URL"""
+        reference_root = reference_root or os.environ.get("CODEBASE_GENIUS_REFERENCE_DIR", DEFAULT_REFERENCE_DIR)
+        return GitUtils.mirror_path(repo_url, reference_root) + ".git"
+    
+    @staticmethod
+    def update_reference(repo_url, reference_root=None):
+        """Create or refresh the bare mirror that clones borrow objects from"""
+        reference = GitUtils.reference_path(repo_url, reference_root)
+        
+        if os.path.isdir(reference):
+            commands = [["git", "-C", reference, "fetch", "--prune", "origin"]]
+        else:
+            os.makedirs(os.path.dirname(reference), exist_ok=True)
+            commands = [
+                ["git", "clone", "--mirror", repo_url, reference],
+                # Clones point at these objects through alternates; never let gc drop them
+                ["git", "-C", reference, "config", "gc.auto", "0"],
+                ["git", "-C", reference, "config", "gc.pruneExpire", "never"]
+            ]
+        
+        try:
+            for command in commands:
+                result = subprocess.run(command, capture_output=True, text=True, timeout=600)
+                if result.returncode != 0:
+                    print(f"Reference update failed: {result.stderr}")
+                    return None
+            return reference
+        except Exception as e:
+            print(f"Error updating reference repository: {e}")
+            return None
+    
+    @staticmethod
+    def generate_file_tree_from_git(root_path):
+        """Generate file tree from the commit itself, for clones without a checkout"""
+        file_tree = {
+            "name": os.path.basename(root_path),
+            "path": root_path,
+            "type": "directory",
+            "children": [],
+            "file_count": 0,
+            "lazy": True,
+            "pruned": True
+        }
+        files = []
+        
+        try:
+            result = subprocess.run(
+                ["git", "-C", root_path, "ls-tree", "-r", "-l", "-z", "HEAD"],
+                capture_output=True,
+                timeout=120
+            )
+        except Exception as e:
+            print(f"Error listing repository tree: {e}")
+            return GitUtils._attach_file_index(file_tree, files)
+        
+        if result.returncode != 0:
+            return GitUtils._attach_file_index(file_tree, files)
+        
+        directories = {"": file_tree}
+        for entry in result.stdout.decode('utf-8', 'surrogateescape').split('\0'):
+            if not entry:
+                continue
+            # "<mode> <type> <sha> <size>\t<path>"
+            meta, _, rel_path = entry.partition('\t')
+            parts = meta.split()
+            # Mode 120000 is a symlink, skipped as generate_file_tree skips them
+            if len(parts) != 4 or parts[1] != "blob" or parts[0] == "120000":
+                continue
+            
+            segments = rel_path.split('/')
+            if any(segment.startswith('.') or segment in IRRELEVANT_DIRS for segment in segments[:-1]):
+                continue
+            if segments[-1].startswith('.'):
+                continue
+            
+            parent = file_tree
+            for depth in range(1, len(segments)):
+                dir_key = '/'.join(segments[:depth])
+                if dir_key not in directories:
+                    dir_node = {
+                        "name": segments[depth - 1],
+                        "path": os.path.join(root_path, dir_key),
+                        "type": "directory",
+                        "children": []
+                    }
+                    directories[dir_key] = dir_node
+                    parent["children"].append(dir_node)
+                parent = directories[dir_key]
+            
+            file_node = {
+                "name": segments[-1],
+                "path": os.path.join(root_path, rel_path),
+                "type": "file",
+                "extension": os.path.splitext(segments[-1])[1],
+                "size": int(parts[3]) if parts[3].isdigit() else 0,
+                "mtime": 0.0,
+                "blob_sha": parts[2]
+            }
+            parent["children"].append(file_node)
+            files.append(file_node)
+        
+        return GitUtils._attach_file_index(file_tree, files)
+    
+    @staticmethod
+    def materialize_files(repo_path, file_infos, timeout=600):
+        """Check out files missing from a partial clone, fetching their blobs in one batch"""
+        missing = [
+            os.path.relpath(file_info["path"], repo_path)
+            for file_info in file_infos
+            if not os.path.exists(file_info["path"])
+        ]
+        if not missing:
+            return 0
+        
+        try:
+            result = subprocess.run(
+                ["git", "-C", repo_path, "checkout", "HEAD",
+                 "--pathspec-from-file=-", "--pathspec-file-nul"],
+                input='\0'.join(missing).encode('utf-8', 'surrogateescape'),
+                capture_output=True,
+                timeout=timeout
+            )
+        except Exception as e:
+            print(f"Error fetching files: {e}")
+            return 0
+        
+        if result.returncode != 0:
+            print(f"Git checkout failed: {result.stderr.decode('utf-8', 'replace')}")
+            return 0
+        return len(missing)
+    
+    @staticmethod
+    def mirror_path(repo_url, mirror_root=None):
+        """Return the persistent checkout directory used for a repository URL"""
+        mirror_root = mirror_root or os.environ.get("CODEBASE_GENIUS_MIRROR_DIR", DEFAULT_MIRROR_DIR)
+        repo_name = repo_url.rstrip('/').split('/')[-1].replace('.git', '') or "repo"
+        url_hash = hashlib.sha1(repo_url.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(mirror_root, f"{repo_name}-{url_hash}")
+    
+    @staticmethod
+    def sync_mirror(repo_url, mirror_root=None):
+        """Clone a repository once, then fast-forward the same checkout on later calls"""
+        local_path = GitUtils.mirror_path(repo_url, mirror_root)
+        
+        if not os.path.isdir(os.path.join(local_path, ".git")):
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            shutil.rmtree(local_path, ignore_errors=True)
+            commands = [["git", "clone", repo_url, local_path]]
+        else:
+            commands = [
+                ["git", "-C", local_path, "fetch", "--prune", "origin", "HEAD"],
+                ["git", "-C", local_path, "reset", "--hard", "FETCH_HEAD"],
+                ["git", "-C", local_path, "clean", "-fdx"]
+            ]
+        
+        try:
+            for command in commands:
+                result = subprocess.run(command, capture_output=True, text=True, timeout=300)
+                if result.returncode != 0:
+                    print(f"Git mirror sync failed: {result.stderr}")
+                    return None
+            return local_path
+        except Exception as e:
+            print(f"Error syncing repository mirror: {e}")
+            return None
+    
+    @staticmethod
+    def get_head_commit(repo_path):
+        """Return the commit SHA checked out in a repository"""
+        try:
+            result = subprocess.run(
+                ["git", "-C", repo_path, "rev-parse", "HEAD"],
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+            return result.stdout.strip() if result.returncode == 0 else None
+        except Exception:
+            return None
+    
+    @staticmethod
+    def get_last_modified(repo_path, max_commits=500, timeout=30):
+        """Map absolute file paths to the time of the latest of the last max_commits commits touching them"""
+        try:
+            result = subprocess.run(
+                ["git", "-C", repo_path, "log", "-n", str(max_commits), "--name-only", "--format=%x00%ct"],
+                capture_output=True,
+                timeout=timeout
+            )
+        except Exception:
+            return {}
+        if result.returncode != 0:
+            return {}
+
+        last_modified = {}
+        # Newest first: "\0<timestamp>\n\n<path>\n<path>..." per commit
+        for entry in result.stdout.decode('utf-8', 'surrogateescape').split('\0')[1:]:
+            lines = entry.split('\n')
+            try:
+                timestamp = int(lines[0])
+            except ValueError:
+                continue
+            for rel_path in lines[1:]:
+                if rel_path:
+                    last_modified.setdefault(os.path.join(repo_path, rel_path), timestamp)
+        return last_modified
+    
+    @staticmethod
+    def get_remote_head(repo_url, timeout=60):
+        """Return the commit SHA that HEAD points to on a remote, without cloning"""
+        try:
+            result = subprocess.run(
+                ["git", "ls-remote", repo_url, "HEAD"],
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
+            if result.returncode != 0 or not result.stdout.strip():
+                return None
+            return result.stdout.split()[0]
+        except Exception:
+            return None
+    
+    @staticmethod
+    def get_changed_paths(repo_path, old_commit, new_commit):
+        """List added, modified and deleted files between two commits"""
+        try:
+            result = subprocess.run(
+                ["git", "-C", repo_path, "diff", "--name-status", "--no-renames", "-z",
+                 old_commit, new_commit],
+                capture_output=True,
+                timeout=120
+            )
+        except Exception as e:
+            print(f"Error diffing commits: {e}")
+            return None
+        
+        # Unknown base commit (force push, pruned history): caller must rebuild
+        if result.returncode != 0:
             return None
+        
+        changes = {"added": [], "modified": [], "deleted": []}
+        fields = result.stdout.decode('utf-8', 'surrogateescape').split('\0')
+        for status, rel_path in zip(fields[0::2], fields[1::2]):
+            abs_path = os.path.join(repo_path, rel_path)
+            if status.startswith('A'):
+                changes["added"].append(abs_path)
+            elif status.startswith('D'):
+                changes["deleted"].append(abs_path)
+            else:
+                # M, T (type change) and anything else is re-parsed in place
+                changes["modified"].append(abs_path)
+        return changes
     
     @staticmethod
-    def generate_file_tree(root_path):
-        """Generate structured file tree"""
+    def generate_file_tree(root_path, respect_gitignore=True):
+        """Generate structured file tree and flat file index in a single scandir pass (symlinks skipped)"""
         file_tree = {
             "name": os.path.basename(root_path),
             "path": root_path,
             "type": "directory",
             "children": [],
-            "file_count": 0
+            "file_count": 0,
+            "pruned": True
         }
+        files = []
         
-        def build_tree(current_path, tree_node):
+        # Iterative walk: (directory path, tree node, path relative to root, active ignore rules)
+        stack = [(root_path, file_tree, "", [])]
+        while stack:
+            current_path, tree_node, rel_dir, ignore_rules = stack.pop()
+            
+            if respect_gitignore:
+                local_rules = GitIgnore.load(os.path.join(current_path, ".gitignore"), rel_dir)
+                if local_rules:
+                    ignore_rules = ignore_rules + [local_rules]
+            
             try:
-                for item in os.listdir(current_path):
-                    item_path = os.path.join(current_path, item)
+                with os.scandir(current_path) as entries:
+                    entries = sorted(entries, key=lambda entry: entry.name)
+            except (PermissionError, FileNotFoundError, NotADirectoryError):
+                continue
+            
+            subdirs = []
+            for entry in entries:
+                name = entry.name
+                
+                # Skip hidden directories and files
+                if name.startswith('.'):
+                    continue
+                
+                rel_path = rel_dir + name
+                try:
+                    # Symlinks are left out: a linked directory would otherwise be
+                    # listed as a file, and a link may point outside the repository
+                    if entry.is_symlink():
+                        continue
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                
+                if is_dir:
+                    # Skip common irrelevant directories without descending
+                    if name in IRRELEVANT_DIRS or GitIgnore.is_ignored(ignore_rules, rel_path, True):
+                        continue
                     
-                    # Skip hidden directories and files
-                    if item.startswith('.'):
+                    dir_node = {
+                        "name": name,
+                        "path": entry.path,
+                        "type": "directory",
+                        "children": []
+                    }
+                    tree_node["children"].append(dir_node)
+                    subdirs.append((entry.path, dir_node, rel_path + "/", ignore_rules))
+                else:
+                    if GitIgnore.is_ignored(ignore_rules, rel_path, False):
                         continue
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                        size, mtime = stat.st_size, stat.st_mtime
+                    except OSError:
+                        size, mtime = 0, 0.0
                     
-                    if os.path.isdir(item_path):
-                        # Skip common irrelevant directories
-                        if item in ['.git', '__pycache__', 'node_modules', 'venv', 'env', '.idea']:
-                            continue
-                            
-                        dir_node = {
-                            "name": item,
-                            "path": item_path,
-                            "type": "directory",
-                            "children": []
-                        }
-                        tree_node["children"].append(dir_node)
-                        build_tree(item_path, dir_node)
-                    else:
-                        file_node = {
-                            "name": item,
-                            "path": item_path,
-                            "type": "file",
-                            "extension": os.path.splitext(item)[1]
-                        }
-                        tree_node["children"].append(file_node)
-                        tree_node["file_count"] += 1
-            except PermissionError:
-                pass
-        
-        build_tree(root_path, file_tree)
+                    file_node = {
+                        "name": name,
+                        "path": entry.path,
+                        "type": "file",
+                        "extension": os.path.splitext(name)[1],
+                        "size": size,
+                        "mtime": mtime
+                    }
+                    tree_node["children"].append(file_node)
+                    files.append(file_node)
+            
+            # Reversed so directories are visited in name order
+            stack.extend(reversed(subdirs))
+        
+        return GitUtils._attach_file_index(file_tree, files)
+    
+    @staticmethod
+    def _attach_file_index(file_tree, files):
+        """Expose the flat file list and its lookup index on the tree root"""
+        file_tree["files"] = files
+        file_tree["index"] = FileIndex(files)
+        file_tree["file_count"] = len(files)
         return file_tree
     
+    @staticmethod
+    def get_blob_hashes(repo_path):
+        """Map absolute file paths to their git blob SHA from the index"""
+        try:
+            result = subprocess.run(
+                ["git", "-C", repo_path, "ls-files", "-s", "-z"],
+                capture_output=True,
+                timeout=120
+            )
+        except Exception as e:
+            print(f"Error reading git index: {e}")
+            return {}
+
+        if result.returncode != 0:
+            return {}
+
+        blob_hashes = {}
+        for entry in result.stdout.decode('utf-8', 'surrogateescape').split('\0'):
+            if not entry:
+                continue
+            # "<mode> <sha> <stage>\t<path>"
+            meta, _, rel_path = entry.partition('\t')
+            parts = meta.split()
+            if len(parts) == 3:
+                blob_hashes[os.path.join(repo_path, rel_path)] = parts[1]
+        return blob_hashes
+
+    @staticmethod
+    def annotate_blob_hashes(file_tree):
+        """Attach git blob SHAs to file nodes so parse results can be cached by content"""
+        blob_hashes = GitUtils.get_blob_hashes(file_tree["path"])
+        if not blob_hashes:
+            return file_tree
+
+        for file_node in file_tree["files"]:
+            blob_sha = blob_hashes.get(file_node["path"])
+            if blob_sha:
+                file_node["blob_sha"] = blob_sha
+        return file_tree
+
     @staticmethod
     def filter_irrelevant_directories(file_tree):
         """Filter out irrelevant directories from file tree"""
-        irrelevant_dirs = ['.git', '__pycache__', 'node_modules', 'venv', 'env', '.idea', 'build', 'dist']
+        # Trees from generate_file_tree are pruned while walking
+        if file_tree.get("pruned"):
+            return file_tree
         
         def filter_tree(node):
             if node["type"] == "directory":
                 node["children"] = [
                     child for child in node["children"]
-                    if not (child["type"] == "directory" and child["name"] in irrelevant_dirs)
+                    if not (child["type"] == "directory" and child["name"] in IRRELEVANT_DIRS)
                 ]
                 for child in node["children"]:
                     filter_tree(child)
@@ -102,27 +655,15 @@ class GitUtils:
         """Find and read README file"""
         readme_files = ['README.md', 'README.txt', 'README', 'readme.md']
         
-        def find_readme(node):
-            if node["type"] == "file" and node["name"] in readme_files:
-                try:
-                    with open(node["path"], 'r', encoding='utf-8') as f:
-                        return f.read()
-                except UnicodeDecodeError:
-                    try:
-                        with open(node["path"], 'r', encoding='latin-1') as f:
-                            return f.read()
-                    except:
-                        return None
-                except:
-                    return None
-            elif node["type"] == "directory":
-                for child in node["children"]:
-                    content = find_readme(child)
-                    if content:
-                        return content
-            return None
-        
-        return find_readme(file_tree)
+        # Index lookup instead of a tree scan; the shallowest README wins
+        index = file_tree["index"]
+        candidates = [path for name in readme_files for path in index.find(name)]
+        candidates.sort(key=lambda path: path.count(os.sep))
+        for path in candidates:
+            content = ingest.read_text(path)[0]
+            if content:
+                return content
+        return None
     
     @staticmethod
     def get_main_directories(file_tree):
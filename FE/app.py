@@ -22,6 +22,99 @@ with st.sidebar:
     )
     
 
+
+def iter_events(api_url, task_id, retries=5):
+    """Yield (event, data) pairs from the backend's Server-Sent Events stream
+
+    A dropped or stalled connection is reopened with Last-Event-ID, so the
+    backend resumes after the last event seen instead of failing the task;
+    only retries consecutive attempts without a new event give up.
+    """
+    last_id = None
+    attempts = 0
+    while True:
+        headers = {"Last-Event-ID": last_id} if last_id else {}
+        try:
+            # The backend sends a keep-alive well within the read timeout
+            with requests.get(f"{api_url}/events/{task_id}", headers=headers, stream=True,
+                              timeout=(10, 60)) as response:
+                response.raise_for_status()
+                event, data, event_id = "message", [], None
+                for line in response.iter_lines(decode_unicode=True):
+                    if line is None:
+                        continue
+                    if line == "":
+                        if data:
+                            if event_id:
+                                last_id = event_id
+                            attempts = 0
+                            yield event, json.loads("\n".join(data))
+                        event, data, event_id = "message", [], None
+                    elif line.startswith("id:"):
+                        event_id = line[len("id:"):].strip()
+                    elif line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                    elif line.startswith("data:"):
+                        data.append(line[len("data:"):].strip())
+            # The backend closes the stream once the task has finished
+            return
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                requests.exceptions.ChunkedEncodingError):
+            attempts += 1
+            if attempts > retries:
+                raise
+            time.sleep(min(2 ** attempts, 30))
+
+
+def fetch_section(api_url, task_id, start, end):
+    """Download one section of the document by byte range"""
+    response = requests.get(
+        f"{api_url}/documents/{task_id}",
+        headers={"Range": f"bytes={start}-{end - 1}"},
+        timeout=60
+    )
+    response.raise_for_status()
+    return response.content.decode("utf-8", errors="replace")
+
+
+def follow_task(api_url, task_id):
+    """Show progress pushed by the backend and render sections as they are written"""
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    sections = st.container()
+    
+    try:
+        for event, data in iter_events(api_url, task_id):
+            if event == "progress":
+                progress_bar.progress(data["progress"])
+                status_text.text(f"Status: {data['stage']} ({data['progress']}%)")
+            elif event == "section" and data["end"] > data["start"]:
+                with sections:
+                    st.markdown(fetch_section(api_url, task_id, data["start"], data["end"]))
+            elif event == "status":
+                current_status = data.get("status", "processing")
+                if current_status == "completed":
+                    progress_bar.progress(100)
+                    status_text.text("Status: completed (100%)")
+                    st.success("Documentation generated successfully!")
+                    
+                    # The browser streams the file from the backend; nothing is held here
+                    st.markdown(f"[Download Documentation]({api_url}/documents/{task_id})")
+                    return
+                elif current_status == "error":
+                    st.error(f"Error: {data.get('error', 'Unknown error')}")
+                    return
+                elif current_status == "cancelled":
+                    st.warning("Documentation generation was cancelled.")
+                    return
+                else:
+                    status_text.text(f"Status: {current_status} ({data.get('progress', 0)}%)")
+    except requests.exceptions.RequestException:
+        # Losing the stream says nothing about the task, which keeps running on the backend
+        st.warning(f"Lost contact with the backend while following task {task_id}; it may still be running. "
+                   f"Check {api_url}/status/{task_id} for its progress.")
+
+
 # Main interface
 col1, col2 = st.columns([2, 1])
 
@@ -49,42 +142,10 @@ with col1:
                         task_id = result.get("task_id")
                         
                         st.success(f"Documentation generation started! Task ID: {task_id}")
-                        
-                        # Poll for completion
-                        progress_bar = st.progress(0)
-                        status_text = st.empty()
-                        
-                        for i in range(10):
-                            time.sleep(2)
-                            
-                            # Check status
-                            status_response = requests.get(
-                                f"{api_url}/status/{task_id}"
-                            )
-                            
-                            if status_response.status_code == 200:
-                                status_data = status_response.json()
-                                progress = status_data.get("progress", 0)
-                                current_status = status_data.get("status", "processing")
-                                
-                                progress_bar.progress(progress)
-                                status_text.text(f"Status: {current_status} ({progress}%)")
-                                
-                                if current_status == "completed":
-                                    doc_path = status_data.get("documentation_path")
-                                    st.success(f"Documentation generated successfully!")
-                                    
-                                    # Show download link
-                                    st.download_button(
-                                        label="Download Documentation",
-                                        data=open(doc_path, "r").read() if doc_path else "# Documentation",
-                                        file_name="generated_docs.md",
-                                        mime="text/markdown"
-                                    )
-                                    break
-                                elif current_status == "error":
-                                    st.error(f"Error: {status_data.get('error', 'Unknown error')}")
-                                    break
+                        follow_task(api_url, task_id)
+                    elif response.status_code == 429:
+                        retry_after = response.headers.get("Retry-After", "a few")
+                        st.warning(f"The server is busy. Please try again in {retry_after} seconds.")
                     else:
                         st.error(f"Failed to start documentation generation: {response.text}")
                         